@@ -0,0 +1,143 @@
+"""
+The OpenAPI document of the API, and the Swagger UI and ReDoc pages.
+
+Generating the document means introspecting every view and serializer with
+drf_yasg, far too slow to do per request, and importing drf_yasg's
+generators adds to every worker's startup. Instead `manage.py
+generate_schema` writes it once, at build time, to `OPENAPI_SCHEMA_PATH`,
+and `schema_json` serves that file with an ETag and a long `Cache-Control`
+max age. The UI pages render drf_yasg's templates and static files (it
+stays an installed app), pointed at that file, without importing its code.
+
+With `OPENAPI_LIVE_SCHEMA` the URLs serve drf_yasg's own views instead,
+regenerating the document on every request, e.g. while changing the API.
+"""
+import hashlib
+import json
+import os
+
+from django.conf import settings
+from django.http import Http404
+from django.http import HttpResponse
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+__all__ = [
+    "generate_schema",
+    "live_schema_view",
+    "schema_json",
+    "swagger_ui",
+    "redoc_ui",
+]
+
+
+def _info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="Insurance API",
+        default_version="v1",
+        description="Insurance API",
+        contact=openapi.Contact(email="joewalk102@gmail.com"),
+        license=openapi.License(name="BSD License"),
+    )
+
+
+def live_schema_view():
+    """drf_yasg's schema view, generating the document per request."""
+    from drf_yasg.views import get_schema_view
+    from rest_framework import permissions
+
+    return get_schema_view(
+        _info(), public=True, permission_classes=[permissions.AllowAny]
+    )
+
+
+def generate_schema():
+    """The OpenAPI document, as JSON bytes."""
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    schema = OpenAPISchemaGenerator(_info()).get_schema(request=None, public=True)
+    return OpenAPICodecJson(validators=[]).encode(schema)
+
+
+# (path, mtime) -> (content, etag)
+_loaded = {}
+
+
+def _load_schema():
+    path = str(settings.OPENAPI_SCHEMA_PATH)
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        raise Http404(
+            "No OpenAPI document, run `python manage.py generate_schema` (or set "
+            "OPENAPI_LIVE_SCHEMA)."
+        )
+    entry = _loaded.get((path, mtime))
+    if entry is None:
+        with open(path, "rb") as file:
+            content = file.read()
+        entry = (content, f'"{hashlib.sha256(content).hexdigest()[:32]}"')
+        # Only the current version of the file is kept.
+        _loaded.clear()
+        _loaded[(path, mtime)] = entry
+    return entry, mtime
+
+
+@require_safe
+def schema_json(request):
+    """The pre-generated document, revalidated with its ETag once stale."""
+    (content, etag), mtime = _load_schema()
+    last_modified = int(mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(content, content_type="application/json")
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=getattr(settings, "OPENAPI_SCHEMA_MAX_AGE", 86400),
+    )
+    return response
+
+
+@require_safe
+def swagger_ui(request):
+    if request.GET.get("format") == "openapi":
+        # The URL drf_yasg served the document at.
+        return schema_json(request)
+    swagger_settings = {
+        "url": reverse("schema-json"),
+        "deepLinking": False,
+        "docExpansion": "list",
+        "validatorUrl": None,
+    }
+    return render(
+        request,
+        "drf-yasg/swagger-ui.html",
+        {
+            "title": "Insurance API",
+            "swagger_settings": json.dumps(swagger_settings),
+            "oauth2_config": "{}",
+            "USE_SESSION_AUTH": False,
+        },
+    )
+
+
+@require_safe
+def redoc_ui(request):
+    return render(
+        request,
+        "drf-yasg/redoc.html",
+        {
+            "title": "Insurance API",
+            "redoc_settings": json.dumps({"url": reverse("schema-json")}),
+        },
+    )
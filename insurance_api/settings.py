@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/4.0/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.0/ref/settings/
 """
+import os
 import random
 import string
 from pathlib import Path
@@ -44,6 +45,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "utils.metrics.MetricsMiddleware",
+    "utils.timing.ServerTimingMiddleware",
+    "quote.rates.RateReloadMiddleware",
+    "utils.query_budget.QueryBudgetMiddleware",
+    "utils.db_router.ReadReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -81,6 +87,51 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+    },
+    # Read replica for GET/HEAD requests to the quote API, see
+    # `utils.db_router`. Only used when `REPLICA_DATABASE_NAME` is set; locally
+    # point it at a second SQLite file and run `manage.py sync_replica`.
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ.get("REPLICA_DATABASE_NAME") or BASE_DIR / "db.sqlite3",
+        "TEST": {"MIRROR": "default"},
+    },
+}
+DATABASE_ROUTERS = ["utils.db_router.ReadReplicaRouter"]
+READ_REPLICA_DATABASE = "replica" if os.environ.get("REPLICA_DATABASE_NAME") else None
+# Seconds a client reads from the primary after writing, so it sees its writes.
+READ_REPLICA_PIN_SECONDS = 5
+
+# PRAGMAs run on every new SQLite connection (see `utils.sqlite`). Each can be
+# overridden with an `SQLITE_<NAME>` environment variable, e.g.
+# `SQLITE_JOURNAL_MODE=delete`; an empty value keeps SQLite's own default.
+SQLITE_PRAGMAS = {
+    name: os.environ.get(f"SQLITE_{name.upper()}", default)
+    for name, default in {
+        "journal_mode": "wal",  # readers and the writer don't block each other
+        "busy_timeout": 5000,  # ms writers wait for the write lock
+        "synchronous": "normal",  # durable in WAL mode, fsync at checkpoints
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,  # KiB, per connection
+        "temp_store": "memory",
+    }.items()
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# Shared by every worker process on the host (in `CACHE_DIR`), so that
+# invalidations, e.g. of `quote.cache`'s detail responses, reach all of them.
+# Don't switch to the per process `LocMemCache` with more than one worker;
+# across hosts use a networked backend such as Memcached or Redis.
+# Entries are pickles, so `CACHE_DIR` must only be writable by the server's
+# user: not a shared directory such as /tmp. Django creates it with mode 0700.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("CACHE_DIR") or str(BASE_DIR / "cache"),
+        "OPTIONS": {"MAX_ENTRIES": 10000},
     }
 }
 
@@ -132,4 +183,78 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 10,
     "EXCEPTION_HANDLER": "insurance_api.exception_handlers.custom_exception_handler",
     "ORDERING": "-date_created",
+    # orjson backed, with a fallback to the stock classes when orjson isn't
+    # installed (see `utils.renderers`).
+    "DEFAULT_RENDERER_CLASSES": [
+        "utils.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "utils.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
+
+# Dotted path to the `quote.qid.QidGenerator` used to assign `Quote.qid`.
+QUOTE_QID_GENERATOR = "quote.qid.KSortableQidGenerator"
+
+# Report the number of SQL queries per request in an `X-Query-Count` header,
+# and fail requests that go over their view's `query_budgets` (see
+# `utils.query_budget`).
+QUERY_COUNT_HEADER = DEBUG
+QUERY_BUDGET_ENFORCE = False
+
+# Split each request's time into db/pricing/serialize/render phases in a
+# `Server-Timing` header, and profile a fraction of requests (or those with
+# an `X-Profile: <PROFILE_TOKEN>` header) into `PROFILE_DIR` (see
+# `utils.timing`).
+SERVER_TIMING = os.environ.get("SERVER_TIMING", str(DEBUG)).lower() == "true"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN") or None
+PROFILE_DIR = os.environ.get("PROFILE_DIR", str(BASE_DIR / "profiles"))
+
+# Per route request counts, latency histograms, SQL and cache counters,
+# served in the Prometheus format at `/metrics` to requests sending
+# `Authorization: Bearer <METRICS_TOKEN>`, optionally only from
+# `METRICS_ALLOWED_IPS` (see `utils.metrics`); without a token the endpoint
+# is a 404. With several worker processes, point `METRICS_DIR` at a
+# directory they share (cleared on deploy) so the endpoint reports them all.
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "false").lower() == "true"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN") or None
+METRICS_DIR = os.environ.get("METRICS_DIR") or None
+METRICS_ALLOWED_IPS = None
+
+# The OpenAPI document is generated at build time (`manage.py
+# generate_schema`) into this file and served from it, cached by clients for
+# `OPENAPI_SCHEMA_MAX_AGE` seconds. `OPENAPI_LIVE_SCHEMA=true` regenerates it
+# on every request instead (see `insurance_api.schema`).
+OPENAPI_SCHEMA_PATH = os.environ.get(
+    "OPENAPI_SCHEMA_PATH", str(BASE_DIR / "openapi.json")
+)
+OPENAPI_SCHEMA_MAX_AGE = 24 * 60 * 60
+OPENAPI_LIVE_SCHEMA = os.environ.get("OPENAPI_LIVE_SCHEMA", "false").lower() == "true"
+
+# "page" (page numbers) or "cursor" (keyset pagination, see
+# `utils.pagination.OptInKeysetPagination`) for the quote and purchase lists.
+DEFAULT_PAGINATION_MODE = "page"
+
+# Cache alias and timeout (seconds) for rendered quote/purchase detail
+# responses, see `quote.cache`.
+QUOTE_DETAIL_CACHE = "default"
+QUOTE_DETAIL_CACHE_TIMEOUT = 300
+
+# Most (state, zipcode) address ids kept per process, so quote writes can skip
+# the address lookup (see `quote.models.get_address_cache`).
+ADDRESS_CACHE_SIZE = 10000
+
+# Seconds between checks for a newly published rate version (see
+# `quote.rates`), so every worker picks it up without a restart.
+RATES_RELOAD_INTERVAL = float(os.environ.get("RATES_RELOAD_INTERVAL", 5))
+
+# Pins RATES_RELOAD_INTERVAL during tests, see `insurance_api.test_runner`.
+TEST_RUNNER = "insurance_api.test_runner.TestRunner"
+
+# Size of the thread pool the async views (`quote.async_views`) run ORM
+# queries in.
+ASYNC_DB_THREADS = 8
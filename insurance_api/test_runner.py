@@ -0,0 +1,54 @@
+"""
+The test runner (`TEST_RUNNER`), pinning settings that would otherwise make
+tests depend on timing or on other processes, and enforcing query budgets.
+"""
+import shutil
+import tempfile
+import unittest
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test.runner import DiscoverRunner
+
+__all__ = ["TestRunner"]
+
+
+def clear_caches():
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # New rates are loaded when published and after the database is
+        # flushed, never on a timer halfway through a test. Tests that need
+        # the timer override it.
+        settings.RATES_RELOAD_INTERVAL = None
+        # Any request over its view's `query_budgets` fails the test.
+        settings.QUERY_BUDGET_ENFORCE = True
+        # A cache directory of their own, not shared with a running server.
+        self.cache_dir = tempfile.mkdtemp(prefix="insurance_api_test_cache")
+        settings.CACHES = {
+            alias: {**config, "LOCATION": self.cache_dir}
+            if config["BACKEND"].endswith("FileBasedCache")
+            else config
+            for alias, config in settings.CACHES.items()
+        }
+
+    def get_resultclass(self):
+        base = super().get_resultclass() or unittest.TextTestResult
+
+        class Result(base):
+            def startTest(self, test):
+                # The file cache outlives the per test rollback (and
+                # e.g. purchase ids repeat between tests): every test starts
+                # without the responses the previous ones cached.
+                clear_caches()
+                super().startTest(test)
+
+        return Result
+
+    def teardown_test_environment(self, **kwargs):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
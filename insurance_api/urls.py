@@ -13,39 +13,50 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include
 from django.urls import path
 from django.urls import re_path
 
+from insurance_api import schema
+from quote.urls import async_urlpatterns
 from quote.urls import quote_router
+from utils.metrics import metrics_view
 
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Insurance API",
-        default_version="v1",
-        description="Insurance API",
-        contact=openapi.Contact(email="joewalk102@gmail.com"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=[permissions.AllowAny],
-)
+if settings.OPENAPI_LIVE_SCHEMA:
+    # Imports drf_yasg and regenerates the document on every request.
+    schema_view = schema.live_schema_view()
+    schema_urlpatterns = [
+        re_path(
+            r"^swagger\.json$",
+            schema_view.without_ui(cache_timeout=0),
+            name="schema-json",
+        ),
+        re_path(
+            r"^swagger/$",
+            schema_view.with_ui("swagger", cache_timeout=0),
+            name="schema-swagger-ui",
+        ),
+        re_path(
+            r"^redoc/$",
+            schema_view.with_ui("redoc", cache_timeout=0),
+            name="schema-redoc",
+        ),
+    ]
+else:
+    # The document `manage.py generate_schema` wrote (see `insurance_api.schema`).
+    schema_urlpatterns = [
+        path("swagger.json", schema.schema_json, name="schema-json"),
+        path("swagger/", schema.swagger_ui, name="schema-swagger-ui"),
+        path("redoc/", schema.redoc_ui, name="schema-redoc"),
+    ]
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
+    path("quote/async/", include(async_urlpatterns)),
     path("quote/", include(quote_router.urls)),
     path("api-auth/", include("rest_framework.urls", namespace="rest_framework")),
-    re_path(
-        r"^swagger/$",
-        schema_view.with_ui("swagger", cache_timeout=0),
-        name="schema-swagger-ui",
-    ),
-    re_path(
-        r"^redoc/$", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"
-    ),
+    *schema_urlpatterns,
 ]
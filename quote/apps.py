@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class QuoteConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "quote"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from quote.pricing import build_price_table
+        from utils.sqlite import configure_sqlite
+
+        build_price_table()
+        connection_created.connect(configure_sqlite, dispatch_uid="configure_sqlite")
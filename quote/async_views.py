@@ -0,0 +1,184 @@
+"""
+Async versions of the quote create/retrieve, price and purchase endpoints.
+
+Served under `/quote/async/`, they give the same responses as the DRF
+viewsets but don't tie up a thread per request when running under
+`insurance_api.asgi.application`. ORM work is handed to a bounded thread
+pool (`ASYNC_DB_THREADS` workers) and everything else, validation, pricing
+and rendering, stays on the event loop.
+"""
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import close_old_connections
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException
+
+from quote.models import Quote
+from quote.rates import price_table_for
+from quote.serializers import QuotePurchaseSerializer
+from quote.serializers import QuoteSerializer
+from quote.serializers import validate_items
+from utils.renderers import ORJSONParser
+from utils.renderers import ORJSONRenderer
+
+__all__ = ["quote_create", "quote_detail", "quote_price", "purchase_create"]
+
+_db_executor = None
+
+
+def get_db_executor():
+    global _db_executor
+    if _db_executor is None:
+        _db_executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "ASYNC_DB_THREADS", 8),
+            thread_name_prefix="quote-db",
+        )
+    return _db_executor
+
+
+def _run_db(func, *args, **kwargs):
+    # Pool threads keep their own connections; honor CONN_MAX_AGE like a
+    # request would.
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_db(func, *args, **kwargs):
+    """
+    Run ORM code in the database thread pool, in a copy of the current
+    context (e.g. for `utils.db_router`).
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_db_executor(),
+        contextvars.copy_context().run,
+        functools.partial(_run_db, func, *args, **kwargs),
+    )
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        ORJSONRenderer().render(data), status=status, content_type="application/json"
+    )
+
+
+def async_api_view(methods):
+    """
+    Method check, JSON errors shaped like `custom_exception_handler`'s, and
+    CSRF exemption (like DRF views) for an async view.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return json_response(
+                    {
+                        "detail": f'Method "{request.method}" not allowed.',
+                        "status_code": 405,
+                    },
+                    status=405,
+                )
+            try:
+                return await view(request, *args, **kwargs)
+            except ValueError as exc:
+                detail = exc.args[0] if exc.args else ""
+                return json_response({"detail": detail, "status_code": 400}, 400)
+            except APIException as exc:
+                data = (
+                    exc.detail
+                    if isinstance(exc.detail, dict)
+                    else {"detail": exc.detail}
+                )
+                return json_response(
+                    {**data, "status_code": exc.status_code}, exc.status_code
+                )
+            except ObjectDoesNotExist:
+                return json_response({"detail": "Not found.", "status_code": 404}, 404)
+
+        # `csrf_exempt` wraps views in a sync function, so set the flag directly.
+        wrapper.csrf_exempt = True
+        return wrapper
+
+    return decorator
+
+
+def parse_json(request):
+    if not request.body:
+        return {}
+    return ORJSONParser().parse(
+        BytesIO(request.body),
+        parser_context={"encoding": request.encoding or settings.DEFAULT_CHARSET},
+    )
+
+
+def _create(serializer):
+    instance = serializer.save()
+    # Load what rendering needs here, so nothing is lazily fetched on the loop.
+    if isinstance(instance, Quote):
+        instance.address
+    elif instance.quote is not None:
+        instance.quote.address
+    return instance
+
+
+@async_api_view(["POST"])
+async def quote_create(request):
+    serializer = QuoteSerializer(
+        data=parse_json(request),
+        context={"fieldset": QuoteSerializer.parse_fieldset(request.GET)},
+    )
+    serializer.is_valid(raise_exception=True)
+    quote = await run_db(_create, serializer)
+    return json_response(serializer.to_representation(quote), status=201)
+
+
+def _get_quote(qid):
+    quote = Quote.objects.select_related("address").get(qid=qid)
+    # Loads the rates it was priced with, if not loaded yet, off the loop.
+    price_table_for(quote.rate_version_id)
+    return quote
+
+
+@async_api_view(["GET"])
+async def quote_detail(request, qid):
+    fieldset = QuoteSerializer.parse_fieldset(request.GET)
+    quote = await run_db(_get_quote, qid)
+    return json_response(QuoteSerializer().represent(quote, fieldset))
+
+
+@async_api_view(["POST"])
+async def quote_price(request):
+    """Pricing never touches the database, so it all stays on the loop."""
+    data = parse_json(request)
+    serializer = QuoteSerializer(
+        data=data, context={"fieldset": QuoteSerializer.parse_fieldset(request.GET)}
+    )
+    if not isinstance(data, list):
+        serializer.is_valid(raise_exception=True)
+        return json_response(serializer.price_preview(serializer.validated_data))
+
+    results, valid = validate_items(QuoteSerializer, data)
+    for index, attrs in valid:
+        results[index] = {"status_code": 200, "data": serializer.price_preview(attrs)}
+    return json_response(results)
+
+
+@async_api_view(["POST"])
+async def purchase_create(request):
+    serializer = QuotePurchaseSerializer(
+        data=parse_json(request),
+        context={"fieldset": QuotePurchaseSerializer.parse_fieldset(request.GET)},
+    )
+    serializer.is_valid(raise_exception=True)
+    purchase = await run_db(_create, serializer)
+    return json_response(serializer.to_representation(purchase), status=201)
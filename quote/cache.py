@@ -0,0 +1,138 @@
+"""
+Conditional GET and a server side cache for quote and purchase detail.
+
+The first JSON read of a detail URL renders it as usual and stores the
+rendered body with its ETag and Last-Modified in the `QUOTE_DETAIL_CACHE`
+cache. Later reads are answered from there (or with a 304 when the client's
+`If-None-Match`/`If-Modified-Since` still match) without touching the ORM or
+the serializers. Writes drop the affected entries with `invalidate_quote`
+and `invalidate_purchase`. Entries are always filled from the primary
+database, never from a read replica (see `utils.db_router`).
+
+Each entry holds up to `MAX_CACHED_VARIANTS` renderings of the object, one
+per sparse fieldset (see `quote.fieldsets`) and accepted media type (e.g.
+`application/json; indent=4`), so they're all dropped together.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from utils.db_router import replica_reads
+from utils.metrics import get_metrics
+
+from quote.models import QuotePurchase
+
+__all__ = ["CachedRetrieveMixin", "invalidate_quote", "invalidate_purchase"]
+
+MAX_CACHED_VARIANTS = 8
+
+
+def get_detail_cache():
+    return caches[getattr(settings, "QUOTE_DETAIL_CACHE", "default")]
+
+
+def detail_cache_key(basename, pk):
+    return f"{basename}-detail:{pk}"
+
+
+def media_type_variant(media_type):
+    """`media_type` with its parameters sorted, e.g. `application/json;indent=4`."""
+    main, *params = (part.strip() for part in media_type.split(";"))
+    params = sorted(
+        f"{name.strip()}={value.strip()}"
+        for name, _, value in (param.partition("=") for param in params if param)
+    )
+    return ";".join([main, *params])
+
+
+def invalidate_quote(qid):
+    """Drop the cached quote, and the purchases that embed it."""
+    purchase_ids = QuotePurchase.objects.filter(quote_id=qid).values_list(
+        "pk", flat=True
+    )
+    get_detail_cache().delete_many(
+        [detail_cache_key("quote", qid)]
+        + [detail_cache_key("purchase", pk) for pk in purchase_ids]
+    )
+
+
+def invalidate_purchase(pk):
+    get_detail_cache().delete(detail_cache_key("purchase", pk))
+
+
+class CachedRetrieveMixin:
+    """
+    Adds ETag/Last-Modified to `retrieve` and caches rendered JSON responses.
+    Views implement `get_last_modified(instance)`, and `get_cache_variant()`
+    when the same URL renders differently depending on the request.
+    """
+
+    def get_last_modified(self, instance):
+        return None
+
+    def get_cache_variant(self):
+        return ""
+
+    def retrieve(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != "json":
+            return super().retrieve(request, *args, **kwargs)
+
+        try:
+            # Normalize so e.g. `/purchase/01/` and `/purchase/1/` share a key.
+            pk = self.queryset.model._meta.pk.to_python(
+                kwargs[self.lookup_url_kwarg or self.lookup_field]
+            )
+        except ValidationError:
+            return super().retrieve(request, *args, **kwargs)
+
+        # Renderers take parameters of the media type, e.g. `indent`.
+        variant = (
+            f"{self.get_cache_variant()}"
+            f"|{media_type_variant(request.accepted_media_type)}"
+        )
+        cache = get_detail_cache()
+        key = detail_cache_key(self.basename, pk)
+        variants = cache.get(key) or {}
+        entry = variants.get(variant)
+        get_metrics().inc(
+            "cache_misses_total" if entry is None else "cache_hits_total",
+            {"cache": "quote_detail"},
+        )
+        if entry is None:
+            # From the primary: a lagging replica could hand back a row older
+            # than the write that just invalidated it, which would then be
+            # served from the cache until it expires.
+            with replica_reads(False):
+                instance = self.get_object()
+                data = self.get_serializer(instance).data
+            content = request.accepted_renderer.render(
+                data, request.accepted_media_type, self.get_renderer_context()
+            )
+            last_modified = self.get_last_modified(instance)
+            entry = {
+                "content": content,
+                "content_type": request.accepted_media_type,
+                "etag": '"%s"' % hashlib.md5(content).hexdigest(),
+                "last_modified": last_modified.timestamp() if last_modified else None,
+            }
+            if len(variants) < MAX_CACHED_VARIANTS:
+                variants[variant] = entry
+                cache.set(
+                    key, variants, getattr(settings, "QUOTE_DETAIL_CACHE_TIMEOUT", 300)
+                )
+
+        response = HttpResponse(entry["content"], content_type=entry["content_type"])
+        response["ETag"] = entry["etag"]
+        if entry["last_modified"] is not None:
+            response["Last-Modified"] = http_date(entry["last_modified"])
+        return get_conditional_response(
+            request,
+            etag=entry["etag"],
+            last_modified=entry["last_modified"],
+            response=response,
+        )
@@ -0,0 +1,133 @@
+"""
+Streaming CSV/NDJSON export of every quote or purchase.
+
+Rows are read with one joined query through a chunked `.iterator()` (a
+server side cursor on PostgreSQL) as plain tuples, and written out a batch
+at a time as they arrive, so memory stays flat however many rows there are.
+"""
+import csv
+import io
+from datetime import date
+from datetime import timedelta
+
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.utils import encoders
+
+from quote.stats import parse_day
+from quote.stats import start_of_day
+from utils.renderers import CSVStreamRenderer
+from utils.renderers import NDJSONStreamRenderer
+from utils.renderers import ORJSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+__all__ = ["StreamingExportMixin"]
+
+# Rows fetched from the database, and written to the response, at a time.
+EXPORT_CHUNK_SIZE = 2000
+
+_encoder = encoders.JSONEncoder()
+
+
+def _to_text(value):
+    # Dates and datetimes as the API renders them, the rest as is.
+    if isinstance(value, date):
+        return _encoder.default(value)
+    return value
+
+
+def _batches(rows, size=None):
+    size = size or EXPORT_CHUNK_SIZE
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_stream(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in _batches(rows):
+        writer.writerows([_to_text(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return _encoder.encode(obj).encode()
+
+
+def ndjson_stream(columns, rows):
+    for batch in _batches(rows):
+        yield b"".join(
+            _dumps({name: _to_text(value) for name, value in zip(columns, row)}) + b"\n"
+            for row in batch
+        )
+
+
+class StreamingExportMixin:
+    """
+    `GET <list>/export/?format=csv|ndjson[&start=YYYY-MM-DD][&end=YYYY-MM-DD]`
+    streams every row created in the date range (both included), oldest
+    first. Views set `export_columns`, a list of `(name, lookup)` pairs for
+    `values_list`, and `export_queryset`.
+    """
+
+    export_columns = []
+    export_queryset = None
+
+    def get_export_queryset(self, request):
+        queryset = self.export_queryset.order_by("date_created", "pk")
+        start = parse_day(request.query_params, "start")
+        end = parse_day(request.query_params, "end")
+        if start is not None:
+            queryset = queryset.filter(date_created__gte=start_of_day(start))
+        if end is not None:
+            queryset = queryset.filter(
+                date_created__lt=start_of_day(end + timedelta(days=1))
+            )
+        return queryset
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        # Export errors are JSON, whatever format was asked for.
+        if self.action == "export" and isinstance(response, Response):
+            request.accepted_renderer = ORJSONRenderer()
+            request.accepted_media_type = ORJSONRenderer.media_type
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    @action(
+        detail=False,
+        methods=["get"],
+        renderer_classes=[CSVStreamRenderer, NDJSONStreamRenderer],
+    )
+    def export(self, request):
+        columns = [name for name, _ in self.export_columns]
+        rows = (
+            self.get_export_queryset(request)
+            .values_list(*(lookup for _, lookup in self.export_columns))
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        renderer = request.accepted_renderer
+        stream = ndjson_stream if renderer.format == "ndjson" else csv_stream
+        response = StreamingHttpResponse(
+            stream(columns, rows),
+            content_type=f"{renderer.media_type}; charset=utf-8",
+        )
+        filename = f"{self.basename}s.{renderer.format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
@@ -0,0 +1,160 @@
+"""
+Sparse fieldsets for quote and purchase responses.
+
+`?fields=qid,cost_monthly` renders only the listed fields and
+`?exclude=breakdown_monthly` everything but them. Fields of the quote a
+purchase embeds are named with a `quote.` prefix (`?fields=pk,quote.qid`).
+`?breakdown=compact` renders each breakdown as just the fees and discounts
+that apply, with their amount (the multipliers only depend on the rate
+version), and `?breakdown=none` leaves the breakdowns out.
+
+The serializers skip computing what isn't rendered, e.g. no breakdown is
+looked up for `?breakdown=none`, and an unknown field or mode is a 400.
+"""
+from types import MappingProxyType
+
+__all__ = [
+    "BREAKDOWN_MODES",
+    "Fieldset",
+    "SparseFieldsetMixin",
+    "compact_breakdown",
+]
+
+BREAKDOWN_MODES = ("full", "compact", "none")
+BREAKDOWN_FIELDS = ("breakdown_monthly", "breakdown_biannually")
+
+
+def _names(params, param):
+    value = params.get(param) or ""
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+class Fieldset:
+    """
+    The fields to render (`name in fieldset`), the breakdown mode and, per
+    embedded serializer, its own `Fieldset` in `nested`.
+    """
+
+    __slots__ = ("names", "breakdown", "nested")
+
+    def __init__(self, names, breakdown="full", nested=None):
+        self.names = frozenset(names)
+        self.breakdown = breakdown
+        self.nested = nested or {}
+
+    def __contains__(self, name):
+        return name in self.names
+
+    @property
+    def key(self):
+        """The same string for the same fieldset, whatever the query string."""
+        nested = "".join(
+            f";{name}({fieldset.key})" for name, fieldset in sorted(self.nested.items())
+        )
+        return f"{','.join(sorted(self.names))};{self.breakdown}{nested}"
+
+    @classmethod
+    def parse(cls, params, fields, nested=None):
+        """
+        The fieldset `params` (the query parameters) ask for, out of `fields`
+        and the fields of the `nested` serializers, a dict of the field name
+        to the nested field names. Raises `ValueError` for unknown fields.
+        """
+        nested = nested or {}
+        breakdown = params.get("breakdown") or "full"
+        if breakdown not in BREAKDOWN_MODES:
+            raise ValueError(
+                f"`breakdown` must be one of {', '.join(BREAKDOWN_MODES)}."
+            )
+
+        def split(param):
+            top, below = set(), {}
+            for name in _names(params, param):
+                parent, _, child = name.partition(".")
+                if parent not in fields or (
+                    child and child not in nested.get(parent, ())
+                ):
+                    raise ValueError(f"Unknown field `{name}` in `{param}`.")
+                if child:
+                    below.setdefault(parent, set()).add(child)
+                else:
+                    top.add(parent)
+            return top, below
+
+        requested, requested_below = split("fields")
+        excluded, excluded_below = split("exclude")
+        if requested or requested_below:
+            names = requested | set(requested_below)
+        else:
+            names = set(fields)
+        names -= excluded
+        if breakdown == "none":
+            names.difference_update(BREAKDOWN_FIELDS)
+
+        fieldsets = {}
+        for parent, children in nested.items():
+            if parent not in names:
+                continue
+            if parent in requested or parent not in requested_below:
+                below = set(children)
+            else:
+                below = requested_below[parent]
+            below -= excluded_below.get(parent, set())
+            if breakdown == "none":
+                below.difference_update(BREAKDOWN_FIELDS)
+            fieldsets[parent] = cls(below, breakdown)
+        return cls(names, breakdown, fieldsets)
+
+
+# id(breakdown) -> (breakdown, its compact form). The breakdowns are mostly
+# the few shared ones of `quote.pricing.PriceTable`, kept alive here so their
+# ids aren't reused.
+_compact = {}
+MAX_COMPACT_BREAKDOWNS = 1024
+
+
+def compact_breakdown(breakdown):
+    """Only the fees and discounts that apply, with their amount."""
+    entry = _compact.get(id(breakdown))
+    if entry is not None and entry[0] is breakdown:
+        return entry[1]
+    # Read only, like the breakdowns, as it's shared too.
+    compact = MappingProxyType(
+        {
+            group: MappingProxyType(
+                {
+                    name: modifier["money"]
+                    for name, modifier in modifiers.items()
+                    if modifier["applies"]
+                }
+            )
+            for group, modifiers in breakdown.items()
+        }
+    )
+    if len(_compact) >= MAX_COMPACT_BREAKDOWNS:
+        _compact.clear()
+    _compact[id(breakdown)] = (breakdown, compact)
+    return compact
+
+
+class SparseFieldsetMixin:
+    """
+    Parses the request's fieldset once and passes it to the serializers as
+    `context["fieldset"]`. The serializer class implements
+    `parse_fieldset(params)`.
+    """
+
+    def get_fieldset(self):
+        if not hasattr(self, "_fieldset"):
+            request = getattr(self, "request", None)
+            params = {} if request is None else request.query_params
+            self._fieldset = self.get_serializer_class().parse_fieldset(params)
+        return self._fieldset
+
+    def get_cache_variant(self):
+        return self.get_fieldset().key
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fieldset"] = self.get_fieldset()
+        return context
@@ -0,0 +1,357 @@
+"""
+Bulk import of quotes, and their purchases, from CSV/NDJSON files
+(`manage.py import_quotes`).
+
+Rows are read lazily, a batch at a time, and validated (with the same rules
+as the API, `QuoteSerializer`) and priced, at the rate version current when
+the import starts, in worker processes. The main
+process resolves the addresses of each batch in bulk, through the address
+cache, and writes the quotes, then their purchases, with `bulk_create`,
+committing every
+`transaction_size` rows along with an `ImportCheckpoint`, so an interrupted
+import picks up right after its last commit.
+
+The input has the columns of the quote export: `date_effective`,
+`date_previous_canceled`, `is_owned`, `state` and `zipcode`, and optionally
+`qid` and `date_created` (kept as they are, new quotes get a generated qid
+and the import time). NDJSON rows may also nest the address like the API.
+A row with a `payment_frequency` (`Monthly` or `Biannually`) was purchased:
+the purchase is built from the imported quote like the API's
+(`QuotePurchaseSerializer.build`), dated `date_purchased` if given, else
+when the quote was created. Each commit recomputes the daily stats of the
+past days it wrote rows for (`quote.stats.refresh_days`).
+"""
+import csv
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from multiprocessing import get_context
+
+from django.utils import timezone
+from rest_framework import serializers
+
+from quote.models import Address
+from quote.models import ImportCheckpoint
+from quote.models import Quote
+from quote.models import QuotePurchase
+from quote.models import chunked
+from quote.models import with_fresh_addresses
+from quote.pricing import get_price_table
+from quote.pricing import init_worker
+from quote.rates import refresh_rates
+from quote.serializers import QuotePurchaseSerializer
+from quote.serializers import QuoteSerializer
+from quote.stats import refresh_days
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+__all__ = ["FORMATS", "read_rows", "prepare_batch", "QuoteImporter"]
+
+FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+QID_TOO_LONG = "Ensure this field has no more than 10 characters."
+
+_date_created = serializers.DateTimeField()
+_payment_frequency = serializers.ChoiceField(
+    [label for _, label in QuotePurchase.PaymentFrequencyOptions.choices]
+)
+
+
+def read_rows(file, format):
+    """Yield the rows of an open text file as dicts, empty CSV cells as `None`."""
+    if format == "csv":
+        for row in csv.DictReader(file):
+            yield {name: value if value != "" else None for name, value in row.items()}
+        return
+    loads = orjson.loads if orjson is not None else json.loads
+    for line in file:
+        if line.strip():
+            yield loads(line)
+
+
+def _purchase(row):
+    # The purchase's fields, None when the quote wasn't purchased. Raises
+    # `ValidationError` with the errors keyed by column.
+    if row.get("payment_frequency") is None:
+        if row.get("date_purchased") is not None:
+            raise serializers.ValidationError(
+                {"payment_frequency": ["Required with `date_purchased`."]}
+            )
+        return None
+    purchase = {}
+    for name, column, field in [
+        ("payment_frequency", "payment_frequency", _payment_frequency),
+        ("date_created", "date_purchased", _date_created),
+    ]:
+        value = row.get(column)
+        try:
+            purchase[name] = None if value is None else field.run_validation(value)
+        except serializers.ValidationError as exc:
+            raise serializers.ValidationError({column: exc.detail})
+    return purchase
+
+
+def _quote_data(row):
+    # The payload `QuoteSerializer` takes, from a flat or nested row.
+    data = {
+        name: row[name]
+        for name in ["qid", "date_effective", "date_previous_canceled", "is_owned"]
+        if row.get(name) is not None
+    }
+    address = row.get("address") or {
+        "state": row.get("state"),
+        "zipcode": row.get("zipcode"),
+    }
+    data["address"] = {
+        name: value for name, value in address.items() if value is not None
+    }
+    return data
+
+
+def prepare_batch(rows):
+    """
+    Validate and price a batch of `(row number, row)`. Returns `(valid,
+    invalid, last row number)`: `valid` holds `(row number, Quote field
+    values)` with `zipcode`/`state` in place of the address and the
+    `purchase` (see `_purchase`), `invalid` holds
+    `(row number, errors)`. Runs in the worker processes, so it doesn't touch
+    the database.
+    """
+    # One serializer for the whole batch: building its fields is most of
+    # the cost of validating a row.
+    serializer = QuoteSerializer()
+    prices = get_price_table()
+    valid, invalid = [], []
+    for number, row in rows:
+        try:
+            attrs = serializer.run_validation(_quote_data(row))
+        except serializers.ValidationError as exc:
+            invalid.append((number, exc.detail))
+            continue
+        except ValueError as exc:
+            invalid.append((number, {"detail": exc.args[0] if exc.args else ""}))
+            continue
+        qid = attrs.get("qid") or ""
+        if len(qid) > Quote._meta.pk.max_length:
+            invalid.append((number, {"qid": [QID_TOO_LONG]}))
+            continue
+        date_created = row.get("date_created")
+        if date_created is not None:
+            try:
+                date_created = _date_created.run_validation(date_created)
+            except serializers.ValidationError as exc:
+                invalid.append((number, {"date_created": exc.detail}))
+                continue
+        try:
+            purchase = _purchase(row)
+        except serializers.ValidationError as exc:
+            invalid.append((number, exc.detail))
+            continue
+        address = attrs["address"]
+        fields = {
+            "qid": qid,
+            "date_created": date_created,
+            "date_effective": attrs["date_effective"],
+            "date_previous_canceled": attrs.get("date_previous_canceled"),
+            "is_owned": attrs["is_owned"],
+            "zipcode": int(address["zipcode"]),
+            "state": address["state"],
+        }
+        fields.update(
+            prices.fields(
+                address["state"],
+                fields["date_previous_canceled"] is not None,
+                bool(fields["is_owned"]),
+            )
+        )
+        fields["rate_version_id"] = prices.version
+        fields["purchase"] = purchase
+        valid.append((number, fields))
+    return valid, invalid, rows[-1][0]
+
+
+class QuoteImporter:
+    """
+    Import rows into the quotes and purchases tables, see the module docstring. `workers=0`
+    validates and prices in the main process. `on_invalid(row number,
+    errors)` and `on_commit(checkpoint)` are called as the import goes.
+    """
+
+    def __init__(
+        self,
+        name,
+        batch_size=1000,
+        transaction_size=10000,
+        workers=0,
+        skip_existing=False,
+        on_invalid=None,
+        on_commit=None,
+    ):
+        self.name = name
+        self.batch_size = batch_size
+        self.transaction_size = transaction_size
+        self.workers = workers
+        self.skip_existing = skip_existing
+        self.on_invalid = on_invalid
+        self.on_commit = on_commit
+
+    def checkpoint(self):
+        return ImportCheckpoint.objects.get_or_create(name=self.name)[0]
+
+    def restart(self):
+        ImportCheckpoint.objects.filter(name=self.name).delete()
+
+    def _prepared(self, batches):
+        if not self.workers:
+            yield from map(prepare_batch, batches)
+            return
+        # Fresh interpreters rather than forks of this one, which holds open
+        # database connections; Django has to be set up before this module
+        # can be imported there. They price with the rates this process
+        # loaded. Only a few batches are in flight at a time.
+        table = get_price_table()
+        with ProcessPoolExecutor(
+            self.workers,
+            mp_context=get_context("spawn"),
+            initializer=init_worker,
+            initargs=(table.rates.definition, table.version),
+        ) as pool:
+            in_flight = deque()
+            for batch in batches:
+                in_flight.append(pool.submit(prepare_batch, batch))
+                if len(in_flight) >= 2 * self.workers:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+
+    def run(self, rows):
+        """Import `rows` (dicts) past the checkpoint. Returns the report."""
+        start = time.perf_counter()
+        # The whole import prices with the rates current when it starts.
+        refresh_rates(force=True)
+        checkpoint = self.checkpoint()
+        resumed_from = checkpoint.rows_done
+        remaining = enumerate(islice(rows, resumed_from, None), start=resumed_from + 1)
+
+        totals = {"rows": 0, "imported": 0, "purchases": 0, "invalid": 0, "skipped": 0}
+        pending, invalid, last = [], 0, resumed_from
+        for valid, errors, last in self._prepared(chunked(remaining, self.batch_size)):
+            pending.extend(fields for _, fields in valid)
+            invalid += len(errors)
+            if self.on_invalid:
+                for number, row_errors in errors:
+                    self.on_invalid(number, row_errors)
+            if last - checkpoint.rows_done >= self.transaction_size:
+                self._commit(checkpoint, pending, last, invalid, totals)
+                pending, invalid = [], 0
+        if last > checkpoint.rows_done:
+            self._commit(checkpoint, pending, last, invalid, totals)
+
+        elapsed = time.perf_counter() - start
+        return {
+            "name": self.name,
+            "resumed_from": resumed_from,
+            **totals,
+            "elapsed_s": round(elapsed, 3),
+            "rows_per_second": round(totals["rows"] / elapsed, 1) if elapsed else None,
+        }
+
+    def _existing(self, pending):
+        qids = [fields["qid"] for fields in pending if fields["qid"]]
+        existing = set()
+        for chunk in chunked(qids):
+            existing.update(
+                Quote.objects.filter(qid__in=chunk).values_list("qid", flat=True)
+            )
+        return existing
+
+    def _commit(self, checkpoint, pending, rows_done, invalid, totals):
+        def write():
+            # The saved progress, also after a rolled back attempt.
+            checkpoint.refresh_from_db()
+            return self._write(checkpoint, pending, rows_done, invalid)
+
+        rows, imported, purchases, skipped = with_fresh_addresses(write)
+        totals["rows"] += rows
+        totals["imported"] += imported
+        totals["purchases"] += purchases
+        totals["invalid"] += invalid
+        totals["skipped"] += skipped
+        if self.on_commit:
+            self.on_commit(checkpoint)
+
+    def _write(self, checkpoint, pending, rows_done, invalid):
+        skipped = 0
+        if self.skip_existing:
+            existing = self._existing(pending)
+            if existing:
+                count = len(pending)
+                pending = [
+                    fields for fields in pending if fields["qid"] not in existing
+                ]
+                skipped = count - len(pending)
+        # Mostly answered from the address cache.
+        addresses = Address.objects.get_or_create_many(
+            (fields["zipcode"], fields["state"]) for fields in pending
+        )
+        quotes, dated, purchased = [], [], []
+        for fields in pending:
+            fields = dict(fields)
+            purchase = fields.pop("purchase")
+            address = addresses[(fields.pop("zipcode"), fields.pop("state"))]
+            date_created = fields.pop("date_created")
+            quote = Quote(address=address, **fields)
+            quotes.append(quote)
+            if date_created is not None:
+                dated.append((quote, date_created))
+            if purchase is not None:
+                purchased.append((quote, purchase))
+        # `auto_now_add` dates every row as it's inserted; the imported dates
+        # are written back right after.
+        Quote.objects.bulk_create(quotes, batch_size=self.batch_size)
+        for quote, date_created in dated:
+            quote.date_created = date_created
+        Quote.objects.bulk_update(
+            [quote for quote, _ in dated], ["date_created"], batch_size=self.batch_size
+        )
+
+        # After the quotes, which now have their qids.
+        purchases, purchase_dates = [], {}
+        for quote, attrs in purchased:
+            purchases.append(
+                QuotePurchaseSerializer.build(
+                    quote, {"payment_frequency": attrs["payment_frequency"]}
+                )
+            )
+            purchase_dates[quote.qid] = attrs["date_created"] or quote.date_created
+        QuotePurchase.objects.bulk_create(purchases, batch_size=self.batch_size)
+        # The quotes are new, so their only purchases are the ones just
+        # inserted, whose ids SQLite's `bulk_create` doesn't return.
+        for chunk in chunked(purchase_dates):
+            inserted = list(
+                QuotePurchase.objects.filter(quote_id__in=chunk).only("pk", "quote_id")
+            )
+            for purchase in inserted:
+                purchase.date_created = purchase_dates[purchase.quote_id]
+            QuotePurchase.objects.bulk_update(
+                inserted, ["date_created"], batch_size=self.batch_size
+            )
+
+        # Past days the summary tables cover don't get revisited otherwise.
+        refresh_days(
+            {timezone.localdate(date) for _, date in dated},
+            {timezone.localdate(date) for date in purchase_dates.values()},
+        )
+
+        rows = rows_done - checkpoint.rows_done
+        checkpoint.rows_done = rows_done
+        checkpoint.imported += len(quotes)
+        checkpoint.invalid += invalid
+        checkpoint.skipped += skipped
+        checkpoint.save()
+        return rows, len(quotes), len(purchase_dates), skipped
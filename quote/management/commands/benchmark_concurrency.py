@@ -0,0 +1,170 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime
+from datetime import timezone
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+
+from quote.models import Address
+from quote.models import Quote
+from utils.benchmark import asgi_request
+from utils.benchmark import summarize
+from utils.benchmark import temporary_database
+from utils.benchmark import wsgi_request
+
+QUOTE = {
+    "date_effective": "2022-01-01T00:00:00.000",
+    "date_previous_canceled": "2022-01-01",
+    "is_owned": False,
+    "address": {"state": "WA", "zipcode": "99999"},
+}
+
+# scenario: (method, DRF path, async path, body)
+SCENARIOS = {
+    "create": ("POST", "/quote/quotes/", "/quote/async/quotes/", QUOTE),
+    "retrieve": ("GET", "/quote/quotes/{qid}/", "/quote/async/quotes/{qid}/", None),
+    "price": ("POST", "/quote/quotes/price/", "/quote/async/quotes/price/", QUOTE),
+    "purchase": (
+        "POST",
+        "/quote/purchase/",
+        "/quote/async/purchase/",
+        {"quote_id": "{qid}", "payment_frequency": "Monthly"},
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync DRF endpoints served through WSGI (a fixed pool of "
+        "server threads) with the async endpoints served through ASGI, at many "
+        "concurrent clients, on a throwaway SQLite database. Runs in process, "
+        "so it measures the app and not the network or server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=100)
+        parser.add_argument("--requests", type=int, default=10, help="per client")
+        parser.add_argument(
+            "--wsgi-threads",
+            type=int,
+            default=8,
+            help="Worker threads of the simulated WSGI server.",
+        )
+        parser.add_argument(
+            "--scenario", choices=sorted(SCENARIOS), action="append", dest="scenarios"
+        )
+
+    def requests_for(self, scenario, is_async, clients, per_client, qids):
+        method, sync_path, async_path, body = SCENARIOS[scenario]
+        path = async_path if is_async else sync_path
+        per_client_requests = []
+        for client in range(clients):
+            requests = []
+            for index in range(per_client):
+                qid = qids[(client * per_client + index) % len(qids)]
+                payload = b""
+                if body is not None:
+                    payload = json.dumps(body).replace("{qid}", qid).encode()
+                requests.append((method, path.format(qid=qid), payload))
+            per_client_requests.append(requests)
+        return per_client_requests
+
+    def run_wsgi(self, application, per_client_requests, server_threads):
+        slots = threading.Semaphore(server_threads)
+        latencies, errors = [], []
+
+        def client(requests):
+            for method, path, body in requests:
+                start = time.perf_counter()
+                with slots:
+                    status, _ = wsgi_request(application, method, path, body)
+                latencies.append(time.perf_counter() - start)
+                if status >= 400:
+                    errors.append(status)
+
+        threads = [
+            threading.Thread(target=client, args=(requests,))
+            for requests in per_client_requests
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return summarize(latencies, time.perf_counter() - start, len(errors))
+
+    def run_asgi(self, application, per_client_requests):
+        latencies, errors = [], []
+
+        async def client(requests):
+            for method, path, body in requests:
+                start = time.perf_counter()
+                status, _ = await asgi_request(application, method, path, body)
+                latencies.append(time.perf_counter() - start)
+                if status >= 400:
+                    errors.append(status)
+
+        async def run():
+            await asyncio.gather(
+                *(client(requests) for requests in per_client_requests)
+            )
+
+        start = time.perf_counter()
+        asyncio.run(run())
+        return summarize(latencies, time.perf_counter() - start, len(errors))
+
+    def seed(self, count):
+        address, _ = Address.objects.get_or_create(zipcode=99999, state="WA")
+        quotes = Quote.objects.bulk_create(
+            Quote(
+                date_effective=datetime(2022, 1, 1, tzinfo=timezone.utc),
+                is_owned=bool(index % 2),
+                address=address,
+            )
+            for index in range(count)
+        )
+        return [quote.qid for quote in quotes]
+
+    def handle(self, *args, **options):
+        clients, per_client = options["clients"], options["requests"]
+        scenarios = options["scenarios"] or sorted(SCENARIOS)
+        results = {}
+        # No debug query log, no query count header and no detail cache, so
+        # both paths do the same work.
+        with override_settings(
+            DEBUG=False,
+            QUERY_COUNT_HEADER=False,
+            CACHES={
+                "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+            },
+        ), temporary_database():
+            qids = self.seed(200)
+            wsgi, asgi = get_wsgi_application(), get_asgi_application()
+            for scenario in scenarios:
+                results[scenario] = {
+                    "wsgi": self.run_wsgi(
+                        wsgi,
+                        self.requests_for(scenario, False, clients, per_client, qids),
+                        options["wsgi_threads"],
+                    ),
+                    "asgi": self.run_asgi(
+                        asgi,
+                        self.requests_for(scenario, True, clients, per_client, qids),
+                    ),
+                }
+        self.stdout.write(
+            json.dumps(
+                {
+                    "clients": clients,
+                    "requests_per_client": per_client,
+                    "wsgi_threads": options["wsgi_threads"],
+                    "scenarios": results,
+                },
+                indent=2,
+            )
+        )
@@ -0,0 +1,102 @@
+import json
+import time
+from datetime import date
+from datetime import datetime
+from datetime import timezone
+
+from django.core.management.base import BaseCommand
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+
+from quote.models import Address
+from quote.models import Quote
+from quote.models import QuotePurchase
+from quote.serializers import QuotePurchaseSerializer
+from quote.serializers import QuoteSerializer
+from utils.renderers import ORJSONRenderer
+
+
+class GenericQuoteSerializer(QuoteSerializer):
+    """The field by field `ModelSerializer` path the API used before."""
+
+    to_representation = serializers.ModelSerializer.to_representation
+
+
+class GenericQuotePurchaseSerializer(QuotePurchaseSerializer):
+    quote = GenericQuoteSerializer(read_only=True, required=False)
+
+    to_representation = serializers.ModelSerializer.to_representation
+
+
+def make_rows(count):
+    """In memory rows covering every pricing class, so no database is needed."""
+    addresses = [Address(zipcode=99999, state="WA"), Address(zipcode=44444, state="OH")]
+    purchases = []
+    for index in range(count):
+        quote = Quote(
+            qid=f"{index:010d}",
+            date_effective=datetime(2022, 1, 1, 12, 30, tzinfo=timezone.utc),
+            date_previous_canceled=date(2021, 6, 1) if index % 2 else None,
+            is_owned=bool(index % 3),
+            address=addresses[index % 2],
+        )
+        purchases.append(
+            QuotePurchase(
+                pk=index,
+                quote=quote,
+                payment_amount=quote.cost_and_breakdown_monthly[0],
+                payment_frequency="Monthly",
+            )
+        )
+    return purchases
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure rows/second of serializing and rendering quote and purchase "
+        "lists, with the generic ModelSerializer + stdlib JSON path and with "
+        "the hand-built serializers + orjson renderer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def measure(self, serializer_class, renderer, rows, repeat):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            data = serializer_class(rows, many=True).data
+            renderer.render(data, "application/json")
+            best = min(best, time.perf_counter() - start)
+        return round(len(rows) / best)
+
+    def handle(self, *args, **options):
+        purchases = make_rows(options["rows"])
+        quotes = [purchase.quote for purchase in purchases]
+        repeat = options["repeat"]
+
+        results = {}
+        for name, rows, before, after in [
+            ("quotes", quotes, GenericQuoteSerializer, QuoteSerializer),
+            (
+                "purchases",
+                purchases,
+                GenericQuotePurchaseSerializer,
+                QuotePurchaseSerializer,
+            ),
+        ]:
+            results[name] = {
+                "rows": len(rows),
+                "before_rows_per_second": self.measure(
+                    before, JSONRenderer(), rows, repeat
+                ),
+                "after_rows_per_second": self.measure(
+                    after, ORJSONRenderer(), rows, repeat
+                ),
+            }
+            # Both paths must produce the same bytes.
+            assert JSONRenderer().render(
+                before(rows[:100], many=True).data
+            ) == ORJSONRenderer().render(after(rows[:100], many=True).data)
+        self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,112 @@
+import json
+import random
+import threading
+import time
+from datetime import datetime
+from datetime import timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+from django.db import connection
+from django.db import transaction
+from django.test.utils import override_settings
+
+from quote.models import Address
+from quote.models import Quote
+from utils.benchmark import summarize
+from utils.benchmark import temporary_database
+
+
+def write(address, qids):
+    with transaction.atomic():
+        quote = Quote.objects.create(
+            date_effective=datetime(2022, 1, 1, tzinfo=timezone.utc),
+            is_owned=False,
+            address=address,
+        )
+    qids.append(quote.qid)
+
+
+def read(address, qids):
+    Quote.objects.select_related("address").get(qid=random.choice(qids))
+    list(Quote.objects.select_related("address").order_by("-date_created")[:10])
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent readers and writers against a throwaway SQLite file, "
+        "once with SQLite's defaults and once with settings.SQLITE_PRAGMAS, "
+        "and print throughput, latency percentiles and lock errors of each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument(
+            "--duration", type=float, default=5.0, help="Seconds per configuration."
+        )
+
+    def run(self, readers, writers, duration):
+        address = Address.objects.create(zipcode=99999, state="WA")
+        qids = []
+        for _ in range(100):
+            write(address, qids)
+        results = {"read": ([], []), "write": ([], [])}
+        deadline = time.perf_counter() + duration
+
+        def worker(operation, latencies, errors):
+            try:
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    try:
+                        operation(address, qids)
+                    except OperationalError as exc:
+                        # "database is locked"
+                        errors.append(str(exc))
+                    else:
+                        latencies.append(time.perf_counter() - start)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(read, *results["read"]))
+            for _ in range(readers)
+        ] + [
+            threading.Thread(target=worker, args=(write, *results["write"]))
+            for _ in range(writers)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        return {
+            name: summarize(latencies, elapsed, len(errors))
+            for name, (latencies, errors) in results.items()
+        }
+
+    def handle(self, *args, **options):
+        configurations = {"defaults": {}, "tuned": settings.SQLITE_PRAGMAS}
+        report = {}
+        for name, pragmas in configurations.items():
+            with override_settings(DEBUG=False, SQLITE_PRAGMAS=pragmas):
+                with temporary_database():
+                    report[name] = {
+                        "pragmas": {k: v for k, v in pragmas.items() if v != ""},
+                        **self.run(
+                            options["readers"], options["writers"], options["duration"]
+                        ),
+                    }
+        self.stdout.write(
+            json.dumps(
+                {
+                    "readers": options["readers"],
+                    "writers": options["writers"],
+                    "duration_s": options["duration"],
+                    "configurations": report,
+                },
+                indent=2,
+            )
+        )
@@ -0,0 +1,97 @@
+import re
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from quote.models import Quote
+from quote.models import QuotePurchase
+from quote.views import QuotePurchaseViewSet
+from quote.views import QuoteViewSet
+from utils.pagination import KeysetPagination
+
+# A `SCAN` step that doesn't go through an index reads the whole table.
+FULL_SCAN = re.compile(r"\bSCAN (TABLE )?(?P<table>\w+)(?!.*\bUSING\b)")
+
+
+def hot_queries():
+    """(name, queryset) for the queries the list/detail endpoints run."""
+    keyset = KeysetPagination()
+    page_size = keyset.page_size
+    deep_offset = page_size * 99
+    now = timezone.now()
+    queries = []
+    for name, viewset, pk in [
+        ("quote", QuoteViewSet, "0000000000"),
+        ("purchase", QuotePurchaseViewSet, 1),
+    ]:
+        queryset = viewset.queryset
+        queries += [
+            (f"{name}-list page 1", queryset[:page_size]),
+            (f"{name}-list page 100", queryset[deep_offset:][:page_size]),
+            (
+                f"{name}-list first cursor page",
+                keyset.get_page_queryset(queryset, None, page_size),
+            ),
+            (
+                f"{name}-list next cursor page",
+                keyset.get_page_queryset(queryset, (now, pk, False), page_size),
+            ),
+            (
+                f"{name}-list previous cursor page",
+                keyset.get_page_queryset(queryset, (now, pk, True), page_size),
+            ),
+            (f"{name}-detail", queryset.filter(pk=pk)),
+        ]
+    queries += [
+        (
+            "quotes by state",
+            Quote.objects.filter(address__state="WA").order_by("-date_created"),
+        ),
+        (
+            "quotes over $80 biannually",
+            Quote.objects.filter(cost_biannually__gt=80).order_by("-cost_biannually"),
+        ),
+        (
+            "purchases of a quote",
+            QuotePurchase.objects.filter(quote_id="0000000000").order_by(
+                "-date_created"
+            ),
+        ),
+    ]
+    return queries
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN on the queries behind the quote and purchase list/detail "
+        "endpoints and flag any full table scans."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to explain against (default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        scans = []
+        for name, queryset in hot_queries():
+            plan = queryset.using(options["database"]).explain()
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for line in plan.splitlines():
+                match = FULL_SCAN.search(line)
+                if match:
+                    scans.append((name, match.group("table")))
+                    self.stdout.write(self.style.ERROR(f"  {line}  <-- full scan"))
+                else:
+                    self.stdout.write(f"  {line}")
+
+        if scans:
+            raise CommandError(
+                "Full table scans: "
+                + ", ".join(f"{table} in {name}" for name, table in scans)
+            )
+        self.stdout.write(self.style.SUCCESS("No full table scans."))
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from insurance_api.schema import generate_schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the OpenAPI document into OPENAPI_SCHEMA_PATH, where "
+        "/swagger.json, /swagger/ and /redoc/ serve it from. Run it at build "
+        "time, and again whenever the API changes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output", help="Where to write it (default: OPENAPI_SCHEMA_PATH)."
+        )
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Write nothing, fail if the file is missing or out of date.",
+        )
+
+    def handle(self, *args, **options):
+        path = str(options["output"] or settings.OPENAPI_SCHEMA_PATH)
+        start = time.perf_counter()
+        content = generate_schema()
+        elapsed = time.perf_counter() - start
+
+        if options["check"]:
+            try:
+                with open(path, "rb") as file:
+                    current = file.read()
+            except FileNotFoundError:
+                current = None
+            if current != content:
+                raise CommandError(
+                    f"{path} is out of date, run `python manage.py generate_schema`."
+                )
+            self.stdout.write(f"{path} is up to date.")
+            return
+
+        # Written next to the target and renamed over it, so it's never
+        # served half written.
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile("wb", dir=directory, delete=False) as file:
+            file.write(content)
+        # Temporary files are private (0600); the server may run as another
+        # user.
+        os.chmod(file.name, 0o644)
+        os.replace(file.name, path)
+        self.stdout.write(
+            f"Wrote {path} ({len(content)} bytes) in {elapsed * 1000:.0f}ms."
+        )
@@ -0,0 +1,119 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import IntegrityError
+
+from quote.importer import FORMATS
+from quote.importer import QuoteImporter
+from quote.importer import read_rows
+
+
+def positive_int(value):
+    value = int(value)
+    if value < 1:
+        raise ValueError(value)
+    return value
+
+
+class Command(BaseCommand):
+    help = (
+        "Import quotes from a CSV or NDJSON file (the columns of the quote "
+        "export), and the purchases of the rows with a payment_frequency, "
+        "validated with the API's rules, priced in worker processes and "
+        "written in batches. An interrupted import resumes where its last "
+        "transaction left off. Prints a report with the throughput as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="The file to import.")
+        parser.add_argument(
+            "--format",
+            choices=sorted(set(FORMATS.values())),
+            help="The file format (default: from the file extension).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=positive_int,
+            default=1000,
+            help="Rows validated and priced, and inserted, at a time.",
+        )
+        parser.add_argument(
+            "--transaction-size",
+            type=positive_int,
+            default=10000,
+            help="Rows committed, and checkpointed, at a time.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Processes validating and pricing rows (0: none, do it inline).",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Name the progress is saved under (default: the file's path).",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Start from the first row, ignoring any saved progress.",
+        )
+        parser.add_argument(
+            "--skip-existing",
+            action="store_true",
+            help="Skip rows whose qid already exists instead of failing.",
+        )
+        parser.add_argument(
+            "--errors",
+            help="Append the invalid rows' numbers and errors to this NDJSON file.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"] or FORMATS.get(os.path.splitext(path)[1].lower())
+        if format is None:
+            raise CommandError(
+                f'Can\'t tell the format of "{path}", pass --format csv or ndjson.'
+            )
+        if options["workers"] < 0:
+            raise CommandError("--workers can't be negative.")
+
+        errors_file = open(options["errors"], "a") if options["errors"] else None
+
+        def on_invalid(number, errors):
+            if errors_file:
+                errors_file.write(json.dumps({"row": number, "errors": errors}) + "\n")
+
+        def on_commit(checkpoint):
+            if options["verbosity"] > 1:
+                self.stderr.write(
+                    f"{checkpoint.rows_done} rows done, {checkpoint.imported} "
+                    f"imported, {checkpoint.invalid} invalid."
+                )
+
+        importer = QuoteImporter(
+            options["checkpoint"] or f"quotes:{os.path.abspath(path)}",
+            batch_size=options["batch_size"],
+            transaction_size=options["transaction_size"],
+            workers=options["workers"],
+            skip_existing=options["skip_existing"],
+            on_invalid=on_invalid,
+            on_commit=on_commit,
+        )
+        if options["restart"]:
+            importer.restart()
+        try:
+            with open(path, newline="") as file:
+                report = importer.run(read_rows(file, format))
+        except IntegrityError as exc:
+            raise CommandError(
+                f"{exc}. Rows up to the last checkpoint "
+                f"({importer.checkpoint().rows_done}) are imported; fix the "
+                "file, or pass --skip-existing, and run again to resume."
+            )
+        finally:
+            if errors_file:
+                errors_file.close()
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,66 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import transaction
+
+from quote.models import RateVersion
+from quote.rates import publish_rates
+from quote.rates import refresh_rates
+
+
+class Command(BaseCommand):
+    help = (
+        "Publish a rate definition from a JSON file as the new current rate "
+        "version. Running workers pick it up within RATES_RELOAD_INTERVAL "
+        "seconds; quotes keep the version they were priced with. --show "
+        "prints the current definition, a starting point for the next one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", help="The JSON rate definition.")
+        parser.add_argument("--note", default="", help="What changed, for the record.")
+        parser.add_argument(
+            "--from-version",
+            type=int,
+            help="Publish the definition of this older version again (a rollback).",
+        )
+        parser.add_argument(
+            "--show",
+            action="store_true",
+            help="Print the current version and its definition, and exit.",
+        )
+
+    def handle(self, *args, **options):
+        if options["show"]:
+            table = refresh_rates(force=True)
+            self.stdout.write(
+                json.dumps(
+                    {"version": table.version, "definition": table.rates.definition},
+                    indent=2,
+                )
+            )
+            return
+
+        if (options["path"] is None) == (options["from_version"] is None):
+            raise CommandError("Pass either a path or --from-version.")
+        if options["path"] is not None:
+            try:
+                with open(options["path"]) as file:
+                    definition = json.load(file)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Can\'t read "{options["path"]}": {exc}')
+        else:
+            try:
+                definition = RateVersion.objects.get(
+                    pk=options["from_version"]
+                ).definition
+            except RateVersion.DoesNotExist:
+                raise CommandError(f"No rate version {options['from_version']}.")
+
+        try:
+            with transaction.atomic():
+                version = publish_rates(definition, options["note"])
+        except ValueError as exc:
+            raise CommandError(f"Invalid rate definition: {exc}")
+        self.stdout.write(f"Published rate version {version.pk}.")
@@ -0,0 +1,312 @@
+import http.client
+import json
+import random
+import threading
+import time
+from contextlib import ExitStack
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.test.utils import override_settings
+
+from utils.benchmark import serve_locally
+from utils.benchmark import summarize
+from utils.benchmark import temporary_database
+
+SEED_BATCH_SIZE = 100
+DEFAULT_MIX = "read=50,list=20,create=20,purchase=10"
+ADDRESSES = [
+    ("WA", 98101),
+    ("OR", 97201),
+    ("OH", 44101),
+    ("NY", 10001),
+    ("TX", 73301),
+    ("CA", 90001),
+]
+
+
+def parse_mix(value):
+    """`"read=50,create=20"` -> `{"read": 50, "create": 20}`"""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise CommandError(
+                f'Unknown scenario "{name}", choose from {", ".join(SCENARIOS)}.'
+            )
+        try:
+            mix[name] = int(weight)
+        except ValueError:
+            raise CommandError(f'Weight of "{name}" must be an integer.')
+    if not any(mix.values()):
+        raise CommandError("The mix needs at least one scenario with a weight.")
+    return mix
+
+
+def quote_payload(rng):
+    state, zipcode = rng.choice(ADDRESSES)
+    return {
+        "date_effective": "2022-01-01T00:00:00.000",
+        "date_previous_canceled": rng.choice([None, "2021-06-01"]),
+        "is_owned": rng.random() < 0.5,
+        "address": {"state": state, "zipcode": str(zipcode)},
+    }
+
+
+# Each scenario returns the request to send: (endpoint, method, path, body).
+def create_quote(rng, qids):
+    return "POST /quote/quotes/", "POST", "/quote/quotes/", quote_payload(rng)
+
+
+def read_quote(rng, qids):
+    path = f"/quote/quotes/{rng.choice(qids)}/"
+    return "GET /quote/quotes/<qid>/", "GET", path, None
+
+
+def list_quotes(rng, qids):
+    return "GET /quote/quotes/", "GET", "/quote/quotes/?pagination=cursor", None
+
+
+def purchase_quote(rng, qids):
+    body = {
+        "quote_id": rng.choice(qids),
+        "payment_frequency": rng.choice(["Monthly", "Biannually"]),
+    }
+    return "POST /quote/purchase/", "POST", "/quote/purchase/", body
+
+
+SCENARIOS = {
+    "create": create_quote,
+    "read": read_quote,
+    "list": list_quotes,
+    "purchase": purchase_quote,
+}
+
+
+class Client:
+    """One keep-alive HTTP connection, reopened whenever the server drops it."""
+
+    def __init__(self, base_url, timeout):
+        url = urlsplit(base_url)
+        self.prefix = url.path.rstrip("/")
+        self.connection = http.client.HTTPConnection(
+            url.hostname, url.port or 80, timeout=timeout
+        )
+
+    def request(self, method, path, body=None):
+        headers = {"Accept": "application/json"}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        try:
+            self.connection.request(
+                method, self.prefix + path, body=payload, headers=headers
+            )
+            response = self.connection.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            raise
+
+    def close(self):
+        self.connection.close()
+
+
+def find_regressions(baseline, report, tolerance):
+    """
+    Endpoints whose p95 latency grew, or whose throughput fell, by more than
+    `tolerance` percent compared with an earlier report.
+    """
+    regressions = []
+    for endpoint, old in baseline.get("endpoints", {}).items():
+        new = report["endpoints"].get(endpoint)
+        if not new:
+            continue
+        if old["p95_ms"] and new["p95_ms"] > old["p95_ms"] * (1 + tolerance / 100):
+            regressions.append(
+                f"{endpoint}: p95 {old['p95_ms']}ms -> {new['p95_ms']}ms"
+            )
+        if old["throughput_rps"] and new["throughput_rps"] < old["throughput_rps"] * (
+            1 - tolerance / 100
+        ):
+            regressions.append(
+                f"{endpoint}: throughput {old['throughput_rps']}/s -> "
+                f"{new['throughput_rps']}/s"
+            )
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the API over HTTP. Starts the app on a throwaway SQLite "
+        "database (or targets --url), runs a weighted mix of quote creates, "
+        "reads, list pages and purchases from --concurrency clients and prints "
+        "throughput and p50/p95/p99 latency per endpoint as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            help="Base URL of a running server. By default the app is started "
+            "locally on a fresh SQLite database.",
+        )
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument("--requests", type=int, default=2000, help="in total")
+        parser.add_argument(
+            "--duration",
+            type=float,
+            help="Stop after this many seconds instead of after --requests.",
+        )
+        parser.add_argument(
+            "--mix",
+            default=DEFAULT_MIX,
+            help=f"Scenario weights (default {DEFAULT_MIX}).",
+        )
+        parser.add_argument(
+            "--seed-quotes",
+            type=int,
+            default=200,
+            help="Quotes created before the run, for reads and purchases.",
+        )
+        parser.add_argument("--random-seed", type=int, default=0)
+        parser.add_argument("--timeout", type=float, default=30)
+        parser.add_argument("--output", help="Also write the report to this file.")
+        parser.add_argument(
+            "--baseline",
+            help="A report from an earlier run; fail if any endpoint regressed.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=20,
+            help="Percent of p95/throughput change allowed against --baseline.",
+        )
+
+    def seed(self, base_url, count, timeout, rng):
+        client = Client(base_url, timeout)
+        qids = []
+        try:
+            for offset in range(0, count, SEED_BATCH_SIZE):
+                batch = min(SEED_BATCH_SIZE, count - offset)
+                status, content = client.request(
+                    "POST",
+                    "/quote/quotes/bulk/",
+                    [quote_payload(rng) for _ in range(batch)],
+                )
+                if status != 201:
+                    raise CommandError(
+                        f"Creating seed quotes failed with {status}: {content[:200]}"
+                    )
+                qids.extend(item["data"]["qid"] for item in json.loads(content))
+        finally:
+            client.close()
+        return qids
+
+    def run(self, base_url, options, mix, qids):
+        scenarios = [SCENARIOS[name] for name in mix]
+        weights = list(mix.values())
+        deadline = None
+        if options["duration"]:
+            deadline = time.perf_counter() + options["duration"]
+        remaining = [options["requests"]]
+        lock = threading.Lock()
+        results = {}
+
+        def take():
+            if deadline is not None:
+                return time.perf_counter() < deadline
+            with lock:
+                remaining[0] -= 1
+                return remaining[0] >= 0
+
+        def worker(index):
+            rng = random.Random(options["random_seed"] * 1000 + index)
+            client = Client(base_url, options["timeout"])
+            try:
+                while take():
+                    scenario = rng.choices(scenarios, weights)[0]
+                    endpoint, method, path, body = scenario(rng, qids)
+                    start = time.perf_counter()
+                    try:
+                        status, content = client.request(method, path, body)
+                    except (OSError, http.client.HTTPException):
+                        status = None
+                    latency = time.perf_counter() - start
+                    if status == 201 and scenario is create_quote:
+                        qids.append(json.loads(content)["qid"])
+                    latencies, errors = results.setdefault(endpoint, ([], []))
+                    latencies.append(latency)
+                    if status is None or status >= 400:
+                        errors.append(status)
+            finally:
+                client.close()
+
+        threads = [
+            threading.Thread(target=worker, args=(index,))
+            for index in range(options["concurrency"])
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        all_latencies = [t for latencies, _ in results.values() for t in latencies]
+        return {
+            "config": {
+                "url": options["url"],
+                "concurrency": options["concurrency"],
+                "mix": mix,
+                "duration_s": round(elapsed, 2),
+            },
+            "total": summarize(
+                all_latencies, elapsed, sum(len(e) for _, e in results.values())
+            ),
+            "endpoints": {
+                endpoint: summarize(latencies, elapsed, len(errors))
+                for endpoint, (latencies, errors) in sorted(results.items())
+            },
+        }
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options["mix"])
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be at least 1.")
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+
+        with ExitStack() as stack:
+            base_url = options["url"]
+            if not base_url:
+                # Production-like settings on a fresh database.
+                stack.enter_context(override_settings(DEBUG=False))
+                stack.enter_context(temporary_database())
+                base_url = stack.enter_context(serve_locally())
+            qids = self.seed(
+                base_url,
+                max(options["seed_quotes"], 1),
+                options["timeout"],
+                random.Random(options["random_seed"]),
+            )
+            report = self.run(base_url, options, mix, qids)
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output + "\n")
+        self.stdout.write(output)
+
+        if report["total"]["errors"]:
+            self.stderr.write(f"{report['total']['errors']} requests failed.")
+        if baseline is not None:
+            regressions = find_regressions(baseline, report, options["tolerance"])
+            if regressions:
+                raise CommandError(
+                    "Slower than the baseline:\n  " + "\n  ".join(regressions)
+                )
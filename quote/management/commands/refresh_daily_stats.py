@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from quote.stats import refresh_daily_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Bring the daily quote/purchase summary tables behind /quote/stats/ up "
+        "to the start of today, recomputing only the days that changed. Run it "
+        "from cron shortly after midnight."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rebuild every day, e.g. after quotes or purchases were deleted.",
+        )
+
+    def handle(self, *args, **options):
+        days = refresh_daily_stats(full=options["full"])
+        self.stdout.write(f"Recomputed {days} day(s).")
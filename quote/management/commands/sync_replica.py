@@ -0,0 +1,57 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.db import connections
+
+from utils.db_router import get_replica
+
+
+def copy_sqlite(source, target):
+    """Copy one SQLite database over another, consistently, while it's in use."""
+    source = sqlite3.connect(source)
+    target = sqlite3.connect(target)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database over the read replica "
+        "(READ_REPLICA_DATABASE), to try out replica routing locally. With "
+        "--every, keep copying, like a replica that lags that far behind."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--every", type=float, help="Copy again every this many seconds."
+        )
+
+    def handle(self, *args, **options):
+        replica = get_replica()
+        if replica is None:
+            raise CommandError(
+                "No replica configured, set REPLICA_DATABASE_NAME (the "
+                "READ_REPLICA_DATABASE setting)."
+            )
+        primary, replica = connections[DEFAULT_DB_ALIAS], connections[replica]
+        if primary.vendor != "sqlite" or replica.vendor != "sqlite":
+            raise CommandError("Only SQLite databases can be copied.")
+        if primary.settings_dict["NAME"] == replica.settings_dict["NAME"]:
+            raise CommandError("The replica is the primary's own file.")
+
+        while True:
+            start = time.perf_counter()
+            copy_sqlite(primary.settings_dict["NAME"], replica.settings_dict["NAME"])
+            self.stdout.write(
+                f"Copied to {replica.settings_dict['NAME']} in "
+                f"{time.perf_counter() - start:.2f}s."
+            )
+            if not options["every"]:
+                return
+            time.sleep(options["every"])
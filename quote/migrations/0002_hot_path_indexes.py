@@ -0,0 +1,50 @@
+# Generated by Django 3.1 on 2026-10-18 12:12
+
+# Only the indexes. `makemigrations` also picks up older, unrelated drift
+# (auto field type, float defaults) which is left out on purpose.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quote", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="address",
+            index=models.Index(
+                fields=["state", "zipcode"], name="address_state_zip_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="quote",
+            index=models.Index(
+                fields=["date_created", "qid"], name="quote_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="quote",
+            index=models.Index(
+                fields=["address", "date_created"], name="quote_address_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="quote",
+            index=models.Index(fields=["date_effective"], name="quote_effective_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="quotepurchase",
+            index=models.Index(
+                fields=["date_created", "id"], name="purchase_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="quotepurchase",
+            index=models.Index(
+                fields=["quote", "date_created"], name="purchase_quote_created_idx"
+            ),
+        ),
+    ]
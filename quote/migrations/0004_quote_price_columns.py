@@ -0,0 +1,44 @@
+# Generated by Django 3.1 on 2026-10-18 12:27
+
+# Only the new columns and indexes; the older, unrelated drift `makemigrations`
+# picks up (auto field type, float defaults) is left out on purpose.
+
+from django.db import migrations, models
+
+
+def price_field(name):
+    return migrations.AddField(
+        model_name="quote",
+        name=name,
+        field=models.FloatField(null=True),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quote", "0003_quote_date_modified"),
+    ]
+
+    operations = [
+        price_field("cost_monthly"),
+        price_field("cost_biannually"),
+        price_field("monthly_fee_canceled_amt"),
+        price_field("monthly_fee_state_amt"),
+        price_field("monthly_discount_canceled_amt"),
+        price_field("monthly_discount_owns_property_amt"),
+        price_field("biannually_fee_canceled_amt"),
+        price_field("biannually_fee_state_amt"),
+        price_field("biannually_discount_canceled_amt"),
+        price_field("biannually_discount_owns_property_amt"),
+        migrations.AddIndex(
+            model_name="quote",
+            index=models.Index(fields=["cost_monthly"], name="quote_cost_monthly_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="quote",
+            index=models.Index(
+                fields=["cost_biannually"], name="quote_cost_biannually_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Fill the price columns of existing quotes, BACKFILL_CHUNK_SIZE quotes per
+# transaction so the table is never locked for long. Each chunk is the next
+# quotes still missing a price, so an interrupted run picks up where it
+# stopped when migrated again.
+
+from django.db import migrations, transaction
+
+BACKFILL_CHUNK_SIZE = 1000
+
+# Copies of the rates in `utils.const` (which 0008 records as the first
+# version) and of the states with a volcano, so later changes to the pricing
+# code don't change what this backfills.
+BASE_COSTS = {"monthly": 59.94 / 6, "biannually": 59.94}
+# (group, name, percent, column suffix), in the order `Quote._calc_fees`
+# applies them.
+MODIFIERS = (
+    ("fees", "canceled", 15, "fee_canceled_amt"),
+    ("fees", "state_with_volcano", 25, "fee_state_amt"),
+    ("discounts", "canceled", 10, "discount_canceled_amt"),
+    ("discounts", "owns_property", 20, "discount_owns_property_amt"),
+)
+STATES_WITH_VOLCANOES = frozenset(
+    {"AK", "AZ", "CA", "CO", "HI", "ID", "NV", "NM", "OR", "UT", "WA", "WY"}
+)
+
+
+def price_fields(state, canceled, owned):
+    """The price columns of a quote in this pricing class."""
+    applies = {
+        ("fees", "canceled"): canceled,
+        ("fees", "state_with_volcano"): state in STATES_WITH_VOLCANOES,
+        ("discounts", "canceled"): not canceled,
+        ("discounts", "owns_property"): owned,
+    }
+    fields = {}
+    for frequency, base_cost in BASE_COSTS.items():
+        cost = base_cost
+        for group, name, percent, suffix in MODIFIERS:
+            money = round(base_cost * (percent / 100), 2) if applies[group, name] else 0
+            cost = cost + money if group == "fees" else cost - money
+            fields[f"{frequency}_{suffix}"] = float(money)
+        fields[f"cost_{frequency}"] = round(cost, 2)
+    return fields
+
+
+def backfill_prices(apps, schema_editor):
+    Quote = apps.get_model("quote", "Quote")
+    db = schema_editor.connection.alias
+    pending = Quote.objects.using(db).filter(
+        cost_monthly__isnull=True, address__isnull=False
+    )
+    while True:
+        with transaction.atomic(using=db):
+            rows = list(
+                pending.order_by("qid").values_list(
+                    "qid", "date_previous_canceled", "address__state", "is_owned"
+                )[:BACKFILL_CHUNK_SIZE]
+            )
+            if not rows:
+                return
+            # One UPDATE per pricing class (state and flags) in the chunk.
+            by_class = {}
+            for qid, canceled, state, owned in rows:
+                flags = (state, canceled is not None, bool(owned))
+                by_class.setdefault(flags, []).append(qid)
+            for flags, qids in by_class.items():
+                Quote.objects.using(db).filter(qid__in=qids).update(
+                    **price_fields(*flags)
+                )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("quote", "0004_quote_price_columns"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 3.1 on 2026-10-18 12:30
+
+# Only the stats tables; the older, unrelated drift `makemigrations` picks up
+# (auto field type, float defaults) is left out on purpose.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quote", "0005_backfill_quote_prices"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyPurchaseStats",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("state", models.CharField(max_length=2)),
+                ("payment_frequency", models.CharField(max_length=10)),
+                ("purchases", models.PositiveIntegerField(default=0)),
+                ("revenue", models.FloatField(default=0)),
+                ("discount_canceled_amt", models.FloatField(default=0)),
+                ("discount_owns_property_amt", models.FloatField(default=0)),
+                ("fee_canceled_amt", models.FloatField(default=0)),
+                ("fee_state_amt", models.FloatField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="DailyQuoteStats",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("state", models.CharField(max_length=2)),
+                ("quotes", models.PositiveIntegerField(default=0)),
+                ("converted", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="DailyStatsWatermark",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("refreshed_until", models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="dailyquotestats",
+            constraint=models.UniqueConstraint(
+                fields=("day", "state"), name="daily_quote_stats_day_state"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dailypurchasestats",
+            constraint=models.UniqueConstraint(
+                fields=("day", "state", "payment_frequency"),
+                name="daily_purchase_stats_day_state_freq",
+            ),
+        ),
+    ]
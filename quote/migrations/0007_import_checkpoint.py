@@ -0,0 +1,36 @@
+# Generated by Django 3.1 on 2026-10-18 12:39
+
+# Only the checkpoint table; the older, unrelated drift `makemigrations` picks
+# up (auto field type, float defaults) is left out on purpose.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quote", "0006_daily_stats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("rows_done", models.BigIntegerField(default=0)),
+                ("imported", models.BigIntegerField(default=0)),
+                ("invalid", models.BigIntegerField(default=0)),
+                ("skipped", models.BigIntegerField(default=0)),
+                ("date_modified", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
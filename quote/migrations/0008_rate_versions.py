@@ -0,0 +1,84 @@
+# Generated by Django 3.1 on 2026-10-18 12:58
+
+# Rate versions, seeded with the rates that were hard coded in `utils.const`
+# until now, and the version each quote was priced with. Existing priced
+# quotes are backfilled to that first version BACKFILL_CHUNK_SIZE at a time,
+# like 0005. The older, unrelated drift `makemigrations` picks up (auto field
+# type, float defaults) is left out on purpose.
+
+import django.db.models.deletion
+from django.db import migrations, models, transaction
+
+BACKFILL_CHUNK_SIZE = 1000
+
+# A copy, so later changes to `utils.const` don't change what this seeds.
+FIRST_VERSION = {
+    "base_cost": {"monthly": 59.94 / 6, "biannually": 59.94},
+    "fees": {"canceled": 15, "state_with_volcano": 25},
+    "discounts": {"canceled": 10, "owns_property": 20},
+    "states": {},
+}
+
+
+def seed_rates(apps, schema_editor):
+    RateVersion = apps.get_model("quote", "RateVersion")
+    Quote = apps.get_model("quote", "Quote")
+    db = schema_editor.connection.alias
+    # Already there when an interrupted backfill is migrated again.
+    version = RateVersion.objects.using(db).order_by("pk").first()
+    if version is None:
+        version = RateVersion.objects.using(db).create(
+            definition=FIRST_VERSION, note="Initial rates."
+        )
+    pending = Quote.objects.using(db).filter(
+        rate_version__isnull=True, cost_monthly__isnull=False
+    )
+    while True:
+        with transaction.atomic(using=db):
+            qids = list(
+                pending.order_by("qid").values_list("qid", flat=True)[
+                    :BACKFILL_CHUNK_SIZE
+                ]
+            )
+            if not qids:
+                return
+            Quote.objects.using(db).filter(qid__in=qids).update(rate_version=version)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("quote", "0007_import_checkpoint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RateVersion",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("note", models.CharField(blank=True, max_length=255)),
+                ("definition", models.JSONField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name="quote",
+            name="rate_version",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="quote.rateversion",
+            ),
+        ),
+        migrations.RunPython(seed_rates, migrations.RunPython.noop),
+    ]
@@ -1,17 +1,174 @@
-import string
-from random import choice
+from itertools import islice
 
-from django.core.exceptions import ObjectDoesNotExist
+from django.conf import settings
+from django.db import IntegrityError
 from django.db import models
+from django.db import router
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_migrate
+from django.db.models.signals import post_save
 from django.utils.translation import gettext_lazy as _
 
-from utils.const import DISCOUNTS
-from utils.const import FEES
-from utils.const import VOLCANO_INSURANCE
+from utils.const import STATES_WITH_VOLCANOES
+from utils.lru import LRUCache
+from utils.metrics import register_cache
+from utils.sqlite import write_atomic
+from utils.timing import timed
 
-LETTERS_AND_NUMBERS = string.ascii_uppercase + string.digits
+from quote.pricing import AMOUNT_FIELDS
+from quote.pricing import get_price_table
+from quote.qid import LETTERS_AND_NUMBERS  # noqa F401
+from quote.qid import get_qid_generator
+from quote.rates import current_price_table
+from quote.rates import price_table_for
 
-__all__ = ["Address", "Quote", "QuotePurchase"]
+# Generated qids are inserted without an existence check; on the rare primary
+# key clash the insert is retried with fresh qids this many times.
+QID_INSERT_ATTEMPTS = 5
+
+# Keep the number of bound parameters per `__in` lookup well under SQLite's limit.
+LOOKUP_CHUNK_SIZE = 500
+
+
+def chunked(items, size=LOOKUP_CHUNK_SIZE):
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+__all__ = [
+    "Address",
+    "Quote",
+    "QuotePurchase",
+    "DailyQuoteStats",
+    "DailyPurchaseStats",
+    "DailyStatsWatermark",
+    "ImportCheckpoint",
+    "RateVersion",
+]
+
+
+_address_cache = None
+
+
+def get_address_cache():
+    """
+    The ids of resolved addresses, keyed by `(state, zipcode)`, in a per
+    process LRU of `ADDRESS_CACHE_SIZE` entries. `stats()` has the hit/miss
+    counters.
+    """
+    global _address_cache
+    if _address_cache is None:
+        _address_cache = LRUCache(getattr(settings, "ADDRESS_CACHE_SIZE", 10000))
+    return _address_cache
+
+
+def with_fresh_addresses(write, using=None):
+    """
+    Run `write()`, which saves rows pointing at addresses resolved through
+    the address cache, in a write transaction (the address lookups read
+    before the inserts, see `utils.sqlite.write_atomic`), and return its
+    result.
+
+    Deleted addresses only leave the cache of the process that deleted them,
+    so another process can still hand out the id of one. The write then
+    fails on the foreign key (checked when the transaction commits); in that
+    case the cache is cleared and `write()` runs once more, resolving the
+    addresses from the database. Any other integrity error fails again and is
+    raised.
+    """
+    try:
+        with write_atomic(using):
+            return write()
+    except IntegrityError:
+        cache = get_address_cache()
+        if not len(cache):
+            raise
+        cache.clear()
+    with write_atomic(using):
+        return write()
+
+
+class AddressManager(models.Manager):
+    def _cached(self, zipcode, state):
+        pk = get_address_cache().get((state, zipcode))
+        if pk is None:
+            return None
+        # Addresses never change, so the id is all that needs remembering.
+        address = self.model(pk=pk, zipcode=zipcode, state=state)
+        address._state.adding = False
+        address._state.db = self.db
+        return address
+
+    def _remember(self, addresses):
+        # Only once committed: a rolled back insert mustn't leave its id behind.
+        entries = [
+            (address.state, address.zipcode, address.pk) for address in addresses
+        ]
+        cache = get_address_cache()
+
+        def remember():
+            for state, zipcode, pk in entries:
+                cache.set((state, zipcode), pk)
+
+        transaction.on_commit(remember, using=self.db)
+
+    def resolve(self, zipcode, state):
+        """
+        `get_or_create` by zipcode and state, through the address cache, so
+        known addresses cost no query. Returns `(address, created)`.
+        """
+        zipcode = int(zipcode)
+        address = self._cached(zipcode, state)
+        if address is not None:
+            return address, False
+        address, created = self.get_or_create(zipcode=zipcode, state=state)
+        self._remember([address])
+        return address, created
+
+    def get_or_create_many(self, pairs):
+        """
+        Resolve many `(zipcode, state)` pairs at once. Cached addresses are
+        used as is, the others are looked up in a few chunked queries and the
+        missing ones are inserted with a single `bulk_create`. Returns a dict
+        keyed by the given pairs.
+        """
+        pairs = {(int(zipcode), state) for zipcode, state in pairs}
+        found = {}
+        for zipcode, state in pairs:
+            address = self._cached(zipcode, state)
+            if address is not None:
+                found[(zipcode, state)] = address
+        uncached = pairs - found.keys()
+        if not uncached:
+            return found
+        looked_up = self._lookup_many(uncached)
+        missing = uncached - looked_up.keys()
+        if missing:
+            self.bulk_create(
+                [self.model(zipcode=zipcode, state=state) for zipcode, state in missing]
+            )
+            # SQLite does not hand back primary keys from a bulk insert.
+            looked_up.update(self._lookup_many(missing))
+        self._remember(looked_up.values())
+        found.update(looked_up)
+        return found
+
+    def _lookup_many(self, pairs):
+        found = {}
+        zipcodes = sorted({zipcode for zipcode, _ in pairs})
+        states = {state for _, state in pairs}
+        for chunk in chunked(zipcodes):
+            for address in self.filter(Q(zipcode__in=chunk) & Q(state__in=states)):
+                key = (address.zipcode, address.state)
+                if key in pairs:
+                    found.setdefault(key, address)
+        return found
 
 
 class Address(models.Model):
@@ -68,29 +225,97 @@ class Address(models.Model):
         "WI",
         "WY",
     }
-    states_with_volcanoes = {
-        "AK",
-        "AZ",
-        "CA",
-        "CO",
-        "HI",
-        "ID",
-        "NV",
-        "NM",
-        "OR",
-        "UT",
-        "WA",
-        "WY",
-    }
+    states_with_volcanoes = STATES_WITH_VOLCANOES
 
     zipcode = models.IntegerField()
     state = models.CharField(max_length=2)
 
+    objects = AddressManager()
+
+    class Meta:
+        indexes = [
+            # `get_or_create` lookups and filtering quotes by state
+            models.Index(fields=["state", "zipcode"], name="address_state_zip_idx"),
+        ]
+
     @property
     def has_volcano(self):
         return self.state in self.states_with_volcanoes
 
 
+def _forget_address(sender, instance, **kwargs):
+    get_address_cache().discard((instance.state, instance.zipcode))
+
+
+def _forget_changed_address(sender, instance, created, **kwargs):
+    # The old zipcode/state isn't known any more, so drop everything.
+    if not created:
+        get_address_cache().clear()
+
+
+def _forget_addresses(sender, **kwargs):
+    # Tables flushed or rebuilt, e.g. between tests.
+    get_address_cache().clear()
+
+
+post_delete.connect(_forget_address, sender=Address)
+post_save.connect(_forget_changed_address, sender=Address)
+post_migrate.connect(_forget_addresses)
+register_cache("address", lambda: get_address_cache().stats())
+
+
+class QuoteManager(models.Manager):
+    def locked_with_address(self):
+        """
+        Quotes joined with their address in one query, the quote rows locked
+        until the end of the transaction. Only the quote is locked: a nullable
+        join can't be locked on PostgreSQL, and addresses never change.
+        """
+        return self.select_related("address").select_for_update(of=("self",))
+
+    def bulk_create(self, objs, **kwargs):
+        """
+        Insert quotes in bulk, handing out a block of qids to the ones that
+        don't have one yet. On a primary key clash the whole batch is retried
+        with a fresh block. Quotes that already carry prices (e.g. priced by
+        the importer) keep them, the others are priced here.
+        """
+        objs = list(objs)
+        for quote in objs:
+            if quote.cost_monthly is None:
+                quote.set_prices()
+        unassigned = [quote for quote in objs if not quote.qid]
+        if not unassigned:
+            return super().bulk_create(objs, **kwargs)
+
+        generator = get_qid_generator()
+        for attempt in range(QID_INSERT_ATTEMPTS):
+            for quote, qid in zip(
+                unassigned, generator.generate_block(len(unassigned))
+            ):
+                quote.qid = qid
+            try:
+                with transaction.atomic(using=self.db):
+                    return super().bulk_create(objs, **kwargs)
+            except IntegrityError:
+                if attempt == QID_INSERT_ATTEMPTS - 1:
+                    for quote in unassigned:
+                        quote.qid = ""
+                    raise
+
+
+class RateVersion(models.Model):
+    """
+    A rate definition (see `quote.pricing.Rates`). Versions are never
+    changed once created; the newest one prices new quotes (see
+    `quote.rates`).
+    """
+
+    created = models.DateTimeField(auto_now_add=True)
+    note = models.CharField(max_length=255, blank=True)
+    definition = models.JSONField()
+
+
 class Quote(models.Model):
     qid = models.CharField(primary_key=True, max_length=10)
     date_effective = models.DateTimeField(null=False)
@@ -98,53 +323,106 @@ class Quote(models.Model):
     is_owned = models.BooleanField(null=False)
     address = models.ForeignKey(Address, on_delete=models.SET_NULL, null=True)
     date_created = models.DateTimeField(auto_now_add=True)
+    date_modified = models.DateTimeField(auto_now=True)
+
+    # Denormalized prices, set on every save (see `set_prices`) so they can be
+    # filtered, sorted and aggregated on in SQL.
+    cost_monthly = models.FloatField(null=True)
+    cost_biannually = models.FloatField(null=True)
+    monthly_fee_canceled_amt = models.FloatField(null=True)
+    monthly_fee_state_amt = models.FloatField(null=True)
+    monthly_discount_canceled_amt = models.FloatField(null=True)
+    monthly_discount_owns_property_amt = models.FloatField(null=True)
+    biannually_fee_canceled_amt = models.FloatField(null=True)
+    biannually_fee_state_amt = models.FloatField(null=True)
+    biannually_discount_canceled_amt = models.FloatField(null=True)
+    biannually_discount_owns_property_amt = models.FloatField(null=True)
+    # The rates the prices above were computed with, null for quotes priced
+    # before rates were versioned.
+    rate_version = models.ForeignKey(RateVersion, on_delete=models.PROTECT, null=True)
+
+    PRICE_FIELDS = ["cost_monthly", "cost_biannually"] + [
+        f"{frequency}_{field}"
+        for frequency in ("monthly", "biannually")
+        for field in AMOUNT_FIELDS.values()
+    ]
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    objects = QuoteManager()
 
-        # init values used to cache fee calculations
-        self._cost_monthly = None
-        self._cost_biannually = None
-        self._breakdown_monthly = None
-        self._breakdown_biannually = None
+    class Meta:
+        indexes = [
+            # newest first lists and keyset pagination
+            models.Index(fields=["date_created", "qid"], name="quote_created_idx"),
+            # quotes by address (and so by state) over time
+            models.Index(
+                fields=["address", "date_created"], name="quote_address_created_idx"
+            ),
+            models.Index(fields=["date_effective"], name="quote_effective_idx"),
+            # filtering and sorting by premium
+            models.Index(fields=["cost_monthly"], name="quote_cost_monthly_idx"),
+            models.Index(fields=["cost_biannually"], name="quote_cost_biannually_idx"),
+        ]
 
     def save(self, **kwargs):
-        """Overwriting the `save` method to insert a unique `qid`"""
-        if not self.qid:
-            rand_id = None
+        """
+        Overwriting the `save` method to insert a unique `qid`. The generated
+        qid is inserted straight away; the primary key constraint catches the
+        rare clash, in which case we retry with a new one.
+
+        The price columns, and the rate version they come from, are
+        recomputed on every save.
+        """
+        self.set_prices()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {
+                *kwargs["update_fields"],
+                *self.PRICE_FIELDS,
+                "rate_version",
+            }
+        if self.qid:
+            return super(Quote, self).save(**kwargs)
+
+        kwargs["force_insert"] = True
+        using = kwargs.get("using") or router.db_for_write(Quote, instance=self)
+        generator = get_qid_generator()
+        for attempt in range(QID_INSERT_ATTEMPTS):
+            self.qid = generator.generate()
             try:
-                while True:
-                    # Try until we find a QID that doesn't already exist.
-                    rand_id = "".join([choice(LETTERS_AND_NUMBERS) for _ in range(10)])
-                    Quote.objects.get(qid=rand_id)
-            except ObjectDoesNotExist:
-                pass
-            self.qid = rand_id
-        return super(Quote, self).save(**kwargs)
+                with transaction.atomic(using=using):
+                    return super(Quote, self).save(**kwargs)
+            except IntegrityError:
+                self.qid = ""
+                if attempt == QID_INSERT_ATTEMPTS - 1:
+                    raise
+
+    def _multipliers(self):
+        return get_price_table().rates.multipliers(self.address.state)
 
     @property
     def additional_fees(self):
+        multipliers = self._multipliers()
         return {
             "canceled": {
                 "applies": self.date_previous_canceled is not None,
-                "multiplier": FEES.CANCELED_POLICY.PERCENT / 100,
+                "multiplier": multipliers[("fees", "canceled")],
             },
             "state_with_volcano": {
                 "applies": self.address.has_volcano,
-                "multiplier": FEES.STATE_WITH_VOLCANO.PERCENT / 100,
+                "multiplier": multipliers[("fees", "state_with_volcano")],
             },
         }
 
     @property
     def discounts(self):
+        multipliers = self._multipliers()
         return {
             "canceled": {
                 "applies": self.date_previous_canceled is None,
-                "multiplier": DISCOUNTS.NO_CANCELLED_POLICY.PERCENT / 100,
+                "multiplier": multipliers[("discounts", "canceled")],
             },
             "owns_property": {
                 "applies": self.is_owned,
-                "multiplier": DISCOUNTS.OWNED_PROPERTY.PERCENT / 100,
+                "multiplier": multipliers[("discounts", "owns_property")],
             },
         }
 
@@ -167,16 +445,48 @@ class Quote(models.Model):
         return round(policy_cost, 2), {"fees": fees, "discounts": discounts}
 
     @property
-    def cost_and_breakdown_biannually(self):
-        if self._cost_biannually is None or self._breakdown_biannually is None:
-            self._cost_biannually, self._breakdown_biannually = self._calc_fees(
-                VOLCANO_INSURANCE.BASE_COST_BIANNUALLY
+    def pricing_class(self):
+        """What a price depends on: (state, canceled, owned)."""
+        return (
+            self.address.state,
+            self.date_previous_canceled is not None,
+            bool(self.is_owned),
+        )
+
+    def set_prices(self):
+        """Set the price columns, and the rate version, from the installed rates."""
+        if self.address is None:
+            return
+        with timed("pricing"):
+            table = current_price_table()
+            for field, value in table.fields(*self.pricing_class).items():
+                setattr(self, field, value)
+            self.rate_version_id = table.version
+
+    def cost(self, frequency):
+        """The cost at `frequency`, without building the breakdown."""
+        cost = getattr(self, f"cost_{frequency}")
+        if cost is None:
+            return self.cost_and_breakdown(frequency)[0]
+        return cost
+
+    def cost_and_breakdown(self, frequency):
+        with timed("pricing"):
+            cost = getattr(self, f"cost_{frequency}")
+            if cost is None:
+                # Not saved (e.g. a price preview) or not backfilled yet.
+                return get_price_table().lookup(frequency, *self.pricing_class)
+            amounts = tuple(
+                getattr(self, f"{frequency}_{field}")
+                for field in AMOUNT_FIELDS.values()
+            )
+            return cost, price_table_for(self.rate_version_id).breakdown(
+                frequency, *self.pricing_class, amounts
             )
-        return self._cost_biannually, self._breakdown_biannually
 
     @property
-    def cost_biannually(self):
-        return self.cost_and_breakdown_biannually[0]
+    def cost_and_breakdown_biannually(self):
+        return self.cost_and_breakdown("biannually")
 
     @property
     def breakdown_biannually(self):
@@ -184,15 +494,7 @@ class Quote(models.Model):
 
     @property
     def cost_and_breakdown_monthly(self):
-        if self._cost_monthly is None or self._breakdown_monthly is None:
-            self._cost_monthly, self._breakdown_monthly = self._calc_fees(
-                VOLCANO_INSURANCE.BASE_COST_MONTHLY
-            )
-        return self._cost_monthly, self._breakdown_monthly
-
-    @property
-    def cost_monthly(self):
-        return self.cost_and_breakdown_monthly[0]
+        return self.cost_and_breakdown("monthly")
 
     @property
     def breakdown_monthly(self):
@@ -214,3 +516,77 @@ class QuotePurchase(models.Model):
     discount_owns_property_amt = models.FloatField(default=0)
     fee_canceled_amt = models.FloatField(default=0)
     fee_state_amt = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [
+            # newest first lists and keyset pagination
+            models.Index(fields=["date_created", "id"], name="purchase_created_idx"),
+            # purchases of a quote over time
+            models.Index(
+                fields=["quote", "date_created"], name="purchase_quote_created_idx"
+            ),
+        ]
+
+
+class DailyQuoteStats(models.Model):
+    """
+    Quotes created per day and state, maintained by `quote.stats`. `converted`
+    counts those quotes that have been purchased at least once so far.
+    """
+
+    day = models.DateField()
+    state = models.CharField(max_length=2)
+    quotes = models.PositiveIntegerField(default=0)
+    converted = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "state"], name="daily_quote_stats_day_state"
+            )
+        ]
+
+
+class DailyPurchaseStats(models.Model):
+    """Purchases and their totals per day, quote state and payment frequency."""
+
+    day = models.DateField()
+    state = models.CharField(max_length=2)
+    payment_frequency = models.CharField(max_length=10)
+    purchases = models.PositiveIntegerField(default=0)
+    revenue = models.FloatField(default=0)
+    discount_canceled_amt = models.FloatField(default=0)
+    discount_owns_property_amt = models.FloatField(default=0)
+    fee_canceled_amt = models.FloatField(default=0)
+    fee_state_amt = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "state", "payment_frequency"],
+                name="daily_purchase_stats_day_state_freq",
+            )
+        ]
+
+
+class DailyStatsWatermark(models.Model):
+    """
+    A single row: the daily stats hold every quote and purchase created
+    before `refreshed_until`.
+    """
+
+    refreshed_until = models.DateTimeField()
+
+
+class ImportCheckpoint(models.Model):
+    """
+    How far an import (`manage.py import_quotes`) got, saved in the same
+    transaction as the rows it counts.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    rows_done = models.BigIntegerField(default=0)
+    imported = models.BigIntegerField(default=0)
+    invalid = models.BigIntegerField(default=0)
+    skipped = models.BigIntegerField(default=0)
+    date_modified = models.DateTimeField(auto_now=True)
@@ -0,0 +1,366 @@
+"""
+Pricing of quotes from precomputed tables.
+
+Rates come from a rate definition (see `Rates`): a base cost and fee and
+discount percentages, optionally overridden per state. Given a state's
+rates, a quote's price only depends on three flags: whether a previous
+policy was canceled, whether the address is in a state with a volcano and
+whether the property is owned.
+
+Every cost and breakdown of a rate definition is precomputed once into a
+flat `PriceTable` keyed by frequency, state and flags (see
+`get_price_table`), with the same numbers as `Quote._calc_fees`, which
+applies the modifiers to a single quote. Quotes store their costs and
+amounts in columns when saved (`PriceTable.fields`), along with the rate
+version that priced them, and rebuild their breakdown from them when read
+(`PriceTable.breakdown`). `price_quotes` prices many quotes at once from a
+table.
+
+This module doesn't touch the database; `quote.rates` loads the versioned
+rate definitions and installs the current one here.
+"""
+from itertools import product
+from types import MappingProxyType
+from typing import NamedTuple
+
+import django
+
+from utils.const import DISCOUNTS
+from utils.const import FEES
+from utils.const import STATES_WITH_VOLCANOES
+from utils.const import VOLCANO_INSURANCE
+
+__all__ = [
+    "AMOUNT_FIELDS",
+    "Rates",
+    "StateRates",
+    "default_rates_definition",
+    "PriceTable",
+    "build_price_table",
+    "get_price_table",
+    "install_price_table",
+    "price_quotes",
+    "init_worker",
+]
+
+
+# The `Quote` column, after a `monthly_`/`biannually_` prefix, holding the
+# amount of each modifier.
+AMOUNT_FIELDS = {
+    ("fees", "canceled"): "fee_canceled_amt",
+    ("fees", "state_with_volcano"): "fee_state_amt",
+    ("discounts", "canceled"): "discount_canceled_amt",
+    ("discounts", "owns_property"): "discount_owns_property_amt",
+}
+
+# (group, name, flag column) in the order `Quote._calc_fees` applies them
+MODIFIERS = (
+    ("fees", "canceled", "canceled"),
+    ("fees", "state_with_volcano", "volcano"),
+    ("discounts", "canceled", "not_canceled"),
+    ("discounts", "owns_property", "owned"),
+)
+
+FREQUENCIES = ("monthly", "biannually")
+
+
+def default_rates_definition():
+    """The rates in `utils.const`, as a rate definition."""
+    return {
+        "base_cost": {
+            "monthly": VOLCANO_INSURANCE.BASE_COST_MONTHLY,
+            "biannually": VOLCANO_INSURANCE.BASE_COST_BIANNUALLY,
+        },
+        "fees": {
+            "canceled": FEES.CANCELED_POLICY.PERCENT,
+            "state_with_volcano": FEES.STATE_WITH_VOLCANO.PERCENT,
+        },
+        "discounts": {
+            "canceled": DISCOUNTS.NO_CANCELLED_POLICY.PERCENT,
+            "owns_property": DISCOUNTS.OWNED_PROPERTY.PERCENT,
+        },
+        "states": {},
+    }
+
+
+class StateRates(NamedTuple):
+    # frequency -> base cost
+    base_costs: dict
+    # (group, name, multiplier, flag column) in the order they apply
+    modifiers: tuple
+
+
+def _number(value, where):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ValueError(f"`{where}` must be a number, at least 0.")
+    return value
+
+
+def _section(definition, where, required):
+    """The base costs and percentages of one level of a definition."""
+    unknown = set(definition) - {"base_cost", "fees", "discounts"}
+    if unknown:
+        raise ValueError(f'Unknown key(s) in `{where}`: {", ".join(sorted(unknown))}.')
+    section = {}
+    base_cost = definition.get("base_cost", {})
+    for frequency in base_cost:
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency `{where}base_cost.{frequency}`.")
+    for frequency in FREQUENCIES:
+        if frequency in base_cost:
+            section[("base_cost", frequency)] = _number(
+                base_cost[frequency], f"{where}base_cost.{frequency}"
+            )
+        elif required:
+            raise ValueError(f"`{where}base_cost.{frequency}` is required.")
+    for group in ("fees", "discounts"):
+        names = {
+            name for modifier_group, name, _ in MODIFIERS if modifier_group == group
+        }
+        percents = definition.get(group, {})
+        for name in percents:
+            if name not in names:
+                raise ValueError(f"Unknown modifier `{where}{group}.{name}`.")
+        for name in sorted(names):
+            if name in percents:
+                section[(group, name)] = _number(
+                    percents[name], f"{where}{group}.{name}"
+                )
+            elif required:
+                raise ValueError(f"`{where}{group}.{name}` is required.")
+    return section
+
+
+class Rates:
+    """
+    A rate definition, checked. It's a dict (e.g. loaded from JSON) of
+    `base_cost` by frequency and `fees`/`discounts` percentages by name, plus
+    optional `states` overriding any of them for a state:
+
+        {"base_cost": {"monthly": 9.99, "biannually": 59.94},
+         "fees": {"canceled": 15, "state_with_volcano": 25},
+         "discounts": {"canceled": 10, "owns_property": 20},
+         "states": {"CA": {"fees": {"state_with_volcano": 30}}}}
+
+    Raises `ValueError` when it's incomplete or has unknown keys.
+    """
+
+    def __init__(self, definition):
+        if not isinstance(definition, dict):
+            raise ValueError("A rate definition must be an object.")
+        definition = dict(definition)
+        states = definition.pop("states", None) or {}
+        self._default = _section(definition, "", required=True)
+        self._states = {}
+        for state, overrides in states.items():
+            if not isinstance(overrides, dict):
+                raise ValueError(f"`states.{state}` must be an object.")
+            self._states[state] = _section(overrides, f"states.{state}.", False)
+        self.definition = {**definition, "states": states}
+        self._compiled = {}
+
+    def for_state(self, state):
+        rates = self._compiled.get(state)
+        if rates is None:
+            section = {**self._default, **self._states.get(state, {})}
+            rates = StateRates(
+                {
+                    frequency: section[("base_cost", frequency)]
+                    for frequency in FREQUENCIES
+                },
+                tuple(
+                    (group, name, section[(group, name)] / 100, column)
+                    for group, name, column in MODIFIERS
+                ),
+            )
+            self._compiled[state] = rates
+        return rates
+
+    def multipliers(self, state):
+        """`{(group, name): multiplier}` in `state`."""
+        return {
+            (group, name): multiplier
+            for group, name, multiplier, _ in self.for_state(state).modifiers
+        }
+
+
+_default_rates = None
+
+
+def get_default_rates():
+    global _default_rates
+    if _default_rates is None:
+        _default_rates = Rates(default_rates_definition())
+    return _default_rates
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    return value
+
+
+def _price(base_cost, modifiers, columns):
+    """`(cost, breakdown)` of one pricing class, as `Quote._calc_fees` does it."""
+    cost = base_cost
+    breakdown = {"fees": {}, "discounts": {}}
+    for group, name, multiplier, column in modifiers:
+        applies = columns[column]
+        money = round(base_cost * multiplier, 2) if applies else 0
+        cost = cost + money if group == "fees" else cost - money
+        breakdown[group][name] = {
+            "applies": applies,
+            "multiplier": multiplier,
+            "money": money,
+        }
+    return float(round(cost, 2)), _freeze(breakdown)
+
+
+def _amounts(breakdown):
+    return tuple(
+        float(breakdown[group][name]["money"]) for group, name in AMOUNT_FIELDS
+    )
+
+
+class PriceTable:
+    """
+    The cost and breakdown of every pricing class at some `rates`, keyed by
+    frequency, state and the `(canceled, owned)` flags (whether there's a
+    volcano follows from the state). A state is compiled the first time it's
+    priced, every lookup after that is a single dict access. Breakdowns are
+    read-only mappings shared by every quote in the same class. `version` is
+    the `RateVersion` the rates come from, `None` for `utils.const`.
+    """
+
+    # Breakdowns rebuilt from stored amounts that differ from these rates
+    # are kept, up to this many.
+    MAX_STORED_BREAKDOWNS = 1024
+
+    def __init__(self, rates=None, version=None):
+        self.rates = rates or get_default_rates()
+        self.version = version
+        self._entries = {}
+        self._amounts = {}
+        self._fields = {}
+        self._stored = {}
+
+    def _compile(self, state):
+        rates = self.rates.for_state(state)
+        volcano = state in STATES_WITH_VOLCANOES
+        entries, amounts, fields = {}, {}, {}
+        for canceled, owned in product((False, True), repeat=2):
+            columns = {
+                "canceled": canceled,
+                "not_canceled": not canceled,
+                "volcano": volcano,
+                "owned": owned,
+            }
+            class_fields = fields.setdefault((state, canceled, owned), {})
+            for frequency, base_cost in rates.base_costs.items():
+                key = (frequency, state, canceled, owned)
+                entry = _price(base_cost, rates.modifiers, columns)
+                entries[key] = entry
+                amounts[key] = _amounts(entry[1])
+                class_fields[f"cost_{frequency}"] = entry[0]
+                for (group, name), field in AMOUNT_FIELDS.items():
+                    class_fields[f"{frequency}_{field}"] = float(
+                        entry[1][group][name]["money"]
+                    )
+        # Whole states at a time, so other threads never see half of one.
+        self._amounts.update(amounts)
+        self._fields.update(fields)
+        self._entries.update(entries)
+
+    def lookup(self, frequency, state, canceled, owned):
+        key = (frequency, state, canceled, owned)
+        try:
+            return self._entries[key]
+        except KeyError:
+            self._compile(state)
+            return self._entries[key]
+
+    def fields(self, state, canceled, owned):
+        """The values of the persisted price columns of a quote in this class."""
+        try:
+            return self._fields[(state, canceled, owned)]
+        except KeyError:
+            self._compile(state)
+            return self._fields[(state, canceled, owned)]
+
+    def breakdown(self, frequency, state, canceled, owned, amounts):
+        """
+        The breakdown of a quote priced earlier, from its stored `amounts` (in
+        `AMOUNT_FIELDS` order). For a quote priced with these rates that's the
+        shared breakdown `lookup` returns.
+        """
+        key = (frequency, state, canceled, owned)
+        entry = self.lookup(*key)
+        if amounts == self._amounts[key]:
+            return entry[1]
+
+        stored_key = (*key, amounts)
+        breakdown = self._stored.get(stored_key)
+        if breakdown is None:
+            current = entry[1]
+            breakdown = {group: {} for group in current}
+            for (group, name), money in zip(AMOUNT_FIELDS, amounts):
+                modifier = dict(current[group][name])
+                modifier["money"] = money if modifier["applies"] else 0
+                breakdown[group][name] = modifier
+            breakdown = _freeze(breakdown)
+            if len(self._stored) < self.MAX_STORED_BREAKDOWNS:
+                self._stored[stored_key] = breakdown
+        return breakdown
+
+
+_price_table = None
+
+
+def install_price_table(table):
+    """Make `table` the one new quotes are priced with, in this process."""
+    global _price_table
+    _price_table = table
+    return table
+
+
+def build_price_table(rates=None, version=None):
+    """
+    (Re)build the price table from a `Rates` (by default the rates in
+    `utils.const`) and install it. Called once from `QuoteConfig.ready`,
+    until `quote.rates` loads the current rate version.
+    """
+    return install_price_table(PriceTable(rates, version))
+
+
+def get_price_table():
+    return _price_table or build_price_table()
+
+
+def price_quotes(quotes, rates=None):
+    """
+    Price many `Quote` instances at once, at `rates` (a `Rates`, by default
+    the installed price table's). Returns a dict keyed by frequency of
+    `(costs, breakdowns)`, two lists in the order of `quotes`, with the same
+    numbers as `Quote._calc_fees`. Each state is compiled once, then every
+    quote is a lookup; quotes in the same class share their breakdown.
+    """
+    table = get_price_table() if rates is None else PriceTable(rates)
+    classes = [quote.pricing_class for quote in quotes]
+    result = {}
+    for frequency in FREQUENCIES:
+        entries = [table.lookup(frequency, *flags) for flags in classes]
+        result[frequency] = (
+            [cost for cost, _ in entries],
+            [breakdown for _, breakdown in entries],
+        )
+    return result
+
+
+def init_worker(definition, version):
+    """
+    `ProcessPoolExecutor` initializer: set up Django and price with the given
+    rate definition, as the parent process does, without touching the
+    database.
+    """
+    django.setup()
+    build_price_table(Rates(definition), version)
@@ -0,0 +1,139 @@
+"""
+Generators for the 10 character `Quote.qid` primary key.
+
+The generator in use is configured with the `QUOTE_QID_GENERATOR` setting
+(a dotted path to a `QidGenerator` subclass) and fetched with
+`get_qid_generator()`.
+"""
+import string
+import threading
+import time
+from datetime import datetime
+from datetime import timezone
+from functools import lru_cache
+from random import SystemRandom
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+LETTERS_AND_NUMBERS = string.ascii_uppercase + string.digits
+QID_LENGTH = 10
+
+DEFAULT_QID_GENERATOR = "quote.qid.KSortableQidGenerator"
+
+__all__ = [
+    "LETTERS_AND_NUMBERS",
+    "QID_LENGTH",
+    "QidGenerator",
+    "RandomQidGenerator",
+    "KSortableQidGenerator",
+    "get_qid_generator",
+]
+
+
+class QidGenerator:
+    """Base class for qid generators."""
+
+    def generate(self):
+        raise NotImplementedError
+
+    def generate_block(self, count):
+        """Hand out `count` distinct qids, e.g. for a `bulk_create`."""
+        return [self.generate() for _ in range(count)]
+
+
+class RandomQidGenerator(QidGenerator):
+    """Fully random qids, the original scheme."""
+
+    def __init__(self):
+        self._random = SystemRandom()
+
+    def generate(self):
+        return "".join(
+            self._random.choice(LETTERS_AND_NUMBERS) for _ in range(QID_LENGTH)
+        )
+
+
+class KSortableQidGenerator(QidGenerator):
+    """
+    Time ordered qids: a 6 character base-36 count of seconds since `EPOCH`
+    followed by a 4 character random suffix. qids sort by the second they
+    were created in; within a second they're in random order, so holding one
+    doesn't give away its neighbours. Suffixes drawn twice in the same
+    second by one process are drawn again. Different processes can draw the
+    same one, the primary key constraint is the backstop for that case (see
+    `Quote.save`).
+    """
+
+    # Same characters as `LETTERS_AND_NUMBERS`, in ASCII order so that the
+    # string order of the ids follows their numeric order.
+    ALPHABET = "".join(sorted(LETTERS_AND_NUMBERS))
+    EPOCH = datetime(2022, 1, 1, tzinfo=timezone.utc).timestamp()
+    TIME_LENGTH = 6
+    SUFFIX_LENGTH = QID_LENGTH - TIME_LENGTH
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._random = SystemRandom()
+        self._lock = threading.Lock()
+        # Past half the suffixes most draws would be repeats, so a second
+        # hands out at most that many.
+        self._per_second = len(self.ALPHABET) ** self.SUFFIX_LENGTH // 2
+        self._second = -1
+        self._used = set()
+
+    def _encode(self, value, length):
+        base = len(self.ALPHABET)
+        chars = []
+        for _ in range(length):
+            value, remainder = divmod(value, base)
+            chars.append(self.ALPHABET[remainder])
+        return "".join(reversed(chars))
+
+    def _draw(self, count):
+        """`count` suffixes not handed out yet this second; returns (second, suffixes)."""
+        with self._lock:
+            now = int(self._clock() - self.EPOCH)
+            if now > self._second:
+                self._second = now
+                self._used = set()
+            if len(self._used) + count > self._per_second:
+                # This second is used up, borrow the next one.
+                self._second += 1
+                self._used = set()
+            suffixes = []
+            while len(suffixes) < count:
+                suffix = self._random.randrange(self._per_second * 2)
+                if suffix not in self._used:
+                    self._used.add(suffix)
+                    suffixes.append(suffix)
+            return self._second, suffixes
+
+    def generate(self):
+        return self.generate_block(1)[0]
+
+    def generate_block(self, count):
+        qids = []
+        while count > 0:
+            size = min(count, self._per_second)
+            second, suffixes = self._draw(size)
+            prefix = self._encode(second, self.TIME_LENGTH)
+            qids.extend(
+                prefix + self._encode(suffix, self.SUFFIX_LENGTH) for suffix in suffixes
+            )
+            count -= size
+        return qids
+
+
+@lru_cache(maxsize=None)
+def get_qid_generator():
+    path = getattr(settings, "QUOTE_QID_GENERATOR", DEFAULT_QID_GENERATOR)
+    return import_string(path)()
+
+
+@receiver(setting_changed)
+def _reset_qid_generator(*, setting, **kwargs):
+    if setting == "QUOTE_QID_GENERATOR":
+        get_qid_generator.cache_clear()
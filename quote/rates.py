@@ -0,0 +1,185 @@
+"""
+Versioned rates.
+
+Rate definitions (see `quote.pricing.Rates`) are stored as `RateVersion`
+rows and never changed; publishing new rates adds a version. The newest
+version prices new quotes, and each quote records the version that priced
+it, so its breakdown is always rebuilt with the rates it was sold at.
+
+Every process keeps the current version compiled into a `PriceTable`
+(installed in `quote.pricing`, where pricing code reads it without touching
+the database). At most every `RATES_RELOAD_INTERVAL` seconds, before the
+next request (`RateReloadMiddleware`), it checks for a newer version and
+swaps it in, so published rates reach every worker without a restart. The
+check only ever runs there, outside views and `Quote.save`, so it doesn't
+add a query to them (or their query budgets).
+Tables of older versions, needed to read older quotes, are compiled on
+demand and kept in a small LRU.
+"""
+import asyncio
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db import connections
+from django.db import transaction
+from django.db.models.signals import post_migrate
+
+from utils.lru import LRUCache
+from utils.metrics import register_cache
+
+from quote.pricing import PriceTable
+from quote.pricing import Rates
+from quote.pricing import get_price_table
+from quote.pricing import install_price_table
+
+__all__ = [
+    "refresh_rates",
+    "current_price_table",
+    "price_table_for",
+    "publish_rates",
+    "RateReloadMiddleware",
+]
+
+# Compiled tables of older rate versions kept per process.
+VERSION_TABLES = 16
+
+_lock = threading.Lock()
+_tables = LRUCache(VERSION_TABLES)
+# `time.monotonic()` of the last check for a new version, None before the first.
+_checked = None
+
+
+def _versions():
+    from quote.models import RateVersion
+
+    # Always the primary: a replica may not have the newest version yet.
+    return RateVersion.objects.using(DEFAULT_DB_ALIAS)
+
+
+def _table(version):
+    table = _tables.get(version)
+    if table is None:
+        if version is None:
+            table = PriceTable()
+        else:
+            definition = (
+                _versions().values_list("definition", flat=True).get(pk=version)
+            )
+            table = PriceTable(Rates(definition), version)
+        _tables.set(version, table)
+    return table
+
+
+def _due():
+    # A `RATES_RELOAD_INTERVAL` of None only checks once, e.g. in tests.
+    interval = getattr(settings, "RATES_RELOAD_INTERVAL", 5)
+    if _checked is None:
+        return True
+    return interval is not None and time.monotonic() - _checked >= interval
+
+
+def refresh_rates(force=False):
+    """
+    Install the newest rate version, if it's not the installed one and
+    `RATES_RELOAD_INTERVAL` has passed since the last check (or `force`).
+    Without any version, prices with the rates in `utils.const`. Returns the
+    installed `PriceTable`.
+    """
+    global _checked
+    if not force and not _due():
+        return get_price_table()
+    with _lock:
+        if not force and not _due():
+            return get_price_table()
+        latest = _versions().order_by("-pk").values_list("pk", flat=True).first()
+        table = _table(latest)
+        if get_price_table() is not table:
+            install_price_table(table)
+        _checked = time.monotonic()
+        return table
+
+
+def current_price_table():
+    """
+    The table new quotes are priced with. The newest version is loaded the
+    first time in a process that hasn't served a request (e.g. a management
+    command), after that only `refresh_rates` swaps it.
+    """
+    if _checked is None:
+        return refresh_rates(force=True)
+    return get_price_table()
+
+
+def price_table_for(version):
+    """The table of rate version `version` (None for `utils.const`)."""
+    table = get_price_table()
+    if table.version == version:
+        return table
+    return _table(version)
+
+
+def publish_rates(definition, note=""):
+    """
+    Save `definition` as the new current rate version. This process prices
+    with it once the transaction commits, the others within
+    `RATES_RELOAD_INTERVAL`. Raises `ValueError` when it's invalid.
+    """
+    from quote.models import RateVersion
+
+    rates = Rates(definition)
+    version = RateVersion.objects.create(definition=rates.definition, note=note)
+
+    def install():
+        _tables.set(version.pk, PriceTable(rates, version.pk))
+        refresh_rates(force=True)
+
+    transaction.on_commit(install)
+    return version
+
+
+def _reset(sender, **kwargs):
+    # Versions are reset along with the database (e.g. between tests), so
+    # load them again straight away rather than during the next request.
+    global _checked
+    if sender.label != "quote":
+        return
+    with _lock:
+        _tables.clear()
+        _checked = None
+    connection = connections[DEFAULT_DB_ALIAS]
+    if _versions().model._meta.db_table in connection.introspection.table_names():
+        refresh_rates(force=True)
+
+
+post_migrate.connect(_reset, dispatch_uid="reset_rates")
+register_cache("rate_versions", _tables.stats)
+
+
+class RateReloadMiddleware:
+    """
+    Check for new rates before requests, see `refresh_rates`. Goes first, so
+    the check is not counted against query budgets.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark the instance as a coroutine function for Django's handler.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self._acall(request)
+        refresh_rates()
+        return self.get_response(request)
+
+    async def _acall(self, request):
+        if _due():
+            await sync_to_async(refresh_rates)()
+        return await self.get_response(request)
@@ -1,6 +1,39 @@
+from django.db import connections
+from django.db import router
 from rest_framework import serializers
+from rest_framework.exceptions import NotFound
 
-from quote.models import Address, Quote, QuotePurchase
+from utils.sqlite import write_atomic
+from utils.timing import timed
+
+from quote.cache import invalidate_quote
+from quote.fieldsets import Fieldset
+from quote.fieldsets import compact_breakdown
+from quote.models import Address, Quote, QuotePurchase, chunked
+from quote.models import with_fresh_addresses
+
+
+def validate_items(get_serializer, items):
+    """
+    Validate each item on its own. Returns the per-item results, with the
+    errors filled in, and `(index, validated_data)` of the valid items.
+    """
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        serializer = get_serializer(data=item)
+        try:
+            is_valid = serializer.is_valid()
+        except ValueError as exc:
+            is_valid = False
+            errors = {"detail": exc.args[0] if exc.args else ""}
+        else:
+            errors = serializer.errors
+        if is_valid:
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = {"status_code": 400, "errors": errors}
+    return results, valid
 
 
 class AddressSerializer(serializers.ModelSerializer):
@@ -12,12 +45,36 @@ class AddressSerializer(serializers.ModelSerializer):
     state = serializers.CharField(max_length=2, required=True)
 
     def create(self, validated_data):
-        return Address.objects.get_or_create(**validated_data)
+        return Address.objects.resolve(**validated_data)
+
+
+class QuoteListSerializer(serializers.ListSerializer):
+    def create(self, validated_data):
+        """
+        Create many quotes with a constant number of queries: addresses are
+        resolved in one pass and the quotes are written with `bulk_create`.
+        The returned quotes are in the same order as `validated_data`.
+        """
+        return with_fresh_addresses(lambda: self._create(validated_data))
+
+    def _create(self, validated_data):
+        addresses = Address.objects.get_or_create_many(
+            (attrs["address"]["zipcode"], attrs["address"]["state"])
+            for attrs in validated_data
+        )
+        quotes = []
+        for attrs in validated_data:
+            attrs = {k: v for k, v in attrs.items() if k != "qid"}
+            address = attrs.pop("address")
+            attrs["address"] = addresses[(int(address["zipcode"]), address["state"])]
+            quotes.append(Quote(**attrs))
+        return Quote.objects.bulk_create(quotes)
 
 
 class QuoteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Quote
+        list_serializer_class = QuoteListSerializer
         fields = [
             "qid",
             "date_effective",
@@ -42,20 +99,50 @@ class QuoteSerializer(serializers.ModelSerializer):
 
     address = AddressSerializer(required=True)
 
+    default_fieldset = Fieldset(Meta.fields)
+
+    @staticmethod
+    def with_address(validated_data):
+        attrs = dict(validated_data)
+        if "address" in attrs:
+            attrs["address"], _ = AddressSerializer().create(attrs["address"])
+        return attrs
+
     def create(self, validated_data):
         if "qid" in validated_data:
             # QID should be generated, not provided.
             del validated_data["qid"]
-        for k, v in validated_data.items():
-            if k == "address":
-                validated_data[k], _ = AddressSerializer().create(v)
-        return super().create(validated_data)
+        return with_fresh_addresses(
+            lambda: super(QuoteSerializer, self).create(
+                self.with_address(validated_data)
+            )
+        )
 
     def update(self, instance, validated_data):
-        for k, v in validated_data.items():
-            if k == "address":
-                validated_data[k], _ = AddressSerializer().create(v)
-        return super().update(instance, validated_data)
+        instance = with_fresh_addresses(
+            lambda: super(QuoteSerializer, self).update(
+                instance, self.with_address(validated_data)
+            )
+        )
+        invalidate_quote(instance.qid)
+        return instance
+
+    @staticmethod
+    def build_unsaved(validated_data):
+        """An unsaved quote (and address) to price without touching the database."""
+        attrs = {k: v for k, v in validated_data.items() if k != "qid"}
+        attrs["address"] = Address(**attrs["address"])
+        return Quote(**attrs)
+
+    def price_preview(self, validated_data):
+        """The quote's output, minus the `qid`, without saving anything."""
+        data = self.to_representation(self.build_unsaved(validated_data))
+        data.pop("qid", None)
+        return data
+
+    def run_validation(self, data=serializers.empty):
+        with timed("serialize"):
+            return super().run_validation(data)
 
     def validate(self, attrs):
         try:
@@ -68,16 +155,118 @@ class QuoteSerializer(serializers.ModelSerializer):
         # state automatically
         return super().validate(attrs)
 
+    @classmethod
+    def parse_fieldset(cls, params):
+        return Fieldset.parse(params, cls.Meta.fields)
+
+    @property
+    def fieldset(self):
+        return self.context.get("fieldset") or self.default_fieldset
+
+    def to_representation(self, instance):
+        return self.represent(instance, self.fieldset)
+
+    def represent(self, instance, fieldset):
+        """
+        Same output as the generic `ModelSerializer.to_representation`, but
+        built straight from the row instead of going field by field, and only
+        the fields in `fieldset`.
+        """
+        with timed("serialize"):
+            fields = self.fields
+            data = {}
+            if "qid" in fieldset:
+                data["qid"] = str(instance.qid)
+            if "date_effective" in fieldset:
+                date_effective = instance.date_effective
+                data["date_effective"] = (
+                    None
+                    if date_effective is None
+                    else fields["date_effective"].to_representation(date_effective)
+                )
+            if "date_previous_canceled" in fieldset:
+                date_previous_canceled = instance.date_previous_canceled
+                data["date_previous_canceled"] = (
+                    None
+                    if date_previous_canceled is None
+                    else fields["date_previous_canceled"].to_representation(
+                        date_previous_canceled
+                    )
+                )
+            if "is_owned" in fieldset:
+                data["is_owned"] = bool(instance.is_owned)
+            if "address" in fieldset:
+                address = instance.address
+                data["address"] = (
+                    None
+                    if address is None
+                    else {"zipcode": int(address.zipcode), "state": str(address.state)}
+                )
+
+            breakdowns = {}
+            for frequency in ("monthly", "biannually"):
+                if f"breakdown_{frequency}" in fieldset:
+                    cost, breakdowns[frequency] = instance.cost_and_breakdown(frequency)
+                elif f"cost_{frequency}" in fieldset:
+                    # Without looking up the breakdown.
+                    cost = instance.cost(frequency)
+                else:
+                    continue
+                if f"cost_{frequency}" in fieldset:
+                    data[f"cost_{frequency}"] = "{:.2f}".format(round(cost, 2))
+            for frequency, breakdown in breakdowns.items():
+                if fieldset.breakdown == "compact":
+                    breakdown = compact_breakdown(breakdown)
+                data[f"breakdown_{frequency}"] = breakdown
+            return data
+
     def get_cost_biannually(self, obj):
-        return "{:.2f}".format(round(obj.cost_biannually, 2))
+        return "{:.2f}".format(round(obj.cost_and_breakdown_biannually[0], 2))
 
     def get_cost_monthly(self, obj):
-        return "{:.2f}".format(round(obj.cost_monthly, 2))
+        return "{:.2f}".format(round(obj.cost_and_breakdown_monthly[0], 2))
+
+
+class QuotePurchaseListSerializer(serializers.ListSerializer):
+    def create(self, validated_data):
+        """
+        Purchase many quotes in one transaction. The quotes and addresses are
+        loaded, and locked, with one query per chunk of quote ids. Returns the
+        purchases in input order, `None` where the quote doesn't exist.
+        """
+        qids = sorted({attrs["quote_id"] for attrs in validated_data})
+        using = router.db_for_write(QuotePurchase)
+        with write_atomic(using):
+            quotes = {}
+            for chunk in chunked(qids):
+                # In qid order, so concurrent batches lock rows in the same order.
+                for quote in (
+                    Quote.objects.locked_with_address()
+                    .filter(qid__in=chunk)
+                    .order_by("qid")
+                ):
+                    quotes[quote.qid] = quote
+
+            purchases = [
+                QuotePurchaseSerializer.build(quotes[attrs["quote_id"]], attrs)
+                if attrs["quote_id"] in quotes
+                else None
+                for attrs in validated_data
+            ]
+            to_insert = [purchase for purchase in purchases if purchase is not None]
+            if connections[using].features.can_return_rows_from_bulk_insert:
+                QuotePurchase.objects.bulk_create(to_insert)
+            else:
+                # e.g. SQLite: `bulk_create` wouldn't set the primary keys.
+                for purchase in to_insert:
+                    purchase.save(force_insert=True, using=using)
+        return purchases
 
 
 class QuotePurchaseSerializer(serializers.ModelSerializer):
     class Meta:
         model = QuotePurchase
+        list_serializer_class = QuotePurchaseListSerializer
         fields = [
             "payment_frequency",
             "payment_amount",
@@ -101,26 +290,97 @@ class QuotePurchaseSerializer(serializers.ModelSerializer):
     fee_state_amt = serializers.FloatField(read_only=True)
 
     quote = QuoteSerializer(read_only=True, required=False)
-    quote_id = serializers.CharField(write_only=True)
+    quote_id = serializers.CharField(write_only=True, max_length=10)
 
-    def create(self, validated_data: dict):
-        # Get the quote from the provided ID
-        qid = validated_data["quote_id"]
-        quote = Quote.objects.get(qid=qid)
-        validated_data["quote"] = quote
-        del validated_data["quote_id"]
+    amount_fields = [
+        "discount_canceled_amt",
+        "discount_owns_property_amt",
+        "fee_canceled_amt",
+        "fee_state_amt",
+    ]
+    # What `to_representation` renders, in order.
+    output_fields = [
+        "payment_frequency",
+        "payment_amount",
+        "quote",
+        *amount_fields,
+        "pk",
+    ]
+    default_fieldset = Fieldset(
+        output_fields, nested={"quote": QuoteSerializer.default_fieldset}
+    )
+
+    def run_validation(self, data=serializers.empty):
+        with timed("serialize"):
+            return super().run_validation(data)
+
+    @classmethod
+    def parse_fieldset(cls, params):
+        return Fieldset.parse(
+            params, cls.output_fields, nested={"quote": QuoteSerializer.Meta.fields}
+        )
+
+    @property
+    def fieldset(self):
+        return self.context.get("fieldset") or self.default_fieldset
 
-        if validated_data["payment_frequency"] == "Monthly":
+    def to_representation(self, instance):
+        # Same output as the generic `ModelSerializer.to_representation`, but
+        # built straight from the row instead of going field by field, and
+        # only the fields in the fieldset.
+        with timed("serialize"):
+            fieldset = self.fieldset
+            data = {}
+            if "payment_frequency" in fieldset:
+                data["payment_frequency"] = str(instance.payment_frequency)
+            if "payment_amount" in fieldset:
+                data["payment_amount"] = float(instance.payment_amount)
+            if "quote" in fieldset:
+                quote = instance.quote
+                data["quote"] = (
+                    None
+                    if quote is None
+                    else self.fields["quote"].represent(quote, fieldset.nested["quote"])
+                )
+            for field in self.amount_fields:
+                if field in fieldset:
+                    data[field] = float(getattr(instance, field))
+            if "pk" in fieldset:
+                data["pk"] = instance.pk
+            return data
+
+    @staticmethod
+    def build(quote, validated_data):
+        """An unsaved purchase of `quote`, priced from its breakdown."""
+        attrs = {k: v for k, v in validated_data.items() if k != "quote_id"}
+        if attrs["payment_frequency"] == "Monthly":
             cost, breakdown = quote.cost_and_breakdown_monthly
         else:
             cost, breakdown = quote.cost_and_breakdown_biannually
 
         # Set values for this purchase
-        validated_data.update(
+        attrs.update(
+            quote=quote,
             payment_amount=cost,
             discount_canceled_amt=breakdown["discounts"]["canceled"]["money"],
             discount_owns_property_amt=breakdown["discounts"]["owns_property"]["money"],
             fee_canceled_amt=breakdown["fees"]["canceled"]["money"],
             fee_state_amt=breakdown["fees"]["state_with_volcano"]["money"],
         )
-        return super().create(validated_data)
+        return QuotePurchase(**attrs)
+
+    def create(self, validated_data: dict):
+        """
+        One query loads the quote and its address, locking the quote (on
+        SQLite, taking the write lock up front) so a concurrent update can't
+        change it between pricing and the insert.
+        """
+        qid = validated_data["quote_id"]
+        with write_atomic(router.db_for_write(QuotePurchase)):
+            try:
+                quote = Quote.objects.locked_with_address().get(qid=qid)
+            except Quote.DoesNotExist:
+                raise NotFound(f"Quote {qid} not found.")
+            purchase = self.build(quote, validated_data)
+            purchase.save(force_insert=True)
+        return purchase
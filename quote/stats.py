@@ -0,0 +1,318 @@
+"""
+Quote and purchase statistics for the ops dashboard.
+
+Every number comes out of a database `GROUP BY`. Whole days are read from
+the `DailyQuoteStats`/`DailyPurchaseStats` summary tables, which
+`refresh_daily_stats` brings up to date incrementally (run
+`manage.py refresh_daily_stats` from cron, e.g. a few minutes after
+midnight). Days the summary doesn't cover yet, usually just today, are
+aggregated live from the base tables. Rows written later with an earlier
+`date_created`, like imported history, need `refresh_days`.
+"""
+from datetime import datetime
+from datetime import time
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models import F
+from django.db.models import Q
+from django.db.models import Sum
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from quote.models import DailyPurchaseStats
+from quote.models import DailyQuoteStats
+from quote.models import DailyStatsWatermark
+from quote.models import Quote
+from quote.models import QuotePurchase
+from utils.sqlite import write_atomic
+
+__all__ = [
+    "refresh_daily_stats",
+    "refresh_days",
+    "get_stats",
+    "parse_day",
+    "start_of_day",
+]
+
+# Rows committed a little after a refresh may carry an earlier `date_created`;
+# each refresh looks back this far past the previous one to pick them up.
+REFRESH_OVERLAP = timedelta(minutes=10)
+
+# (summary/base column, output group, output name)
+AMOUNTS = [
+    ("fee_canceled_amt", "fees", "canceled"),
+    ("fee_state_amt", "fees", "state_with_volcano"),
+    ("discount_canceled_amt", "discounts", "canceled"),
+    ("discount_owns_property_amt", "discounts", "owns_property"),
+]
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def parse_day(params, name, default=None):
+    """The `YYYY-MM-DD` query parameter `name`, or `default` if it's missing."""
+    value = params.get(name)
+    if value is None:
+        return default
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError(f"`{name}` must be a date (YYYY-MM-DD).")
+    return day
+
+
+def _in_days(days):
+    """`date_created` within any of `days`, as index friendly ranges."""
+    return reduce(
+        or_,
+        (
+            Q(date_created__gte=start_of_day(day))
+            & Q(date_created__lt=start_of_day(day + timedelta(days=1)))
+            for day in days
+        ),
+    )
+
+
+def quote_totals(quotes, *group_by):
+    """Quotes and how many of them were purchased, grouped by `day`/`state`."""
+    return (
+        quotes.annotate(
+            day=TruncDate("date_created"),
+            state=Coalesce(F("address__state"), Value("")),
+        )
+        .values(*group_by)
+        .annotate(
+            # The join with purchases repeats quotes, so count distinct ones.
+            total_quotes=Count("qid", distinct=True),
+            total_converted=Count("quotepurchase__quote", distinct=True),
+        )
+        .order_by()
+    )
+
+
+def purchase_totals(purchases, *group_by):
+    """Purchases, revenue and amounts, grouped by `day`/`state`/`payment_frequency`."""
+    return (
+        purchases.annotate(
+            day=TruncDate("date_created"),
+            state=Coalesce(F("quote__address__state"), Value("")),
+        )
+        .values(*group_by)
+        .annotate(
+            total_purchases=Count("id"),
+            total_revenue=Sum("payment_amount"),
+            **{f"total_{column}": Sum(column) for column, _, _ in AMOUNTS},
+        )
+        .order_by()
+    )
+
+
+def _days(queryset, field="date_created"):
+    return set(
+        queryset.annotate(day=TruncDate(field))
+        .values_list("day", flat=True)
+        .distinct()
+        .order_by()
+    )
+
+
+def _summarize(quotes, purchases):
+    DailyQuoteStats.objects.bulk_create(
+        DailyQuoteStats(
+            day=row["day"],
+            state=row["state"],
+            quotes=row["total_quotes"],
+            converted=row["total_converted"],
+        )
+        for row in quote_totals(quotes, "day", "state")
+    )
+    DailyPurchaseStats.objects.bulk_create(
+        DailyPurchaseStats(
+            day=row["day"],
+            state=row["state"],
+            payment_frequency=row["payment_frequency"],
+            purchases=row["total_purchases"],
+            revenue=row["total_revenue"],
+            **{column: row[f"total_{column}"] for column, _, _ in AMOUNTS},
+        )
+        for row in purchase_totals(purchases, "day", "state", "payment_frequency")
+    )
+
+
+def _resummarize(quote_days, purchase_days, until):
+    """Recompute the summary rows of the given days, before `until`."""
+    quotes = Quote.objects.filter(date_created__lt=until)
+    purchases = QuotePurchase.objects.filter(date_created__lt=until)
+    DailyQuoteStats.objects.filter(day__in=quote_days).delete()
+    DailyPurchaseStats.objects.filter(day__in=purchase_days).delete()
+    _summarize(
+        quotes.filter(_in_days(quote_days)) if quote_days else quotes.none(),
+        purchases.filter(_in_days(purchase_days))
+        if purchase_days
+        else purchases.none(),
+    )
+    return len(quote_days | purchase_days)
+
+
+def refresh_daily_stats(now=None, full=False):
+    """
+    Bring the summary tables up to the start of today. Only the days that
+    changed since the last refresh are recomputed: days with new quotes or
+    purchases, and the days the newly purchased quotes were created on (their
+    `converted` count moved). `full` rebuilds every day instead, e.g. after
+    deleting rows. Returns the number of days recomputed.
+    """
+    until = start_of_day(timezone.localdate(now or timezone.now()))
+    with transaction.atomic():
+        watermark = DailyStatsWatermark.objects.select_for_update().first()
+        quotes = Quote.objects.filter(date_created__lt=until)
+        purchases = QuotePurchase.objects.filter(date_created__lt=until)
+        if full or watermark is None:
+            DailyQuoteStats.objects.all().delete()
+            DailyPurchaseStats.objects.all().delete()
+            _summarize(quotes, purchases)
+            days = len(_days(quotes) | _days(purchases))
+        else:
+            since = watermark.refreshed_until - REFRESH_OVERLAP
+            new_purchases = purchases.filter(date_created__gte=since)
+            quote_days = _days(quotes.filter(date_created__gte=since)) | _days(
+                new_purchases.exclude(quote=None), "quote__date_created"
+            )
+            days = _resummarize(quote_days, _days(new_purchases), until)
+
+        if watermark is None:
+            DailyStatsWatermark.objects.create(refreshed_until=until)
+        else:
+            watermark.refreshed_until = max(until, watermark.refreshed_until)
+            watermark.save()
+    return days
+
+
+def refresh_days(quote_days, purchase_days):
+    """
+    Recompute the summary of the given days (dates): those with quotes, or
+    purchases, written with a `date_created` the incremental refresh has
+    already gone past, e.g. imported history. Days it hasn't summarized yet
+    are left to it. Returns the number of days recomputed.
+    """
+    if not quote_days and not purchase_days:
+        return 0
+    with write_atomic():
+        watermark = DailyStatsWatermark.objects.select_for_update().first()
+        if watermark is None:
+            # The first refresh summarizes every day.
+            return 0
+        until = watermark.refreshed_until
+        summarized = timezone.localdate(until)
+        return _resummarize(
+            {day for day in quote_days if day < summarized},
+            {day for day in purchase_days if day < summarized},
+            until,
+        )
+
+
+def _add(totals, key, row):
+    entry = totals.setdefault(key, {})
+    for name, value in row.items():
+        if name.startswith("total_"):
+            entry[name] = entry.get(name, 0) + (value or 0)
+
+
+def get_stats(start, end):
+    """
+    Totals for the quotes and purchases created from day `start` to day
+    `end`, both included.
+    """
+    watermark = DailyStatsWatermark.objects.first()
+    summarized_until = (
+        timezone.localdate(watermark.refreshed_until) if watermark else start
+    )
+    by_state, by_frequency = {}, {}
+
+    # Whole days from the summary tables...
+    summary_end = min(end + timedelta(days=1), summarized_until)
+    if start < summary_end:
+        days = Q(day__gte=start) & Q(day__lt=summary_end)
+        for row in (
+            DailyQuoteStats.objects.filter(days)
+            .values("state")
+            .annotate(total_quotes=Sum("quotes"), total_converted=Sum("converted"))
+            .order_by()
+        ):
+            _add(by_state, row["state"], row)
+        for row in (
+            DailyPurchaseStats.objects.filter(days)
+            .values("payment_frequency")
+            .annotate(
+                total_purchases=Sum("purchases"),
+                total_revenue=Sum("revenue"),
+                **{f"total_{column}": Sum(column) for column, _, _ in AMOUNTS},
+            )
+            .order_by()
+        ):
+            _add(by_frequency, row["payment_frequency"], row)
+
+    # ...and the rest live from the base tables.
+    live_start = max(start, summarized_until)
+    if live_start <= end:
+        created = Q(date_created__gte=start_of_day(live_start)) & Q(
+            date_created__lt=start_of_day(end + timedelta(days=1))
+        )
+        for row in quote_totals(Quote.objects.filter(created), "state"):
+            _add(by_state, row["state"], row)
+        for row in purchase_totals(
+            QuotePurchase.objects.filter(created), "payment_frequency"
+        ):
+            _add(by_frequency, row["payment_frequency"], row)
+
+    quotes = sum(row["total_quotes"] for row in by_state.values())
+    converted = sum(row["total_converted"] for row in by_state.values())
+    stats = {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "summarized_until": watermark.refreshed_until.isoformat()
+        if watermark
+        else None,
+        "quotes": {
+            "total": quotes,
+            "by_state": {
+                state: row["total_quotes"] for state, row in sorted(by_state.items())
+            },
+        },
+        "conversion": {
+            "quotes": quotes,
+            "converted": converted,
+            "rate": round(converted / quotes, 4) if quotes else None,
+        },
+        "purchases": {
+            "total": sum(row["total_purchases"] for row in by_frequency.values()),
+            "revenue": round(
+                sum(row["total_revenue"] for row in by_frequency.values()), 2
+            ),
+            "by_payment_frequency": {
+                frequency: {
+                    "purchases": row["total_purchases"],
+                    "revenue": round(row["total_revenue"], 2),
+                }
+                for frequency, row in sorted(by_frequency.items())
+            },
+        },
+        "fees": {},
+        "discounts": {},
+    }
+    for column, group, name in AMOUNTS:
+        stats[group][name] = round(
+            sum(row[f"total_{column}"] for row in by_frequency.values()), 2
+        )
+    return stats
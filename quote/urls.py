@@ -1,4 +1,6 @@
+from django.urls import path
 from rest_framework import routers
+from quote import async_views
 from quote import views
 
 
@@ -7,3 +9,12 @@ quote_router = routers.DefaultRouter()
 
 quote_router.register(r"quotes", views.QuoteViewSet, basename="quote")
 quote_router.register(r"purchase", views.QuotePurchaseViewSet, basename="purchase")
+quote_router.register(r"stats", views.StatsViewSet, basename="stats")
+
+
+async_urlpatterns = [
+    path("quotes/", async_views.quote_create, name="async-quote-list"),
+    path("quotes/price/", async_views.quote_price, name="async-quote-price"),
+    path("quotes/<str:qid>/", async_views.quote_detail, name="async-quote-detail"),
+    path("purchase/", async_views.purchase_create, name="async-purchase-list"),
+]
@@ -1,21 +1,207 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework import status
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from quote.cache import CachedRetrieveMixin
+from quote.cache import invalidate_purchase
+from quote.cache import invalidate_quote
+from quote.export import StreamingExportMixin
+from quote.fieldsets import SparseFieldsetMixin
 from quote.serializers import QuoteSerializer
+from quote.serializers import validate_items
 from quote.serializers import QuotePurchaseSerializer
 from quote.models import Quote
 from quote.models import QuotePurchase
+from quote.stats import get_stats
+from quote.stats import parse_day
+from utils.filters import RangeFilterBackend
+from utils.filters import StableOrderingFilter
+from utils.pagination import OptInKeysetPagination
 
-__all__ = ["QuoteViewSet", "QuotePurchaseViewSet"]
+__all__ = ["QuoteViewSet", "QuotePurchaseViewSet", "StatsViewSet"]
 
 
-class QuoteViewSet(viewsets.ModelViewSet):
-    queryset = Quote.objects.all()
+class QuoteViewSet(
+    SparseFieldsetMixin,
+    CachedRetrieveMixin,
+    StreamingExportMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = Quote.objects.select_related("address").order_by("-date_created", "-pk")
     serializer_class = QuoteSerializer
+    query_budgets = {"list": 2, "retrieve": 1, "price": 0}
+    pagination_class = OptInKeysetPagination
+    filter_backends = [RangeFilterBackend, StableOrderingFilter]
+    range_filter_fields = ["cost_monthly", "cost_biannually"]
+    ordering_fields = ["date_created", "date_effective", *range_filter_fields]
+    export_queryset = Quote.objects.all()
+    export_columns = [
+        ("qid", "qid"),
+        ("date_created", "date_created"),
+        ("date_effective", "date_effective"),
+        ("date_previous_canceled", "date_previous_canceled"),
+        ("is_owned", "is_owned"),
+        ("state", "address__state"),
+        ("zipcode", "address__zipcode"),
+        *((field, field) for field in Quote.PRICE_FIELDS),
+    ]
     # permission_classes = [permissions.IsAuthenticated]
     # filter_backends = [AllowStaffLimitUserFilterBackend]
 
+    def get_last_modified(self, instance):
+        return instance.date_modified
+
+    def perform_destroy(self, instance):
+        # Before the delete, while the purchases still point at the quote.
+        invalidate_quote(instance.qid)
+        super().perform_destroy(instance)
+
+    def validate_items(self, items):
+        return validate_items(self.get_serializer, items)
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Create many quotes from a JSON array. Each item is validated on its
+        own and the response holds one result per item, in input order.
+        """
+        if not isinstance(request.data, list):
+            raise ValueError("Expected a list of quotes.")
+
+        results, valid = self.validate_items(request.data)
+        list_serializer = self.get_serializer(many=True)
+        quotes = list_serializer.create([attrs for _, attrs in valid])
+        for (index, _), quote in zip(valid, quotes):
+            results[index] = {
+                "status_code": 201,
+                "data": self.get_serializer(quote).data,
+            }
+
+        all_created = len(valid) == len(results)
+        return Response(
+            results,
+            status=status.HTTP_201_CREATED
+            if all_created
+            else status.HTTP_207_MULTI_STATUS,
+        )
+
+    @action(detail=False, methods=["post"])
+    def price(self, request):
+        """
+        Price a quote payload (or a JSON array of them) without saving it.
+        Nothing is read from or written to the database.
+        """
+        if not isinstance(request.data, list):
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            return Response(serializer.price_preview(serializer.validated_data))
+
+        serializer = self.get_serializer()
+        results, valid = self.validate_items(request.data)
+        for index, attrs in valid:
+            results[index] = {
+                "status_code": 200,
+                "data": serializer.price_preview(attrs),
+            }
+        return Response(results)
+
 
-class QuotePurchaseViewSet(viewsets.ModelViewSet):
-    queryset = QuotePurchase.objects.all()
+class QuotePurchaseViewSet(
+    SparseFieldsetMixin,
+    CachedRetrieveMixin,
+    StreamingExportMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = QuotePurchase.objects.select_related("quote__address").order_by(
+        "-date_created", "-pk"
+    )
     serializer_class = QuotePurchaseSerializer
+    query_budgets = {"list": 2, "retrieve": 1}
+    pagination_class = OptInKeysetPagination
+    export_queryset = QuotePurchase.objects.all()
+    export_columns = [
+        ("pk", "pk"),
+        ("date_created", "date_created"),
+        ("quote_id", "quote_id"),
+        ("state", "quote__address__state"),
+        ("zipcode", "quote__address__zipcode"),
+        ("payment_frequency", "payment_frequency"),
+        ("payment_amount", "payment_amount"),
+        ("discount_canceled_amt", "discount_canceled_amt"),
+        ("discount_owns_property_amt", "discount_owns_property_amt"),
+        ("fee_canceled_amt", "fee_canceled_amt"),
+        ("fee_state_amt", "fee_state_amt"),
+    ]
     # permission_classes = [permissions.IsAuthenticated]
     # filter_backends = [AllowStaffLimitUserFilterBackend]
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Purchase many quotes from a JSON array, in one transaction. Each item
+        gets its own result, in input order: 201 with the purchase, 400 for
+        an invalid item or 404 for an unknown `quote_id`.
+        """
+        if not isinstance(request.data, list):
+            raise ValueError("Expected a list of purchases.")
+
+        results, valid = validate_items(self.get_serializer, request.data)
+        list_serializer = self.get_serializer(many=True)
+        purchases = list_serializer.create([attrs for _, attrs in valid])
+        for (index, attrs), purchase in zip(valid, purchases):
+            if purchase is None:
+                results[index] = {
+                    "status_code": 404,
+                    "errors": {"detail": f"Quote {attrs['quote_id']} not found."},
+                }
+            else:
+                results[index] = {
+                    "status_code": 201,
+                    "data": self.get_serializer(purchase).data,
+                }
+
+        all_created = all(result["status_code"] == 201 for result in results)
+        return Response(
+            results,
+            status=status.HTTP_201_CREATED
+            if all_created
+            else status.HTTP_207_MULTI_STATUS,
+        )
+
+    def get_last_modified(self, instance):
+        if instance.quote is None:
+            return instance.date_created
+        return max(instance.date_created, instance.quote.date_modified)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        invalidate_purchase(serializer.instance.pk)
+
+    def perform_destroy(self, instance):
+        pk = instance.pk
+        super().perform_destroy(instance)
+        invalidate_purchase(pk)
+
+
+class StatsViewSet(viewsets.ViewSet):
+    """
+    Quote counts by state, conversion, revenue by payment frequency and
+    fee/discount totals for the quotes and purchases created between
+    `?start=` and `?end=` (dates, both included; the last 30 days by
+    default).
+    """
+
+    query_budgets = {"list": 5}
+    default_days = 30
+
+    def list(self, request):
+        params = request.query_params
+        end = parse_day(params, "end", timezone.localdate())
+        start = parse_day(params, "start", end - timedelta(days=self.default_days - 1))
+        if start > end:
+            raise ValueError("`start` must not be after `end`.")
+        return Response(get_stats(start, end))
@@ -0,0 +1,11 @@
+"""Payloads shared by the quote tests."""
+
+
+def quote_data(state="WA", zipcode="99999", canceled=False, owned=False):
+    """A quote as posted to `/quote/quotes/`."""
+    return {
+        "date_effective": "2022-01-01T00:00:00.000",
+        "date_previous_canceled": "2022-01-01" if canceled else None,
+        "is_owned": owned,
+        "address": {"state": state, "zipcode": zipcode},
+    }
@@ -0,0 +1,131 @@
+from django.db import connection
+from django.db import transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework.test import APITransactionTestCase
+
+from quote.models import Address
+from quote.models import Quote
+from quote.models import get_address_cache
+from utils.lru import LRUCache
+from test.quote.helpers import quote_data
+
+
+class TestLRUCache(APITestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats() == {
+            "size": 2,
+            "maxsize": 2,
+            "hits": 3,
+            "misses": 1,
+            "evictions": 1,
+        }
+
+
+@override_settings(QUERY_COUNT_HEADER=True)
+class TestAddressCache(APITransactionTestCase):
+    # Addresses are only cached once their transaction commits.
+
+    def setUp(self):
+        get_address_cache().clear()
+
+    def create(self, **address):
+        response = self.client.post(
+            "/quote/quotes/", quote_data(**address), format="json"
+        )
+        assert response.status_code == 201
+        return response
+
+    def test_create_skips_address_query(self):
+        first = self.create()
+        stats = get_address_cache().stats()
+        with CaptureQueriesContext(connection) as queries:
+            second = self.create()
+
+        assert int(second["X-Query-Count"]) < int(first["X-Query-Count"])
+        assert not [query for query in queries if "quote_address" in query["sql"]]
+        assert get_address_cache().stats()["hits"] == stats["hits"] + 1
+        assert Address.objects.count() == 1
+        assert Quote.objects.filter(address__state="WA").count() == 2
+
+    def test_update(self):
+        qid = self.create().json()["qid"]
+        self.create(state="OH")
+        response = self.client.patch(
+            f"/quote/quotes/{qid}/", quote_data(state="OH"), format="json"
+        )
+
+        assert response.json()["address"] == {"zipcode": 99999, "state": "OH"}
+        assert Address.objects.count() == 2
+
+    def test_bulk_paths(self):
+        self.client.post("/quote/quotes/bulk/", [quote_data()] * 3, format="json")
+        with CaptureQueriesContext(connection) as queries:
+            addresses = Address.objects.get_or_create_many(
+                [(99999, "WA"), ("99999", "WA")]
+            )
+        assert len(queries) == 0
+        assert addresses[(99999, "WA")].pk == Address.objects.get().pk
+
+    def test_forgets_deleted_addresses(self):
+        self.create()
+        old = Address.objects.get()
+        old.delete()
+        self.create()
+
+        new = Address.objects.get()
+        assert new.pk != old.pk
+        assert Quote.objects.filter(address=new).count() == 1
+
+    def forget_in_this_process_only(self, state="WA"):
+        address = Address.objects.get(state=state)
+        pk = address.pk
+        Quote.objects.filter(address=address).delete()
+        address.delete()
+        # Another process deleted it, this one still has it cached.
+        get_address_cache().set((state, 99999), pk)
+        return pk
+
+    def test_address_deleted_by_another_process(self):
+        qid = self.create(state="OH").json()["qid"]
+        self.create()
+        stale = self.forget_in_this_process_only()
+        self.create()
+        assert Address.objects.get(state="WA").pk != stale
+
+        self.forget_in_this_process_only()
+        response = self.client.post(
+            "/quote/quotes/bulk/", [quote_data()] * 2, format="json"
+        )
+        assert response.status_code == 201
+        assert Quote.objects.filter(address__state="WA").count() == 2
+
+        self.forget_in_this_process_only()
+        response = self.client.put(f"/quote/quotes/{qid}/", quote_data(), format="json")
+        assert response.status_code == 200
+        address = Address.objects.get(state="WA")
+        assert Quote.objects.get(qid=qid).address == address
+        assert get_address_cache().get(("WA", 99999)) == address.pk
+
+    def test_rolled_back_address_not_cached(self):
+        try:
+            with transaction.atomic():
+                Address.objects.resolve(12345, "CA")
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        assert get_address_cache().get(("CA", 12345)) is None
+        address, created = Address.objects.resolve(12345, "CA")
+        assert created
+        assert get_address_cache().get(("CA", 12345)) == address.pk
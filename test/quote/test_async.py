@@ -0,0 +1,87 @@
+from rest_framework.test import APITransactionTestCase
+
+from quote.models import Quote, QuotePurchase
+
+
+class TestAsyncEndpoints(APITransactionTestCase):
+    # The async views run their queries on pool threads, which can't see the
+    # uncommitted data of a per-test transaction.
+
+    data = {
+        "date_effective": "2022-01-01T00:00:00.000",
+        "date_previous_canceled": "2022-01-01",
+        "is_owned": False,
+        "address": {"state": "WA", "zipcode": "99999"},
+    }
+
+    def test_create_and_get(self):
+        created = self.client.post("/quote/async/quotes/", self.data, format="json")
+        assert created.status_code == 201
+        qid = created.json()["qid"]
+
+        response = self.client.get(f"/quote/async/quotes/{qid}/")
+        assert response.status_code == 200
+        assert response.json() == created.json()
+        assert response.json() == self.client.get(f"/quote/quotes/{qid}/").json()
+
+    def test_matches_sync_create(self):
+        created = self.client.post("/quote/async/quotes/", self.data, format="json")
+        sync_created = self.client.post("/quote/quotes/", self.data, format="json")
+        async_data, sync_data = created.json(), sync_created.json()
+        del async_data["qid"], sync_data["qid"]
+        assert async_data == sync_data
+
+    def test_price(self):
+        response = self.client.post(
+            "/quote/async/quotes/price/", self.data, format="json"
+        )
+        expected = self.client.post("/quote/quotes/price/", self.data, format="json")
+        assert response.json() == expected.json()
+
+        response = self.client.post(
+            "/quote/async/quotes/price/", [self.data, {}], format="json"
+        )
+        results = response.json()
+        assert results[0]["data"] == expected.json()
+        assert results[1]["status_code"] == 400
+        assert Quote.objects.count() == 0
+
+    def test_purchase(self):
+        qid = self.client.post("/quote/quotes/", self.data, format="json").json()["qid"]
+        response = self.client.post(
+            "/quote/async/purchase/",
+            {"quote_id": qid, "payment_frequency": "Monthly"},
+            format="json",
+        )
+        assert response.status_code == 201
+        assert response.json()["payment_amount"] == 13.99
+        assert response.json()["quote"]["qid"] == qid
+        assert QuotePurchase.objects.count() == 1
+
+    def test_errors(self):
+        response = self.client.get("/quote/async/quotes/XXXXXXXXXX/")
+        assert response.status_code == 404
+        assert response.json() == {"detail": "Not found.", "status_code": 404}
+
+        data = dict(self.data, address={"state": "XX", "zipcode": "99999"})
+        response = self.client.post("/quote/async/quotes/", data, format="json")
+        assert response.json() == {
+            "detail": "Invalid State Provided.",
+            "status_code": 400,
+        }
+
+        response = self.client.post("/quote/async/quotes/", {}, format="json")
+        assert response.status_code == 400
+        assert "date_effective" in response.json()
+
+        response = self.client.post(
+            "/quote/async/purchase/",
+            {"quote_id": "XXXXXXXXXX", "payment_frequency": "Monthly"},
+            format="json",
+        )
+        assert response.json() == {
+            "detail": "Quote XXXXXXXXXX not found.",
+            "status_code": 404,
+        }
+
+        assert self.client.get("/quote/async/quotes/").status_code == 405
@@ -0,0 +1,119 @@
+from unittest import mock
+
+from django.db import connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITransactionTestCase
+
+from quote.models import Quote
+from utils.db_router import PIN_COOKIE
+from utils.db_router import PIN_HEADER
+from utils.db_router import ReadReplicaRouter
+from utils.db_router import replica_reads
+
+QUOTE = {
+    "date_effective": "2022-01-01T00:00:00.000",
+    "date_previous_canceled": "2022-01-01",
+    "is_owned": False,
+    "address": {"state": "WA", "zipcode": "99999"},
+}
+
+
+@override_settings(READ_REPLICA_DATABASE="replica")
+class TestReadReplicaRouting(APITransactionTestCase):
+    # The replica mirrors the test database, on its own connection, which
+    # can't see the uncommitted data of a per-test transaction.
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        self.qid = self.client.post("/quote/quotes/", QUOTE, format="json").json()[
+            "qid"
+        ]
+        self.client.cookies.pop(PIN_COOKIE, None)
+
+    def queries(self, method, path, data=None):
+        with CaptureQueriesContext(
+            connections["default"]
+        ) as primary, CaptureQueriesContext(connections["replica"]) as replica:
+            response = getattr(self.client, method)(path, data, format="json")
+        assert response.status_code < 400
+        return response, len(primary), len(replica)
+
+    def test_reads_from_replica(self):
+        for path in ["/quote/quotes/", "/quote/stats/"]:
+            response, primary, replica = self.queries("get", path)
+            assert primary == 0
+            assert replica > 0
+            assert PIN_COOKIE not in response.cookies
+
+    def test_detail_cache_filled_from_primary(self):
+        # Or a lagging replica's stale row would be cached.
+        path = f"/quote/quotes/{self.qid}/"
+        _, primary, replica = self.queries("get", path)
+        assert primary > 0
+        assert replica == 0
+        _, primary, replica = self.queries("get", path)
+        assert primary == replica == 0
+
+    def test_writes_to_primary_and_pins(self):
+        response, primary, replica = self.queries(
+            "post",
+            "/quote/purchase/",
+            {"quote_id": self.qid, "payment_frequency": "Monthly"},
+        )
+        # The purchase's reads stay on the primary too.
+        assert primary > 0
+        assert replica == 0
+        assert response.cookies[PIN_COOKIE]["max-age"] == 5
+        assert response[PIN_HEADER] == "5"
+
+        # Reads right after the write see it...
+        _, primary, replica = self.queries("get", "/quote/purchase/")
+        assert primary > 0
+        assert replica == 0
+
+        # ...and go back to the replica once the pin expires.
+        self.client.cookies.pop(PIN_COOKIE)
+        _, primary, replica = self.queries("get", "/quote/purchase/")
+        assert primary == 0
+        assert replica > 0
+
+    def test_pinned_by_header(self):
+        # For API clients that don't keep cookies.
+        response, _, _ = self.queries("post", "/quote/quotes/", QUOTE)
+        self.client.cookies.pop(PIN_COOKIE)
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            response = self.client.get(
+                "/quote/quotes/", **{"HTTP_X_PRIMARY_DB_PIN": response[PIN_HEADER]}
+            )
+        assert response.status_code == 200
+        assert len(replica) == 0
+
+    def test_async_views(self):
+        chosen = []
+        db_for_read = ReadReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            chosen.append(db_for_read(router, model, **hints))
+            return chosen[-1]
+
+        with mock.patch.object(ReadReplicaRouter, "db_for_read", record):
+            response = self.client.get(f"/quote/async/quotes/{self.qid}/")
+        assert response.status_code == 200
+        assert set(chosen) == {"replica"}
+
+    def test_read_your_writes_within_a_request(self):
+        router = ReadReplicaRouter()
+        with replica_reads() as routing:
+            assert router.db_for_read(Quote) == "replica"
+            assert router.db_for_write(Quote) == "default"
+            assert routing.wrote
+            assert router.db_for_read(Quote) is None
+
+    @override_settings(READ_REPLICA_DATABASE=None)
+    def test_without_replica(self):
+        response, primary, replica = self.queries("post", "/quote/quotes/", QUOTE)
+        assert PIN_COOKIE not in response.cookies
+        _, primary, replica = self.queries("get", "/quote/quotes/")
+        assert primary > 0
+        assert replica == 0
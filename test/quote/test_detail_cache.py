@@ -0,0 +1,92 @@
+import os
+
+from rest_framework.test import APITestCase
+
+from quote.cache import detail_cache_key
+from quote.cache import get_detail_cache
+from quote.cache import invalidate_purchase
+
+
+class TestDetailCache(APITestCase):
+    def setUp(self):
+        data = {
+            "date_effective": "2022-01-01T00:00:00.000",
+            "date_previous_canceled": "2022-01-01",
+            "is_owned": False,
+            "address": {"state": "WA", "zipcode": "99999"},
+        }
+        self.qid = self.client.post("/quote/quotes/", data, format="json").json()["qid"]
+        self.client.post(
+            "/quote/purchase/",
+            {"quote_id": self.qid, "payment_frequency": "Monthly"},
+            format="json",
+        )
+
+    def test_etag_and_not_modified(self):
+        for url in [f"/quote/quotes/{self.qid}/", "/quote/purchase/1/"]:
+            response = self.client.get(url, format="json")
+            assert response.status_code == 200
+            assert "Last-Modified" in response
+
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+            assert response.status_code == 304
+            assert response.content == b""
+
+    def test_cached_reads_skip_the_database(self):
+        url = f"/quote/quotes/{self.qid}/"
+        first = self.client.get(url, format="json")
+        with self.assertNumQueries(0):
+            second = self.client.get(url, format="json")
+        assert second.content == first.content
+        assert second.json()["cost_monthly"] == "13.99"
+
+    def test_cached_per_media_type(self):
+        url = f"/quote/quotes/{self.qid}/"
+        indented = self.client.get(url, HTTP_ACCEPT="application/json; indent=4")
+        assert indented["Content-Type"] == "application/json; indent=4"
+        assert b"\n" in indented.content
+
+        plain = self.client.get(url, HTTP_ACCEPT="application/json")
+        assert plain["Content-Type"] == "application/json"
+        assert b"\n" not in plain.content
+        assert plain["ETag"] != indented["ETag"]
+        with self.assertNumQueries(0):
+            again = self.client.get(url, HTTP_ACCEPT="application/json;indent = 4")
+        assert again.content == indented.content
+
+    def test_update_invalidates(self):
+        url = f"/quote/quotes/{self.qid}/"
+        etag = self.client.get(url, format="json")["ETag"]
+        self.client.get("/quote/purchase/1/", format="json")
+
+        data = {"is_owned": True, "address": {"state": "WA", "zipcode": "99999"}}
+        self.client.patch(url, data, format="json")
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response["ETag"] != etag
+        assert response.json()["is_owned"] is True
+        purchase = self.client.get("/quote/purchase/1/", format="json").json()
+        assert purchase["quote"]["is_owned"] is True
+
+    def test_delete_invalidates(self):
+        url = f"/quote/quotes/{self.qid}/"
+        self.client.get(url, format="json")
+        self.client.get("/quote/purchase/01/", format="json")
+
+        self.client.delete(url)
+
+        assert self.client.get(url, format="json").status_code == 404
+        purchase = self.client.get("/quote/purchase/1/", format="json").json()
+        assert purchase["quote"] is None
+
+    def test_invalidation_reaches_other_processes(self):
+        self.client.get("/quote/purchase/1/", format="json")
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover
+            # Another worker, with its own copy of everything in memory.
+            invalidate_purchase(1)
+            os._exit(0)
+        os.waitpid(pid, 0)
+
+        assert get_detail_cache().get(detail_cache_key("purchase", 1)) is None
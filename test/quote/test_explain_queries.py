@@ -0,0 +1,21 @@
+from io import StringIO
+
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from quote.management.commands.explain_queries import FULL_SCAN
+
+
+class TestExplainQueries(APITestCase):
+    def test_no_full_scans(self):
+        out = StringIO()
+        call_command("explain_queries", stdout=out)
+        assert "No full table scans." in out.getvalue()
+
+    def test_full_scan_pattern(self):
+        assert FULL_SCAN.search("2 0 0 SCAN quote_quote")
+        assert FULL_SCAN.search("2 0 0 SCAN TABLE quote_quote")
+        assert not FULL_SCAN.search(
+            "6 0 0 SCAN quote_quote USING INDEX quote_created_idx"
+        )
+        assert not FULL_SCAN.search("6 0 0 SEARCH quote_quote USING INDEX x (qid=?)")
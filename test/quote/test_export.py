@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from quote import export
+from quote.models import Quote
+from quote.models import QuotePurchase
+
+
+class TestExport(APITestCase):
+    def setUp(self):
+        data = [
+            {
+                "date_effective": "2022-01-01T00:00:00.000",
+                "date_previous_canceled": "2022-01-01",
+                "is_owned": False,
+                "address": {"state": state, "zipcode": "99999"},
+            }
+            for state in ["WA", "OH", "CA"]
+        ]
+        results = self.client.post("/quote/quotes/bulk/", data, format="json").json()
+        self.qids = [result["data"]["qid"] for result in results]
+        self.client.post(
+            "/quote/purchase/bulk/",
+            [{"quote_id": qid, "payment_frequency": "Monthly"} for qid in self.qids],
+            format="json",
+        )
+
+    def get(self, url, **extra):
+        response = self.client.get(url, **extra)
+        assert response.status_code == 200
+        assert response.streaming
+        with CaptureQueriesContext(connection) as queries:
+            chunks = list(response.streaming_content)
+        # one joined query, read while streaming
+        assert len(queries) == 1
+        return response, chunks, b"".join(chunks).decode()
+
+    def test_quotes_csv(self):
+        response, _, content = self.get("/quote/quotes/export/?format=csv")
+
+        assert response["Content-Type"] == "text/csv; charset=utf-8"
+        assert response["Content-Disposition"] == 'attachment; filename="quotes.csv"'
+        rows = list(csv.DictReader(io.StringIO(content)))
+        assert [row["qid"] for row in rows] == sorted(self.qids, key=self.qids.index)
+        assert [row["state"] for row in rows] == ["WA", "OH", "CA"]
+        assert rows[0]["cost_monthly"] == "13.99"
+        assert rows[0]["date_effective"] == "2022-01-01T00:00:00Z"
+        assert rows[0]["date_previous_canceled"] == "2022-01-01"
+
+    def test_purchases_ndjson(self):
+        response, _, content = self.get(
+            "/quote/purchase/export/", HTTP_ACCEPT="application/x-ndjson"
+        )
+
+        assert response["Content-Type"] == "application/x-ndjson; charset=utf-8"
+        rows = [json.loads(line) for line in content.splitlines()]
+        assert [row["quote_id"] for row in rows] == self.qids
+        assert rows[0]["state"] == "WA"
+        assert rows[0]["payment_amount"] == 13.99
+        assert rows[0]["fee_state_amt"] == 2.5
+        assert set(rows[0]) == {name for name, _ in export_columns("purchase")}
+
+    def test_written_in_chunks(self):
+        with mock.patch.object(export, "EXPORT_CHUNK_SIZE", 2):
+            _, chunks, content = self.get("/quote/quotes/export/?format=ndjson")
+        assert len(chunks) == 2
+        assert len(content.splitlines()) == 3
+
+    def test_date_range(self):
+        old = timezone.now() - timedelta(days=10)
+        Quote.objects.filter(qid=self.qids[0]).update(date_created=old)
+        QuotePurchase.objects.filter(quote_id=self.qids[0]).update(date_created=old)
+        day = old.date().isoformat()
+
+        _, _, content = self.get(f"/quote/quotes/export/?format=csv&end={day}")
+        assert [row["qid"] for row in csv.DictReader(io.StringIO(content))] == [
+            self.qids[0]
+        ]
+        _, _, content = self.get(
+            f"/quote/purchase/export/?format=ndjson&start={day}"
+            f"&end={timezone.localdate().isoformat()}"
+        )
+        assert len(content.splitlines()) == 3
+
+        response = self.client.get("/quote/quotes/export/?format=csv&start=soon")
+        assert response.status_code == 400
+        assert response.json()["detail"] == "`start` must be a date (YYYY-MM-DD)."
+
+
+def export_columns(basename):
+    from quote.views import QuotePurchaseViewSet, QuoteViewSet
+
+    viewset = QuoteViewSet if basename == "quote" else QuotePurchaseViewSet
+    return viewset.export_columns
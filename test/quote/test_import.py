@@ -0,0 +1,270 @@
+import csv
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+from datetime import date
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
+from django.core.management import CommandError
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from quote.importer import QuoteImporter
+from quote.importer import read_rows
+from quote.models import Address
+from quote.models import DailyPurchaseStats
+from quote.models import DailyQuoteStats
+from quote.models import ImportCheckpoint
+from quote.models import Quote
+from quote.models import QuotePurchase
+from quote.stats import get_stats
+from quote.stats import refresh_daily_stats
+
+COLUMNS = ["qid", "date_created", "date_effective", "date_previous_canceled"]
+COLUMNS += ["is_owned", "state", "zipcode"]
+
+
+def row(state="WA", canceled=True, owned=False, **extra):
+    return {
+        "qid": None,
+        "date_created": None,
+        "date_effective": "2022-01-01T00:00:00Z",
+        "date_previous_canceled": "2021-06-01" if canceled else None,
+        "is_owned": owned,
+        "state": state,
+        "zipcode": 99999,
+        **extra,
+    }
+
+
+def interrupted(rows, after):
+    for index, item in enumerate(rows):
+        if index == after:
+            raise RuntimeError("interrupted")
+        yield item
+
+
+class TestImportQuotes(APITestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, rows, format="csv"):
+        path = os.path.join(self.dir.name, f"quotes.{format}")
+        with open(path, "w", newline="") as file:
+            if format == "csv":
+                writer = csv.DictWriter(file, COLUMNS)
+                writer.writeheader()
+                writer.writerows(
+                    {k: "" if v is None else v for k, v in row.items()} for row in rows
+                )
+            else:
+                file.writelines(json.dumps(row) + "\n" for row in rows)
+        return path
+
+    def run_import(self, path, *args):
+        out = io.StringIO()
+        call_command("import_quotes", path, "--workers", "0", *args, stdout=out)
+        return json.loads(out.getvalue())
+
+    def test_csv(self):
+        rows = [
+            row(),
+            row(state="OH", canceled=False, owned=True),
+            row(qid="LEGACY1", date_created="2019-05-01T10:00:00Z"),
+        ]
+        report = self.run_import(self.write(rows), "--batch-size", "2")
+
+        assert report["rows"] == 3
+        assert report["imported"] == 3
+        assert report["invalid"] == 0
+        assert report["rows_per_second"] > 0
+        assert Address.objects.count() == 2
+        assert sorted(Quote.objects.values_list("cost_monthly", flat=True)) == [
+            6.99,
+            13.99,
+            13.99,
+        ]
+        legacy = Quote.objects.get(qid="LEGACY1")
+        assert legacy.date_created == datetime(2019, 5, 1, 10, tzinfo=dt_timezone.utc)
+        assert legacy.biannually_fee_state_amt == 14.98
+        assert (
+            Quote.objects.exclude(qid="LEGACY1")
+            .filter(date_created__year__gt=2019)
+            .count()
+            == 2
+        )
+
+    def test_same_as_api(self):
+        # Imported quotes read back like ones created through the API.
+        self.run_import(self.write([row(qid="IMPORTED")], format="ndjson"))
+        qid = self.client.post(
+            "/quote/quotes/",
+            {
+                "date_effective": "2022-01-01T00:00:00Z",
+                "date_previous_canceled": "2021-06-01",
+                "is_owned": False,
+                "address": {"state": "WA", "zipcode": 99999},
+            },
+            format="json",
+        ).json()["qid"]
+
+        imported = self.client.get("/quote/quotes/IMPORTED/").json()
+        created = self.client.get(f"/quote/quotes/{qid}/").json()
+        del imported["qid"], created["qid"]
+        assert imported == created
+
+    def test_purchases(self):
+        rows = [
+            row(qid="MONTHLY", payment_frequency="Monthly"),
+            row(
+                qid="BIANNUAL",
+                date_created="2019-05-01T10:00:00Z",
+                payment_frequency="Biannually",
+                date_purchased="2019-05-02T10:00:00Z",
+            ),
+            row(qid="NOTBOUGHT"),
+            row(qid="BADFREQ", payment_frequency="Weekly"),
+            row(qid="NOFREQ", date_purchased="2019-05-02T10:00:00Z"),
+        ]
+        errors = os.path.join(self.dir.name, "errors.ndjson")
+        report = self.run_import(
+            self.write(rows, format="ndjson"), "--batch-size", "2", "--errors", errors
+        )
+
+        assert report["imported"] == 3
+        assert report["purchases"] == 2
+        assert report["invalid"] == 2
+        with open(errors) as file:
+            logged = [json.loads(line)["errors"] for line in file]
+        assert list(logged[0]) == ["payment_frequency"]
+        assert list(logged[1]) == ["payment_frequency"]
+
+        biannual = QuotePurchase.objects.get(quote_id="BIANNUAL")
+        assert biannual.date_created == datetime(2019, 5, 2, 10, tzinfo=dt_timezone.utc)
+        assert biannual.payment_amount == 83.91
+        monthly = QuotePurchase.objects.get(quote_id="MONTHLY")
+        assert monthly.date_created == Quote.objects.get(qid="MONTHLY").date_created
+
+        # The same purchase as one made through the API.
+        response = self.client.post(
+            "/quote/purchase/",
+            {"quote_id": "MONTHLY", "payment_frequency": "Monthly"},
+            format="json",
+        ).json()
+        imported = self.client.get(f"/quote/purchase/{monthly.pk}/").json()
+        del response["pk"], imported["pk"]
+        assert imported == response
+
+    def test_other_saves_keep_their_dates(self):
+        # e.g. a request handled on another thread while the import writes.
+        saved = []
+
+        def save_quote(*args):
+            quote = Quote.objects.create(
+                date_effective="2022-01-01T00:00:00Z", is_owned=False
+            )
+            saved.append(quote.qid)
+            return 0
+
+        with mock.patch("quote.importer.refresh_days", side_effect=save_quote):
+            self.run_import(
+                self.write([row(qid="LEGACY1", date_created="2019-05-01T10:00:00Z")])
+            )
+        assert Quote.objects.get(qid=saved[0]).date_created.year > 2019
+
+    def test_refreshes_daily_stats(self):
+        refresh_daily_stats()
+        rows = [
+            row(qid="OLD", date_created="2019-05-01T10:00:00Z"),
+            row(
+                qid="BOUGHT",
+                date_created="2019-05-01T11:00:00Z",
+                payment_frequency="Monthly",
+                date_purchased="2019-05-03T10:00:00Z",
+            ),
+            row(qid="NEW"),
+        ]
+        self.run_import(self.write(rows, format="ndjson"))
+
+        stats = get_stats(date(2019, 5, 1), date(2019, 5, 3))
+        assert stats["quotes"]["total"] == 2
+        assert stats["conversion"]["converted"] == 1
+        assert stats["purchases"]["total"] == 1
+        days = DailyQuoteStats.objects.values_list("day", flat=True)
+        assert list(days) == [date(2019, 5, 1)]
+        assert DailyPurchaseStats.objects.get().day == date(2019, 5, 3)
+
+    def test_invalid_rows(self):
+        rows = [
+            row(),
+            row(state="XX"),
+            row(date_effective="soon"),
+            row(qid="WAY-TOO-LONG-QID"),
+            row(date_created="yesterday"),
+            row(state="OH"),
+        ]
+        errors = os.path.join(self.dir.name, "errors.ndjson")
+        report = self.run_import(self.write(rows), "--errors", errors)
+
+        assert report["imported"] == 2
+        assert report["invalid"] == 4
+        with open(errors) as file:
+            logged = [json.loads(line) for line in file]
+        assert [entry["row"] for entry in logged] == [2, 3, 4, 5]
+        assert logged[0]["errors"] == {"detail": "Invalid State Provided."}
+        assert "date_effective" in logged[1]["errors"]
+
+    def test_resume(self):
+        path = self.write([row(qid=f"Q{index}") for index in range(10)])
+        importer = QuoteImporter(
+            f"quotes:{os.path.abspath(path)}", batch_size=2, transaction_size=4
+        )
+        with open(path, newline="") as file:
+            # Interrupted while reading the third transaction's rows.
+            with self.assertRaises(RuntimeError):
+                importer.run(interrupted(read_rows(file, "csv"), after=8))
+
+        checkpoint = ImportCheckpoint.objects.get()
+        assert checkpoint.rows_done == 8
+        assert Quote.objects.count() == 8
+
+        report = self.run_import(path)
+        assert report["resumed_from"] == 8
+        assert report["rows"] == 2
+        assert Quote.objects.count() == 10
+
+        # Nothing left to do, unless restarted.
+        assert self.run_import(path)["rows"] == 0
+        with self.assertRaises(CommandError):
+            self.run_import(path, "--restart")
+        report = self.run_import(path, "--restart", "--skip-existing")
+        assert report["skipped"] == 10
+        assert Quote.objects.count() == 10
+
+    def test_workers(self):
+        rows = [row(state=state) for state in ["WA", "OH", "CA", "XX"] * 5]
+        out = io.StringIO()
+        call_command(
+            "import_quotes",
+            self.write(rows, format="ndjson"),
+            "--workers",
+            "2",
+            "--batch-size",
+            "3",
+            stdout=out,
+        )
+        report = json.loads(out.getvalue())
+
+        assert report["imported"] == 15
+        assert report["invalid"] == 5
+        assert Quote.objects.filter(cost_monthly=13.99).count() == 10
+
+    def test_unknown_format(self):
+        with self.assertRaises(CommandError):
+            self.run_import(os.path.join(self.dir.name, "quotes.xlsx"))
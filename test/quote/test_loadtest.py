@@ -0,0 +1,67 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import LiveServerTestCase
+from rest_framework.test import APITestCase
+
+from quote.management.commands.loadtest import find_regressions
+from quote.management.commands.loadtest import parse_mix
+from quote.models import Quote
+
+
+class TestLoadTest(LiveServerTestCase):
+    def test_report(self):
+        out = StringIO()
+        call_command(
+            "loadtest",
+            url=self.live_server_url,
+            concurrency=1,
+            requests=20,
+            seed_quotes=5,
+            mix="read=1,list=1,create=1,purchase=1",
+            stdout=out,
+        )
+        report = json.loads(out.getvalue())
+
+        assert report["total"]["requests"] == 20
+        assert report["total"]["errors"] == 0
+        assert set(report["endpoints"]) <= {
+            "POST /quote/quotes/",
+            "GET /quote/quotes/<qid>/",
+            "GET /quote/quotes/",
+            "POST /quote/purchase/",
+        }
+        for summary in report["endpoints"].values():
+            assert summary["p50_ms"] <= summary["p95_ms"] <= summary["p99_ms"]
+        assert Quote.objects.count() >= 5
+
+
+class TestLoadTestHelpers(APITestCase):
+    def test_parse_mix(self):
+        assert parse_mix("read=3, create=1") == {"read": 3, "create": 1}
+        with self.assertRaises(CommandError):
+            parse_mix("delete=1")
+        with self.assertRaises(CommandError):
+            parse_mix("read=0")
+
+    def test_find_regressions(self):
+        baseline = {
+            "endpoints": {
+                "GET /quote/quotes/": {"p95_ms": 10.0, "throughput_rps": 100.0},
+                "POST /quote/quotes/": {"p95_ms": 10.0, "throughput_rps": 100.0},
+            }
+        }
+        report = {
+            "endpoints": {
+                "GET /quote/quotes/": {"p95_ms": 11.0, "throughput_rps": 95.0},
+                "POST /quote/quotes/": {"p95_ms": 15.0, "throughput_rps": 70.0},
+            }
+        }
+
+        assert find_regressions(baseline, report, tolerance=20) == [
+            "POST /quote/quotes/: p95 10.0ms -> 15.0ms",
+            "POST /quote/quotes/: throughput 100.0/s -> 70.0/s",
+        ]
+        assert find_regressions(baseline, report, tolerance=60) == []
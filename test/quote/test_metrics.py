@@ -0,0 +1,132 @@
+import os
+import tempfile
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from utils.metrics import MetricsStore
+from utils.metrics import collect
+from utils.metrics import get_metrics
+from utils.metrics import render_metrics
+from utils.metrics import reset_metrics
+
+QUOTE = {
+    "date_effective": "2022-01-01T00:00:00.000",
+    "date_previous_canceled": None,
+    "is_owned": True,
+    "address": {"state": "WA", "zipcode": "99999"},
+}
+
+
+def samples(text):
+    return dict(
+        line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#")
+    )
+
+
+class MetricsTestCase(APITestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = override_settings(
+            METRICS_DIR=self.directory, METRICS_ENABLED=True, METRICS_TOKEN="secret"
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        reset_metrics()
+        self.addCleanup(reset_metrics)
+
+
+class TestMetricsStore(MetricsTestCase):
+    def test_values(self):
+        store = MetricsStore()
+        store.inc("db_queries_total", {"route": "quote-list"}, 3)
+        store.inc("db_queries_total", {"route": "quote-list"})
+        store.set("cache_hits_total", {"cache": "address"}, 7)
+        store.observe("http_request_duration_seconds", {"route": "x"}, 0.02)
+        store.observe("http_request_duration_seconds", {"route": "x"}, 30)
+
+        text = render_metrics(store.values())
+        values = samples(text)
+        assert values['db_queries_total{route="quote-list"}'] == "4"
+        assert values['cache_hits_total{cache="address"}'] == "7"
+        duration = "http_request_duration_seconds"
+        assert values[f'{duration}_bucket{{route="x",le="0.01"}}'] == "0"
+        assert values[f'{duration}_bucket{{route="x",le="0.025"}}'] == "1"
+        assert values[f'{duration}_bucket{{route="x",le="10.0"}}'] == "1"
+        assert values[f'{duration}_bucket{{route="x",le="+Inf"}}'] == "2"
+        assert values[f'{duration}_count{{route="x"}}'] == "2"
+        assert values[f'{duration}_sum{{route="x"}}'] == "30.02"
+
+    def test_grows(self):
+        store = MetricsStore(os.path.join(self.directory, "grow.metrics"))
+        for index in range(5000):
+            store.inc("db_queries_total", {"route": f"route-{index}"}, index)
+        values = store.values()
+        assert len(values) == 5000
+        assert sum(values.values()) == sum(range(5000))
+
+    def test_sums_processes(self):
+        get_metrics().inc("db_queries_total", {"route": "quote-list"}, 2)
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover
+            # The child gets its own store, in its own file.
+            get_metrics().inc("db_queries_total", {"route": "quote-list"}, 3)
+            os._exit(0)
+        os.waitpid(pid, 0)
+
+        assert len(os.listdir(self.directory)) == 2
+        assert collect()[("db_queries_total", (("route", "quote-list"),))] == 5
+
+
+class TestMetricsEndpoint(MetricsTestCase):
+    def test_requests(self):
+        qid = self.client.post("/quote/quotes/", QUOTE, format="json").json()["qid"]
+        self.client.get("/quote/quotes/")
+        self.client.get(f"/quote/quotes/{qid}/")
+        self.client.get(f"/quote/quotes/{qid}/")
+        self.client.get("/nowhere/")
+
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+        values = samples(response.content.decode())
+        requests = 'http_requests_total{{method="{}",route="{}",status="{}"}}'
+        assert values[requests.format("POST", "quote-list", 201)] == "1"
+        assert values[requests.format("GET", "quote-detail", 200)] == "2"
+        assert values[requests.format("GET", "unmatched", 404)] == "1"
+        count = 'http_request_duration_seconds_count{route="quote-detail"}'
+        assert values[count] == "2"
+        assert int(values['db_queries_total{route="quote-list"}']) > 0
+        assert values['cache_hit_ratio{cache="quote_detail"}'] == "0.5"
+        assert 'cache_hits_total{cache="address"}' in values
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.client.get("/quote/quotes/")
+        assert get_metrics().values() == {}
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        assert response.status_code == 404
+
+    def test_token_required(self):
+        # Even from loopback, e.g. through a reverse proxy on the same host.
+        for authorization in [None, "Bearer wrong", "secret"]:
+            headers = (
+                {} if authorization is None else {"HTTP_AUTHORIZATION": authorization}
+            )
+            response = self.client.get("/metrics", **headers)
+            assert response.status_code == 404, authorization
+        with override_settings(METRICS_TOKEN=None):
+            response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer None")
+            assert response.status_code == 404
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.0.0.2"])
+    def test_allowed_ips(self):
+        response = self.client.get(
+            "/metrics", REMOTE_ADDR="10.0.0.1", HTTP_AUTHORIZATION="Bearer secret"
+        )
+        assert response.status_code == 404
+        response = self.client.get(
+            "/metrics", REMOTE_ADDR="10.0.0.2", HTTP_AUTHORIZATION="Bearer secret"
+        )
+        assert response.status_code == 200
@@ -0,0 +1,84 @@
+import base64
+import json
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from quote.models import Quote
+
+
+class TestKeysetPagination(APITestCase):
+    def setUp(self):
+        data = {
+            "date_effective": "2022-01-01T00:00:00.000",
+            "is_owned": True,
+            "address": {"state": "OH", "zipcode": "44444"},
+        }
+        self.client.post("/quote/quotes/bulk/", [data] * 25, format="json")
+        # order newest first, with the primary key breaking the bulk insert ties
+        self.expected = list(
+            Quote.objects.order_by("-date_created", "-pk").values_list("qid", flat=True)
+        )
+
+    def walk(self, url, link):
+        qids = []
+        while url:
+            response = self.client.get(url, format="json").json()
+            assert "count" not in response
+            qids.append([row["qid"] for row in response["results"]])
+            url = response[link]
+        return qids
+
+    def test_walk_forward_and_back(self):
+        pages = self.walk("/quote/quotes/?pagination=cursor", "next")
+        assert [len(page) for page in pages] == [10, 10, 5]
+        assert sum(pages, []) == self.expected
+
+        last = self.client.get("/quote/quotes/?pagination=cursor", format="json")
+        last = self.client.get(last.json()["next"], format="json")
+        last = self.client.get(last.json()["next"], format="json").json()
+        assert last["next"] is None
+        back = self.walk(last["previous"], "previous")
+        assert back == [self.expected[10:20], self.expected[:10]]
+
+    def test_page_size(self):
+        response = self.client.get(
+            "/quote/quotes/?pagination=cursor&page_size=30", format="json"
+        ).json()
+        assert [row["qid"] for row in response["results"]] == self.expected
+        assert response["next"] is None
+        assert response["previous"] is None
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/quote/quotes/?cursor=garbage", format="json")
+        assert response.status_code == 404
+
+    def test_tampered_cursor(self):
+        def cursor(**position):
+            position = {
+                "d": "2022-01-01T00:00:00+00:00",
+                "p": 1,
+                "r": False,
+                **position,
+            }
+            return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+        for path in ["/quote/quotes/", "/quote/purchase/"]:
+            for tampered in [{"p": {"x": 1}}, {"p": None}, {"p": [1]}, {"d": 1}]:
+                response = self.client.get(f"{path}?cursor={cursor(**tampered)}")
+                assert response.status_code == 404, (path, tampered)
+                assert response.json()["detail"] == "Invalid cursor"
+        response = self.client.get(f"/quote/purchase/?cursor={cursor(p='abc')}")
+        assert response.status_code == 404
+        assert response.json()["detail"] == "Invalid cursor"
+
+    def test_page_numbers_by_default(self):
+        response = self.client.get("/quote/quotes/", format="json").json()
+        assert response["count"] == 25
+
+    @override_settings(DEFAULT_PAGINATION_MODE="cursor")
+    def test_deployment_default(self):
+        response = self.client.get("/quote/purchase/", format="json").json()
+        assert "count" not in response
+        response = self.client.get("/quote/quotes/?pagination=page", format="json")
+        assert response.json()["count"] == 25
@@ -0,0 +1,108 @@
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.db import connection
+from rest_framework.test import APITestCase
+
+from quote.models import Quote
+from quote.pricing import PriceTable
+from utils.const import STATES_WITH_VOLCANOES
+from test.quote.helpers import quote_data
+
+backfill = import_module("quote.migrations.0005_backfill_quote_prices")
+
+
+class TestPriceColumns(APITestCase):
+    def test_set_on_create(self):
+        qid = self.client.post(
+            "/quote/quotes/", quote_data(canceled=True), format="json"
+        ).json()["qid"]
+        quote = Quote.objects.get(qid=qid)
+
+        assert quote.cost_monthly == 13.99
+        assert quote.cost_biannually == 83.91
+        assert quote.monthly_fee_canceled_amt == 1.5
+        assert quote.monthly_fee_state_amt == 2.5
+        assert quote.monthly_discount_canceled_amt == 0
+        assert quote.biannually_fee_state_amt == 14.98
+
+    def test_set_on_bulk_create(self):
+        data = [
+            quote_data(canceled=True),
+            quote_data(state="OH", canceled=False, owned=True),
+        ]
+        self.client.post("/quote/quotes/bulk/", data, format="json")
+
+        assert sorted(Quote.objects.values_list("cost_monthly", flat=True)) == [
+            6.99,
+            13.99,
+        ]
+
+    def test_kept_in_sync_on_update(self):
+        qid = self.client.post(
+            "/quote/quotes/", quote_data(canceled=True), format="json"
+        ).json()["qid"]
+        self.client.patch(
+            f"/quote/quotes/{qid}/",
+            quote_data(canceled=False, owned=True),
+            format="json",
+        )
+
+        quote = Quote.objects.get(qid=qid)
+        assert quote.cost_monthly == 9.49
+        assert quote.monthly_fee_canceled_amt == 0
+        assert quote.monthly_discount_owns_property_amt == 2.0
+
+    def test_backfill(self):
+        for state in ["WA", "OH", "CA"]:
+            self.client.post(
+                "/quote/quotes/", quote_data(state=state, canceled=True), format="json"
+            )
+        expected = list(Quote.objects.order_by("qid").values_list(*Quote.PRICE_FIELDS))
+        Quote.objects.update(**{field: None for field in Quote.PRICE_FIELDS})
+
+        with mock.patch.object(backfill, "BACKFILL_CHUNK_SIZE", 2):
+            backfill.backfill_prices(apps, mock.Mock(connection=connection))
+
+        prices = list(Quote.objects.order_by("qid").values_list(*Quote.PRICE_FIELDS))
+        assert prices == expected
+
+    def test_backfill_rates(self):
+        # The migration's frozen copy prices like the rates in `utils.const`.
+        assert backfill.STATES_WITH_VOLCANOES == STATES_WITH_VOLCANOES
+        table = PriceTable()
+        for state in ["WA", "OH"]:
+            for canceled in [False, True]:
+                for owned in [False, True]:
+                    flags = (state, canceled, owned)
+                    assert backfill.price_fields(*flags) == table.fields(*flags)
+
+
+class TestPremiumFilters(APITestCase):
+    def setUp(self):
+        data = [
+            quote_data(canceled=True),  # 83.91
+            quote_data(state="OH", canceled=False),  # 53.95
+            quote_data(canceled=False, owned=True),  # 56.94
+        ]
+        self.client.post("/quote/quotes/bulk/", data, format="json")
+
+    def costs(self, query):
+        response = self.client.get(f"/quote/quotes/?{query}")
+        assert response.status_code == 200
+        return [quote["cost_biannually"] for quote in response.json()["results"]]
+
+    def test_range(self):
+        assert self.costs("cost_biannually__gt=80") == ["83.91"]
+        assert sorted(self.costs("cost_monthly__lte=10")) == ["53.95", "56.94"]
+        assert self.costs("cost_biannually__gte=54&cost_biannually__lt=80") == ["56.94"]
+
+    def test_ordering(self):
+        assert self.costs("ordering=cost_biannually") == ["53.95", "56.94", "83.91"]
+        assert self.costs("ordering=-cost_monthly") == ["83.91", "56.94", "53.95"]
+
+    def test_invalid(self):
+        response = self.client.get("/quote/quotes/?cost_biannually__gt=lots")
+        assert response.status_code == 400
+        assert "cost_biannually__gt" in response.json()
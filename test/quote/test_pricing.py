@@ -0,0 +1,89 @@
+from itertools import product
+
+from rest_framework.test import APITestCase
+
+from quote.models import Address, Quote
+from quote.pricing import (
+    PriceTable,
+    Rates,
+    default_rates_definition,
+    install_price_table,
+    price_quotes,
+)
+from quote.rates import refresh_rates
+from utils.const import VOLCANO_INSURANCE
+
+COMBINATIONS = list(product([False, True], repeat=3))
+
+
+def make_quote(canceled, volcano, owned):
+    return Quote(
+        date_previous_canceled="2022-01-01" if canceled else None,
+        is_owned=owned,
+        address=Address(zipcode=99999, state="WA" if volcano else "OH"),
+    )
+
+
+def calc_fees(quote):
+    return {
+        "monthly": quote._calc_fees(VOLCANO_INSURANCE.BASE_COST_MONTHLY),
+        "biannually": quote._calc_fees(VOLCANO_INSURANCE.BASE_COST_BIANNUALLY),
+    }
+
+
+class TestPriceTable(APITestCase):
+    def tearDown(self):
+        refresh_rates(force=True)
+
+    def assert_table_matches_calc_fees(self, table):
+        for flags in COMBINATIONS:
+            quote = make_quote(*flags)
+            for frequency, expected in calc_fees(quote).items():
+                assert table.lookup(frequency, *quote.pricing_class) == expected
+
+    def test_matches_calc_fees(self):
+        self.assert_table_matches_calc_fees(PriceTable())
+
+    def test_other_rates(self):
+        definition = default_rates_definition()
+        definition["fees"]["state_with_volcano"] = 40
+        definition["states"] = {"OH": {"discounts": {"owns_property": 50}}}
+        table = install_price_table(PriceTable(Rates(definition)))
+        self.assert_table_matches_calc_fees(table)
+
+        cost, _ = make_quote(False, True, False).cost_and_breakdown_biannually
+        assert cost == 77.93
+        cost, breakdown = make_quote(False, False, True).cost_and_breakdown_monthly
+        assert breakdown["discounts"]["owns_property"]["multiplier"] == 0.5
+        assert cost == 3.99
+
+    def test_price_quotes(self):
+        quotes = [make_quote(*flags) for flags in COMBINATIONS]
+        prices = price_quotes(quotes)
+
+        for index, quote in enumerate(quotes):
+            for frequency, expected in calc_fees(quote).items():
+                costs, breakdowns = prices[frequency]
+                assert (costs[index], breakdowns[index]) == expected
+        assert price_quotes([]) == {"monthly": ([], []), "biannually": ([], [])}
+
+    def test_price_quotes_by_state(self):
+        definition = default_rates_definition()
+        definition["states"] = {"WA": {"base_cost": {"monthly": 20}}}
+        quotes = [make_quote(False, True, False), make_quote(False, False, False)]
+        costs, _ = price_quotes(quotes, Rates(definition))["monthly"]
+        assert costs == [23.0, 8.99]
+
+    def test_state_overrides(self):
+        definition = default_rates_definition()
+        definition["states"] = {"WA": {"base_cost": {"monthly": 20}}}
+        table = PriceTable(Rates(definition))
+        assert table.lookup("monthly", "WA", False, False)[0] == 23.0
+        assert table.lookup("monthly", "OH", False, False)[0] == 8.99
+        assert table.fields("WA", False, False)["cost_monthly"] == 23.0
+
+    def test_breakdowns_are_shared_and_read_only(self):
+        first, second = make_quote(True, True, False), make_quote(True, True, False)
+        assert first.breakdown_monthly is second.breakdown_monthly
+        with self.assertRaises(TypeError):
+            first.breakdown_monthly["fees"]["canceled"]["money"] = 0
@@ -1,5 +1,16 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase
 
+from quote.models import QuotePurchase
+
+QUOTE = {
+    "date_effective": "2022-01-01T00:00:00.000",
+    "date_previous_canceled": "2022-01-01",
+    "is_owned": False,
+    "address": {"state": "WA", "zipcode": "99999"},
+}
+
 
 class TestPurchaseCreate(APITestCase):
     def test_create(self):
@@ -77,6 +88,100 @@ class TestPurchaseCreate(APITestCase):
         }
 
 
+class TestPurchaseCreateQueries(APITestCase):
+    def setUp(self):
+        self.qid = self.client.post("/quote/quotes/", QUOTE, format="json").json()[
+            "qid"
+        ]
+
+    def test_one_select_one_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                "/quote/purchase/",
+                {"quote_id": self.qid, "payment_frequency": "Monthly"},
+                format="json",
+            )
+        assert response.status_code == 201
+
+        statements = [query["sql"].split()[0] for query in queries]
+        assert statements.count("SELECT") == 1
+        assert statements.count("INSERT") == 1
+
+    def test_unknown_quote(self):
+        response = self.client.post(
+            "/quote/purchase/",
+            {"quote_id": "XXXXXXXXXX", "payment_frequency": "Monthly"},
+            format="json",
+        )
+        assert response.status_code == 404
+        assert response.json() == {
+            "detail": "Quote XXXXXXXXXX not found.",
+            "status_code": 404,
+        }
+
+    def test_invalid_quote_id(self):
+        for data in [
+            {"quote_id": "X" * 11, "payment_frequency": "Monthly"},
+            {"payment_frequency": "Monthly"},
+        ]:
+            response = self.client.post("/quote/purchase/", data, format="json")
+            assert response.status_code == 400
+            assert "quote_id" in response.json()
+        assert QuotePurchase.objects.count() == 0
+
+
+class TestPurchaseBulk(APITestCase):
+    def setUp(self):
+        self.qids = [
+            self.client.post("/quote/quotes/", QUOTE, format="json").json()["qid"]
+            for _ in range(3)
+        ]
+
+    def test_bulk(self):
+        data = [{"quote_id": qid, "payment_frequency": "Monthly"} for qid in self.qids]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/quote/purchase/bulk/", data, format="json")
+
+        assert response.status_code == 201
+        results = response.json()
+        assert [result["status_code"] for result in results] == [201, 201, 201]
+        assert [result["data"]["quote"]["qid"] for result in results] == self.qids
+        assert [result["data"]["payment_amount"] for result in results] == [13.99] * 3
+        pks = [result["data"]["pk"] for result in results]
+        assert sorted(QuotePurchase.objects.values_list("pk", flat=True)) == sorted(pks)
+        statements = [query["sql"].split()[0] for query in queries]
+        assert statements.count("SELECT") == 1
+
+    def test_bulk_partial(self):
+        data = [
+            {"quote_id": self.qids[0], "payment_frequency": "Biannually"},
+            {"quote_id": "XXXXXXXXXX", "payment_frequency": "Monthly"},
+            {"payment_frequency": "Monthly"},
+        ]
+        response = self.client.post("/quote/purchase/bulk/", data, format="json")
+
+        assert response.status_code == 207
+        results = response.json()
+        assert results[0]["status_code"] == 201
+        assert results[0]["data"]["payment_amount"] == 83.91
+        assert results[1] == {
+            "status_code": 404,
+            "errors": {"detail": "Quote XXXXXXXXXX not found."},
+        }
+        assert results[2]["status_code"] == 400
+        assert "quote_id" in results[2]["errors"]
+        assert QuotePurchase.objects.count() == 1
+
+    def test_bulk_not_a_list(self):
+        response = self.client.post(
+            "/quote/purchase/bulk/",
+            {"quote_id": self.qids[0], "payment_frequency": "Monthly"},
+            format="json",
+        )
+        assert response.status_code == 400
+        assert QuotePurchase.objects.count() == 0
+
+
 class TestPurchaseGet(APITestCase):
     def test_get_one(self):
         # create quote
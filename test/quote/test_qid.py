@@ -0,0 +1,75 @@
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from quote.models import Quote
+from quote.qid import LETTERS_AND_NUMBERS
+from quote.qid import KSortableQidGenerator
+from quote.qid import get_qid_generator
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestKSortableQidGenerator(APITestCase):
+    def test_format(self):
+        qid = KSortableQidGenerator().generate()
+        assert len(qid) == 10
+        assert set(qid) <= set(LETTERS_AND_NUMBERS)
+
+    def test_sorted_by_time(self):
+        clock = FakeClock(KSortableQidGenerator.EPOCH + 1000)
+        generator = KSortableQidGenerator(clock=clock)
+        qids = generator.generate_block(5)
+        clock.now += 1
+        qids += [generator.generate() for _ in range(5)]
+        clock.now += 3600
+        qids += generator.generate_block(5)
+
+        assert len(set(qids)) == 15
+        # Sorted by second, not within one.
+        seconds = [qid[: KSortableQidGenerator.TIME_LENGTH] for qid in qids]
+        assert seconds == sorted(seconds)
+        assert len(set(seconds)) == 3
+
+    def test_unpredictable_within_a_second(self):
+        generator = KSortableQidGenerator(clock=FakeClock(KSortableQidGenerator.EPOCH))
+        qids = generator.generate_block(100)
+        prefix = len(generator.generate()) - generator.SUFFIX_LENGTH
+        suffixes = sorted(int(qid[prefix:], 36) for qid in qids)
+        gaps = [b - a for a, b in zip(suffixes, suffixes[1:])]
+        # 100 consecutive numbers would leave gaps of 1.
+        assert sum(gap == 1 for gap in gaps) < 10
+        assert len(set(qids)) == 100
+
+    def test_block_spills_into_next_second(self):
+        class ShortSuffixGenerator(KSortableQidGenerator):
+            TIME_LENGTH = 8
+            SUFFIX_LENGTH = 2
+
+        generator = ShortSuffixGenerator(clock=FakeClock(KSortableQidGenerator.EPOCH))
+        size = len(generator.ALPHABET) ** generator.SUFFIX_LENGTH // 2
+        qids = generator.generate_block(size + 10)
+        qids += generator.generate_block(size)
+
+        assert len(set(qids)) == 2 * size + 10
+        seconds = [qid[: generator.TIME_LENGTH] for qid in qids]
+        assert seconds == sorted(seconds)
+        assert len(set(seconds)) == 3
+
+
+class TestQidGeneratorSetting(APITestCase):
+    @override_settings(QUOTE_QID_GENERATOR="quote.qid.RandomQidGenerator")
+    def test_override(self):
+        assert type(get_qid_generator()).__name__ == "RandomQidGenerator"
+
+    def test_save_skips_existence_check(self):
+        quote = Quote(date_effective="2022-01-01T00:00:00Z", is_owned=False)
+        # savepoint, insert, release
+        with self.assertNumQueries(3):
+            quote.save()
+        assert len(quote.qid) == 10
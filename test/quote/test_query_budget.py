@@ -0,0 +1,50 @@
+from unittest import mock
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+
+from quote.views import QuoteViewSet
+from utils.query_budget import QueryBudgetExceeded
+
+
+@override_settings(QUERY_COUNT_HEADER=True, QUERY_BUDGET_ENFORCE=True)
+class TestQueryBudgets(APITestCase):
+    def setUp(self):
+        for state in ["WA", "OH", "CA", "NY", "HI"]:
+            data = {
+                "date_effective": "2022-01-01T00:00:00.000",
+                "date_previous_canceled": "2022-01-01",
+                "is_owned": False,
+                "address": {"state": state, "zipcode": "99999"},
+            }
+            qid = self.client.post("/quote/quotes/", data, format="json").json()["qid"]
+            self.client.post(
+                "/quote/purchase/",
+                {"quote_id": qid, "payment_frequency": "Monthly"},
+                format="json",
+            )
+        self.qid = qid
+
+    def test_list_endpoints(self):
+        for url in ["/quote/quotes/", "/quote/purchase/"]:
+            response = self.client.get(url, format="json")
+            assert response.status_code == 200
+            assert response["X-Query-Count"] == "2"
+            assert response["X-Query-Budget"] == "2"
+
+    def test_detail_endpoints(self):
+        for url in [f"/quote/quotes/{self.qid}/", "/quote/purchase/1/"]:
+            response = self.client.get(url, format="json")
+            assert response.status_code == 200
+            assert response["X-Query-Count"] == "1"
+
+    def test_over_budget(self):
+        with mock.patch.object(QuoteViewSet, "query_budgets", {"list": 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get("/quote/quotes/", format="json")
+
+    @override_settings(QUERY_COUNT_HEADER=False)
+    def test_header_off(self):
+        response = self.client.get("/quote/quotes/", format="json")
+        assert "X-Query-Count" not in response
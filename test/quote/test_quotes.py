@@ -236,3 +236,108 @@ class TestQuoteDelete(APITestCase):
         response = self.client.delete(f"/quote/quotes/{obj.qid}/")
         assert response.status_code == 204
         assert Quote.objects.first() is None
+
+
+class TestQuoteBulkCreate(APITestCase):
+    def test_bulk_create(self):
+        data = [
+            {
+                "date_effective": "2022-01-01T00:00:00.000",
+                "date_previous_canceled": "2022-01-01",
+                "is_owned": False,
+                "address": {"state": "WA", "zipcode": "99999"},
+            },
+            {
+                "date_effective": "2022-01-01T00:00:00.000",
+                "is_owned": True,
+                "address": {"state": "XX", "zipcode": "99999"},
+            },
+            {
+                "date_effective": "2022-01-01T00:00:00.000",
+                "date_previous_canceled": None,
+                "is_owned": True,
+                "address": {"state": "WA", "zipcode": "99999"},
+            },
+        ]
+        response = self.client.post("/quote/quotes/bulk/", data, format="json")
+
+        assert response.status_code == 207
+        results = response.json()
+        assert [r["status_code"] for r in results] == [201, 400, 201]
+        assert results[0]["data"]["cost_monthly"] == "13.99"
+        assert results[1]["errors"] == {"detail": "Invalid State Provided."}
+        assert results[2]["data"]["cost_monthly"] == "9.49"
+        assert Quote.objects.count() == 2
+        assert Address.objects.count() == 1
+        assert {r["data"]["qid"] for r in (results[0], results[2])} == set(
+            Quote.objects.values_list("qid", flat=True)
+        )
+
+    def test_bulk_create_query_count(self):
+        data = {
+            "date_effective": "2022-01-01T00:00:00.000",
+            "is_owned": True,
+            "address": {"state": "OH", "zipcode": "44444"},
+        }
+        # address lookup, address insert, address re-lookup and one quote
+        # insert (plus two savepoint pairs) regardless of the size
+        with self.assertNumQueries(8):
+            response = self.client.post(
+                "/quote/quotes/bulk/", [data] * 50, format="json"
+            )
+        assert response.status_code == 201
+        assert Quote.objects.count() == 50
+        assert Address.objects.count() == 1
+
+    def test_bulk_create_requires_list(self):
+        response = self.client.post("/quote/quotes/bulk/", {}, format="json")
+        assert response.status_code == 400
+
+
+class TestQuotePrice(APITestCase):
+    def test_price(self):
+        data = {
+            "date_effective": "2022-01-01T00:00:00.000",
+            "date_previous_canceled": "2022-01-01",
+            "is_owned": False,
+            "address": {"state": "WA", "zipcode": "99999"},
+        }
+        with self.assertNumQueries(0):
+            response = self.client.post("/quote/quotes/price/", data, format="json")
+
+        assert response.status_code == 200
+        created = self.client.post("/quote/quotes/", data, format="json").json()
+        del created["qid"]
+        assert response.json() == created
+        assert Quote.objects.count() == 1
+        assert Address.objects.count() == 1
+
+    def test_price_invalid_state(self):
+        data = {
+            "date_effective": "2022-01-01T00:00:00.000",
+            "is_owned": False,
+            "address": {"state": "XX", "zipcode": "99999"},
+        }
+        response = self.client.post("/quote/quotes/price/", data, format="json")
+        assert response.status_code == 400
+
+    def test_price_batch(self):
+        data = [
+            {
+                "date_effective": "2022-01-01T00:00:00.000",
+                "date_previous_canceled": None,
+                "is_owned": True,
+                "address": {"state": "WA", "zipcode": "99999"},
+            },
+            {"is_owned": True, "address": {"state": "WA", "zipcode": "99999"}},
+        ]
+        with self.assertNumQueries(0):
+            response = self.client.post("/quote/quotes/price/", data, format="json")
+
+        results = response.json()
+        assert results[0]["status_code"] == 200
+        assert results[0]["data"]["cost_monthly"] == "9.49"
+        assert results[0]["data"]["cost_biannually"] == "56.94"
+        assert results[1]["status_code"] == 400
+        assert "date_effective" in results[1]["errors"]
+        assert Quote.objects.count() == 0
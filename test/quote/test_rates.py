@@ -0,0 +1,153 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework.test import APITransactionTestCase
+
+from quote.models import Quote
+from quote.models import RateVersion
+from quote.pricing import Rates
+from quote.pricing import default_rates_definition
+from quote.pricing import get_price_table
+from quote.rates import publish_rates
+from quote.rates import refresh_rates
+from test.quote.helpers import quote_data
+
+
+def volcano_fee(percent):
+    definition = default_rates_definition()
+    definition["fees"]["state_with_volcano"] = percent
+    return definition
+
+
+class TestRates(APITestCase):
+    def test_invalid(self):
+        definition = default_rates_definition()
+        del definition["fees"]["canceled"]
+        invalid = [
+            [],
+            definition,
+            {**default_rates_definition(), "taxes": {}},
+            volcano_fee(-1),
+            volcano_fee("25"),
+            {**default_rates_definition(), "states": {"WA": {"fees": {"flood": 5}}}},
+        ]
+        for definition in invalid:
+            with self.assertRaises(ValueError):
+                Rates(definition)
+
+    def test_state_overrides(self):
+        definition = default_rates_definition()
+        definition["states"] = {"CA": {"fees": {"state_with_volcano": 30}}}
+        rates = Rates(definition)
+
+        assert rates.multipliers("CA")[("fees", "state_with_volcano")] == 0.3
+        assert rates.multipliers("WA")[("fees", "state_with_volcano")] == 0.25
+        assert rates.for_state("CA").base_costs == rates.for_state("WA").base_costs
+
+
+class TestRateVersions(APITransactionTestCase):
+    def setUp(self):
+        self.first = publish_rates(default_rates_definition())
+
+    def create(self, **kwargs):
+        response = self.client.post(
+            "/quote/quotes/", quote_data(**kwargs), format="json"
+        )
+        assert response.status_code == 201
+        return Quote.objects.get(qid=response.json()["qid"])
+
+    def test_quotes_record_their_version(self):
+        old = self.create()
+        assert old.rate_version == self.first
+        assert old.cost_biannually == 68.93
+
+        second = publish_rates(volcano_fee(40), "Volcano fee up")
+        new = self.create()
+        assert new.rate_version == second
+        assert new.cost_biannually == 77.93
+
+        # The older quote keeps its price and its breakdown.
+        for path in ["/quote/quotes/", "/quote/async/quotes/"]:
+            response = self.client.get(f"{path}{old.qid}/").json()
+            assert response["cost_biannually"] == "68.93"
+            volcano = response["breakdown_biannually"]["fees"]["state_with_volcano"]
+            assert volcano == {"applies": True, "multiplier": 0.25, "money": 14.98}
+
+        # Saving reprices it at the current rates.
+        old.save()
+        assert old.cost_biannually == 77.93
+        assert old.rate_version == second
+
+    def test_update_fields(self):
+        quote = self.create()
+        second = publish_rates(volcano_fee(40))
+        quote.is_owned = True
+        quote.save(update_fields=["is_owned"])
+
+        quote = Quote.objects.get(qid=quote.qid)
+        assert quote.rate_version == second
+        volcano = quote.breakdown_biannually["fees"]["state_with_volcano"]
+        assert volcano["multiplier"] == 0.4
+        assert volcano["money"] == quote.biannually_fee_state_amt
+
+    def test_hot_reload(self):
+        # Published by another process: only the database knows about it.
+        other = RateVersion.objects.create(definition=volcano_fee(40))
+
+        with override_settings(RATES_RELOAD_INTERVAL=3600):
+            quote = self.create()
+        assert quote.rate_version == self.first
+
+        with override_settings(RATES_RELOAD_INTERVAL=0):
+            quote = self.create()
+        assert quote.rate_version == other
+        assert quote.cost_biannually == 77.93
+
+    def test_without_versions(self):
+        Quote.objects.all().delete()
+        RateVersion.objects.all().delete()
+        refresh_rates(force=True)
+
+        quote = self.create()
+        assert quote.rate_version is None
+        assert quote.cost_biannually == 68.93
+
+
+class TestLoadRatesCommand(APITransactionTestCase):
+    def call(self, *args):
+        out = StringIO()
+        call_command("load_rates", *args, stdout=out)
+        return out.getvalue()
+
+    def test_publish_and_roll_back(self):
+        RateVersion.objects.all().delete()
+        publish_rates(default_rates_definition())
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as file:
+            json.dump(volcano_fee(40), file)
+            file.flush()
+            self.call(file.name, "--note", "Volcano fee up")
+        first, second = RateVersion.objects.order_by("pk")
+        assert second.note == "Volcano fee up"
+        assert get_price_table().version == second.pk
+
+        assert self.call("--from-version", str(first.pk)).strip() == (
+            f"Published rate version {second.pk + 1}."
+        )
+        shown = json.loads(self.call("--show"))
+        assert shown == {"version": second.pk + 1, "definition": first.definition}
+
+    def test_invalid(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as file:
+            json.dump(volcano_fee(-1), file)
+            file.flush()
+            with self.assertRaises(CommandError):
+                self.call(file.name)
+        with self.assertRaises(CommandError):
+            self.call("--from-version", "999")
+        with self.assertRaises(CommandError):
+            self.call()
@@ -0,0 +1,98 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+CHECK_URLS = """
+import sys
+import django
+django.setup()
+from django.urls import resolve
+print(resolve("/swagger.json").func.__module__, "drf_yasg.views" in sys.modules)
+"""
+
+
+class TestSchema(APITestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "openapi.json")
+        overridden = override_settings(OPENAPI_SCHEMA_PATH=self.path)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+
+    def generate(self, *args):
+        out = StringIO()
+        call_command("generate_schema", *args, stdout=out)
+        return out.getvalue()
+
+    def test_served_from_file(self):
+        self.generate()
+        response = self.client.get("/swagger.json")
+        assert response.status_code == 200
+        assert response["Cache-Control"] == "public, max-age=86400"
+        assert "/quotes/{qid}/" in json.loads(response.content)["paths"]
+
+        again = self.client.get("/swagger.json", HTTP_IF_NONE_MATCH=response["ETag"])
+        assert again.status_code == 304
+        assert again["ETag"] == response["ETag"]
+        # The old URL of the document.
+        old = self.client.get("/swagger/?format=openapi")
+        assert old.content == response.content
+
+    def test_readable_by_other_users(self):
+        self.generate()
+        assert os.stat(self.path).st_mode & 0o777 == 0o644
+
+    def test_regenerated(self):
+        self.generate()
+        etag = self.client.get("/swagger.json")["ETag"]
+        with open(self.path, "w") as file:
+            file.write("{}")
+        os.utime(self.path, (0, 0))
+        response = self.client.get("/swagger.json", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.content == b"{}"
+
+    def test_missing(self):
+        assert self.client.get("/swagger.json").status_code == 404
+
+    def test_ui(self):
+        for path in ["/swagger/", "/redoc/"]:
+            response = self.client.get(path)
+            assert response.status_code == 200
+            assert b"/swagger.json" in response.content
+
+    def test_check(self):
+        with self.assertRaises(CommandError):
+            self.generate("--check")
+        self.generate()
+        assert "up to date" in self.generate("--check")
+
+    def test_drf_yasg_imported_only_when_live(self):
+        for live, view_module, imported in [
+            ("false", "insurance_api.schema", "False"),
+            ("true", "drf_yasg.views", "True"),
+        ]:
+            env = {
+                **os.environ,
+                "DJANGO_SETTINGS_MODULE": "insurance_api.settings",
+                "OPENAPI_LIVE_SCHEMA": live,
+            }
+            output = subprocess.run(
+                [sys.executable, "-c", CHECK_URLS],
+                cwd=settings.BASE_DIR,
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.split()
+            assert output == [view_module, imported]
@@ -0,0 +1,71 @@
+from datetime import date, datetime, timezone
+from io import BytesIO
+from decimal import Decimal
+from types import MappingProxyType
+
+from django.utils.translation import gettext_lazy
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from quote.management.commands.benchmark_serializers import make_rows
+from quote.models import Address, Quote
+from quote.serializers import QuotePurchaseSerializer, QuoteSerializer
+from utils.renderers import ORJSONParser, ORJSONRenderer
+
+
+class TestFastSerializers(APITestCase):
+    def test_quote_matches_model_serializer(self):
+        rows = [purchase.quote for purchase in make_rows(12)]
+        rows.append(
+            Quote(
+                qid="ABCDEFGHIJ",
+                date_effective=datetime(2022, 1, 1, 1, 2, 3, 456, tzinfo=timezone.utc),
+                date_previous_canceled=date(2020, 2, 29),
+                is_owned=True,
+                address=Address(zipcode=12345, state="HI"),
+            )
+        )
+        for quote in rows:
+            serializer = QuoteSerializer()
+            expected = serializers.ModelSerializer.to_representation(serializer, quote)
+            assert serializer.to_representation(quote) == expected
+            assert JSONRenderer().render(expected) == ORJSONRenderer().render(
+                serializer.to_representation(quote)
+            )
+
+    def test_purchase_matches_model_serializer(self):
+        for purchase in make_rows(6):
+            serializer = QuotePurchaseSerializer()
+            expected = serializers.ModelSerializer.to_representation(
+                serializer, purchase
+            )
+            assert JSONRenderer().render(expected) == ORJSONRenderer().render(
+                serializer.to_representation(purchase)
+            )
+
+
+class TestORJSONRenderer(APITestCase):
+    def test_matches_stock_renderer(self):
+        data = {
+            "text": "caf\u00e9 \u2028 \u2029 \U0001F30B",
+            "lazy": gettext_lazy("Monthly"),
+            "nested": MappingProxyType({"a": MappingProxyType({"b": [1, 2.5, None]})}),
+            "decimal": Decimal("1.10"),
+            "date": date(2022, 1, 1),
+            "float": 13.99,
+            "big": 2**70,
+        }
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_indent_falls_back(self):
+        data = {"a": [1, 2]}
+        media_type = "application/json; indent=4"
+        assert ORJSONRenderer().render(data, media_type) == JSONRenderer().render(
+            data, media_type
+        )
+
+    def test_parser(self):
+        assert ORJSONParser().parse(BytesIO(b'{"a": [1, "\\u00e9"]}')) == {
+            "a": [1, "é"]
+        }
@@ -0,0 +1,163 @@
+from unittest import mock
+
+from rest_framework.test import APITestCase
+from rest_framework.test import APITransactionTestCase
+
+from quote.models import Quote
+
+QUOTE = {
+    "date_effective": "2022-01-01T00:00:00.000",
+    "date_previous_canceled": "2022-01-01",
+    "is_owned": False,
+    "address": {"state": "WA", "zipcode": "99999"},
+}
+
+
+class TestSparseFields(APITestCase):
+    def setUp(self):
+        self.qid = self.client.post("/quote/quotes/", QUOTE, format="json").json()[
+            "qid"
+        ]
+        self.purchase = self.client.post(
+            "/quote/purchase/",
+            {"quote_id": self.qid, "payment_frequency": "Monthly"},
+            format="json",
+        ).json()["pk"]
+
+    def get(self, url):
+        response = self.client.get(url)
+        assert response.status_code == 200, response.content
+        return response.json()
+
+    def test_fields(self):
+        data = self.get(f"/quote/quotes/{self.qid}/?fields=qid,cost_monthly")
+        assert data == {"qid": self.qid, "cost_monthly": "13.99"}
+
+        rows = self.get("/quote/quotes/?fields=cost_biannually")["results"]
+        assert rows == [{"cost_biannually": "83.91"}]
+
+    def test_exclude(self):
+        full = self.get(f"/quote/quotes/{self.qid}/")
+        data = self.get(f"/quote/quotes/{self.qid}/?exclude=address,breakdown_monthly")
+        assert data == {
+            name: value
+            for name, value in full.items()
+            if name not in ("address", "breakdown_monthly")
+        }
+
+    def test_breakdown(self):
+        url = f"/quote/quotes/{self.qid}/"
+        full = self.get(url)
+        assert self.get(url + "?breakdown=full") == full
+
+        compact = self.get(url + "?breakdown=compact")
+        assert compact["breakdown_monthly"] == {
+            "fees": {"canceled": 1.5, "state_with_volcano": 2.5},
+            "discounts": {},
+        }
+        for name in ["breakdown_monthly", "breakdown_biannually"]:
+            for group, modifiers in full[name].items():
+                assert compact[name][group] == {
+                    modifier: values["money"]
+                    for modifier, values in modifiers.items()
+                    if values["applies"]
+                }
+
+        none = self.get(url + "?breakdown=none")
+        assert none == {
+            name: value for name, value in full.items() if "breakdown" not in name
+        }
+
+    def test_no_breakdown_lookup(self):
+        # The breakdown of a saved quote comes from the rates it was priced with.
+        with mock.patch("quote.models.price_table_for") as price_table_for:
+            data = self.get(f"/quote/quotes/{self.qid}/?breakdown=none")
+            self.get("/quote/quotes/?fields=qid,cost_monthly")
+        assert data["cost_monthly"] == "13.99"
+        price_table_for.assert_not_called()
+
+    def test_purchase(self):
+        url = f"/quote/purchase/{self.purchase}/"
+        full = self.get(url)
+        assert "quote" not in self.get(url + "?exclude=quote")
+
+        data = self.get(url + "?fields=pk,quote.qid,quote.cost_monthly")
+        assert data == {
+            "quote": {"qid": self.qid, "cost_monthly": "13.99"},
+            "pk": self.purchase,
+        }
+
+        data = self.get(url + "?breakdown=none&exclude=quote.address")
+        assert set(data["quote"]) == set(full["quote"]) - {
+            "address",
+            "breakdown_monthly",
+            "breakdown_biannually",
+        }
+        assert data["payment_amount"] == full["payment_amount"]
+
+    def test_cached_per_fieldset(self):
+        url = f"/quote/quotes/{self.qid}/"
+        full = self.client.get(url)
+        sparse = self.client.get(url + "?fields=qid")
+        assert sparse.json() == {"qid": self.qid}
+        assert sparse["ETag"] != full["ETag"]
+        # Same fieldset, same cached response.
+        with self.assertNumQueries(0):
+            again = self.client.get(url + "?fields=+qid,")
+        assert again.content == sparse.content
+
+        self.client.patch(url, {**QUOTE, "is_owned": True}, format="json")
+        assert self.get(url + "?fields=is_owned") == {"is_owned": True}
+
+    def test_invalid(self):
+        for query in [
+            "fields=qid,nope",
+            "exclude=pk",
+            "fields=address.state",
+            "breakdown=short",
+        ]:
+            response = self.client.get(f"/quote/quotes/?{query}")
+            assert response.status_code == 400, query
+        response = self.client.get("/quote/purchase/?fields=quote.nope")
+        assert response.status_code == 400
+
+    def test_price_preview(self):
+        response = self.client.post(
+            "/quote/quotes/price/?fields=qid,cost_monthly", QUOTE, format="json"
+        )
+        assert response.json() == {"cost_monthly": "13.99"}
+
+    def test_payload_size(self):
+        Quote.objects.bulk_create(Quote(**self.get_quote_attrs()) for _ in range(49))
+        full = self.client.get("/quote/quotes/?page_size=50")
+        sparse = self.client.get(
+            "/quote/quotes/?page_size=50&fields=qid,cost_monthly,cost_biannually"
+        )
+        compact = self.client.get("/quote/quotes/?page_size=50&breakdown=compact")
+        assert len(sparse.content) * 5 < len(full.content)
+        assert len(compact.content) * 2 < len(full.content)
+
+    def get_quote_attrs(self):
+        quote = Quote.objects.get(qid=self.qid)
+        return {
+            "date_effective": quote.date_effective,
+            "date_previous_canceled": quote.date_previous_canceled,
+            "is_owned": quote.is_owned,
+            "address_id": quote.address_id,
+        }
+
+
+class TestAsyncSparseFields(APITransactionTestCase):
+    def test_async(self):
+        response = self.client.post(
+            "/quote/async/quotes/?breakdown=compact&exclude=address",
+            QUOTE,
+            format="json",
+        )
+        assert response.status_code == 201
+        sync = self.client.post(
+            "/quote/quotes/?breakdown=compact&exclude=address", QUOTE, format="json"
+        )
+        data, sync_data = response.json(), sync.json()
+        assert data.pop("qid") != sync_data.pop("qid")
+        assert data == sync_data
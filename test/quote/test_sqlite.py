@@ -0,0 +1,161 @@
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import OperationalError
+from django.db import connection
+from django.db import connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import override_settings
+from rest_framework.test import APIClient
+from rest_framework.test import APITestCase
+from rest_framework.test import APITransactionTestCase
+
+from quote.models import Quote
+from quote.models import QuotePurchase
+from quote.models import get_address_cache
+from utils.sqlite import configure_sqlite
+
+QUOTE = {
+    "date_effective": "2022-01-01T00:00:00.000",
+    "date_previous_canceled": None,
+    "is_owned": False,
+    "address": {"state": "WA", "zipcode": "99999"},
+}
+
+
+def pragma(wrapper, name):
+    with wrapper.cursor() as cursor:
+        cursor.execute(f"PRAGMA {name}")
+        return cursor.fetchone()[0]
+
+
+class TestSqlitePragmas(APITestCase):
+    def test_applied_to_new_connections(self):
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = DatabaseWrapper(
+                {**connection.settings_dict, "NAME": os.path.join(directory, "db")}
+            )
+            try:
+                assert pragma(wrapper, "journal_mode") == "wal"
+                assert pragma(wrapper, "busy_timeout") == 5000
+                assert pragma(wrapper, "synchronous") == 1  # NORMAL
+                assert pragma(wrapper, "temp_store") == 2  # MEMORY
+                assert pragma(wrapper, "cache_size") == -65536
+            finally:
+                wrapper.close()
+
+    @override_settings(SQLITE_PRAGMAS={"busy_timeout": 1234, "synchronous": ""})
+    def test_settings(self):
+        configure_sqlite(None, connection)
+        assert pragma(connection, "busy_timeout") == 1234
+        connection.connection.execute(
+            f"PRAGMA busy_timeout = {settings.SQLITE_PRAGMAS['busy_timeout']}"
+        )
+
+    def test_rejects_unknown_pragmas_and_values(self):
+        for pragmas in [
+            {"writable_schema": "on"},
+            {"busy_timeout": "1; DROP TABLE quote_quote"},
+        ]:
+            with override_settings(SQLITE_PRAGMAS=pragmas):
+                with self.assertRaises(ImproperlyConfigured):
+                    configure_sqlite(None, connection)
+
+
+class TestConcurrentWrites(APITransactionTestCase):
+    # Writers that read before writing (the address lookup, the quote a
+    # purchase prices) must take the write lock up front: a deferred
+    # transaction can't wait for it and fails with "database is locked".
+    # Against a database file, as the in-memory test database has no WAL or
+    # busy timeout. Only other threads use it: the test's own connection
+    # stays on the test database, as in-memory connections are never closed.
+
+    threads = 10
+    requests = 10
+
+    def setUp(self):
+        get_address_cache().clear()
+        self.addCleanup(get_address_cache().clear)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        database = connections.databases["default"]
+        self.addCleanup(database.__setitem__, "NAME", database["NAME"])
+        database["NAME"] = os.path.join(directory.name, "db.sqlite3")
+        self.in_threads(1, lambda index: call_command("migrate", verbosity=0))
+
+    def in_threads(self, count, target):
+        results = [None] * count
+
+        def run(index):
+            try:
+                results[index] = target(index)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=run, args=(index,)) for index in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def run_clients(self, request):
+        """Failed requests, with `self.threads` clients each sending `request`s."""
+
+        def client(index):
+            client, failures = APIClient(), []
+            for number in range(self.requests):
+                try:
+                    response = request(client, number)
+                except OperationalError as exc:
+                    failures.append(str(exc))
+                else:
+                    if response.status_code >= 500:
+                        failures.append(response.status_code)
+            return failures
+
+        return sum(self.in_threads(self.threads, client), [])
+
+    def count(self, model):
+        return self.in_threads(1, lambda index: model.objects.count())[0]
+
+    def create_quote(self, client, zipcode="99999"):
+        return client.post(
+            "/quote/quotes/",
+            {**QUOTE, "address": {"state": "WA", "zipcode": zipcode}},
+            format="json",
+        )
+
+    def test_quote_creates(self):
+        # New and known addresses, so some requests insert one.
+        failures = self.run_clients(
+            lambda client, number: self.create_quote(client, str(10000 + number))
+        )
+        assert failures == [], failures[:3]
+        assert self.count(Quote) == self.threads * self.requests
+
+    def test_purchases(self):
+        qid = self.in_threads(
+            1, lambda index: self.create_quote(APIClient()).json()["qid"]
+        )[0]
+        failures = self.run_clients(
+            lambda client, number: client.post(
+                "/quote/purchase/",
+                {"quote_id": qid, "payment_frequency": "Monthly"},
+                format="json",
+            )
+            if number % 2
+            else client.post(
+                "/quote/purchase/bulk/",
+                [{"quote_id": qid, "payment_frequency": "Biannually"}] * 2,
+                format="json",
+            )
+        )
+        assert failures == [], failures[:3]
+        assert self.count(QuotePurchase) == self.threads * self.requests * 3 // 2
@@ -0,0 +1,139 @@
+from datetime import date
+from datetime import timedelta
+
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from quote.models import DailyQuoteStats
+from quote.models import Quote
+from quote.models import QuotePurchase
+from quote.stats import get_stats
+from quote.stats import refresh_daily_stats
+from quote.stats import start_of_day
+
+
+class TestStats(APITestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.week_ago = self.today - timedelta(days=7)
+
+    def create(self, state, canceled=True, purchase=None, day=None):
+        data = {
+            "date_effective": "2022-01-01T00:00:00.000",
+            "date_previous_canceled": "2022-01-01" if canceled else None,
+            "is_owned": False,
+            "address": {"state": state, "zipcode": "99999"},
+        }
+        qid = self.client.post("/quote/quotes/", data, format="json").json()["qid"]
+        if purchase:
+            self.client.post(
+                "/quote/purchase/",
+                {"quote_id": qid, "payment_frequency": purchase},
+                format="json",
+            )
+        if day:
+            created = start_of_day(day) + timedelta(hours=12)
+            Quote.objects.filter(qid=qid).update(date_created=created)
+            QuotePurchase.objects.filter(quote_id=qid).update(date_created=created)
+        return qid
+
+    def stats(self, **params):
+        response = self.client.get("/quote/stats/", params)
+        assert response.status_code == 200
+        return response.json()
+
+    def test_live(self):
+        self.create("WA", purchase="Monthly")  # 13.99
+        self.create("WA", purchase="Biannually")  # 83.91
+        self.create("OH", canceled=False)
+
+        stats = self.stats()
+
+        assert stats["quotes"] == {"total": 3, "by_state": {"OH": 1, "WA": 2}}
+        assert stats["conversion"] == {"quotes": 3, "converted": 2, "rate": 0.6667}
+        assert stats["purchases"] == {
+            "total": 2,
+            "revenue": 97.9,
+            "by_payment_frequency": {
+                "Biannually": {"purchases": 1, "revenue": 83.91},
+                "Monthly": {"purchases": 1, "revenue": 13.99},
+            },
+        }
+        assert stats["fees"] == {"canceled": 10.49, "state_with_volcano": 17.48}
+        assert stats["discounts"] == {"canceled": 0.0, "owns_property": 0.0}
+
+    def test_summary_matches_live(self):
+        self.create("WA", purchase="Monthly", day=self.week_ago)
+        self.create("CA", day=self.week_ago)
+        self.create("OH", purchase="Biannually", day=self.week_ago - timedelta(1))
+        self.create("WA", purchase="Monthly")
+        live = get_stats(self.week_ago - timedelta(days=1), self.today)
+
+        assert refresh_daily_stats() == 2
+        assert DailyQuoteStats.objects.count() == 3
+        summarized = get_stats(self.week_ago - timedelta(days=1), self.today)
+
+        assert summarized["summarized_until"] is not None
+        del live["summarized_until"], summarized["summarized_until"]
+        assert summarized == live
+        assert summarized["quotes"]["total"] == 4
+
+    def test_range(self):
+        self.create("WA", day=self.week_ago)
+        self.create("OH")
+        refresh_daily_stats()
+
+        assert self.stats(end=str(self.week_ago))["quotes"]["by_state"] == {"WA": 1}
+        assert self.stats(start=str(self.today))["quotes"]["by_state"] == {"OH": 1}
+        assert self.stats()["quotes"]["total"] == 2
+
+    def test_incremental_refresh(self):
+        qid = self.create("WA", day=self.week_ago)
+        refresh_daily_stats()
+        assert DailyQuoteStats.objects.get(day=self.week_ago).converted == 0
+
+        # A purchase today of last week's quote...
+        self.client.post(
+            "/quote/purchase/",
+            {"quote_id": qid, "payment_frequency": "Monthly"},
+            format="json",
+        )
+        # ...shows up live right away, and in last week's row after the next
+        # refresh, which only recomputes the two days involved.
+        assert self.stats(start=str(self.week_ago))["conversion"]["converted"] == 0
+        assert self.stats()["purchases"]["total"] == 1
+        assert refresh_daily_stats(now=timezone.now() + timedelta(days=1)) == 2
+        assert DailyQuoteStats.objects.get(day=self.week_ago).converted == 1
+        assert self.stats()["conversion"]["converted"] == 1
+
+    def test_full_refresh(self):
+        self.create("WA", day=self.week_ago)
+        qid = self.create("OH", day=self.week_ago)
+        refresh_daily_stats()
+        Quote.objects.filter(qid=qid).delete()
+
+        assert refresh_daily_stats() == 0
+        assert self.stats()["quotes"]["total"] == 2
+        assert refresh_daily_stats(full=True) == 1
+        assert self.stats()["quotes"]["total"] == 1
+
+    @override_settings(QUERY_COUNT_HEADER=True, QUERY_BUDGET_ENFORCE=True)
+    def test_query_budget(self):
+        self.create("WA", day=self.week_ago)
+        refresh_daily_stats()
+        response = self.client.get("/quote/stats/")
+        assert response.status_code == 200
+        assert response["X-Query-Count"] == "5"
+
+    def test_invalid_range(self):
+        for params in [{"start": "yesterday"}, {"end": "2022-02-30"}]:
+            response = self.client.get("/quote/stats/", params)
+            assert response.status_code == 400
+        response = self.client.get(
+            "/quote/stats/", {"start": "2022-02-01", "end": str(date(2022, 1, 1))}
+        )
+        assert response.json() == {
+            "detail": "`start` must not be after `end`.",
+            "status_code": 400,
+        }
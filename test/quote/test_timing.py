@@ -0,0 +1,97 @@
+import os
+import pstats
+import tempfile
+import time
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from utils.timing import PHASES
+from utils.timing import RequestTimer
+from utils.timing import timed
+
+QUOTE = {
+    "date_effective": "2022-01-01T00:00:00.000",
+    "date_previous_canceled": None,
+    "is_owned": True,
+    "address": {"state": "WA", "zipcode": "99999"},
+}
+
+
+def server_timing(response):
+    phases = {}
+    for entry in response["Server-Timing"].split(", "):
+        name, duration = entry.split(";dur=")
+        phases[name] = float(duration)
+    return phases
+
+
+class TestRequestTimer(APITestCase):
+    def test_phases_are_exclusive(self):
+        timer = RequestTimer()
+        with timer.phase("serialize"):
+            time.sleep(0.01)
+            with timer.phase("db"):
+                time.sleep(0.02)
+        assert 0.01 <= timer.durations["serialize"] < 0.02
+        assert timer.durations["db"] >= 0.02
+
+    def test_untimed_outside_requests(self):
+        assert timed("pricing") is timed("db")
+
+
+@override_settings(SERVER_TIMING=True)
+class TestServerTiming(APITestCase):
+    def test_purchase_phases(self):
+        qid = self.client.post("/quote/quotes/", QUOTE, format="json").json()["qid"]
+        response = self.client.post(
+            "/quote/purchase/",
+            {"quote_id": qid, "payment_frequency": "Monthly"},
+            format="json",
+        )
+
+        phases = server_timing(response)
+        assert list(phases) == [*PHASES, "app", "total"]
+        for phase in PHASES:
+            assert phases[phase] > 0, phase
+        assert (
+            sum(phases[phase] for phase in [*PHASES, "app"]) <= phases["total"] + 0.01
+        )
+
+    @override_settings(SERVER_TIMING=False)
+    def test_disabled(self):
+        response = self.client.get("/quote/quotes/")
+        assert "Server-Timing" not in response
+
+
+@override_settings(SERVER_TIMING=False, PROFILE_TOKEN="secret")
+class TestProfiling(APITestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def profiles(self):
+        return os.listdir(self.directory) if os.path.isdir(self.directory) else []
+
+    def test_requested_by_header(self):
+        with self.settings(PROFILE_DIR=self.directory):
+            response = self.client.get("/quote/quotes/", HTTP_X_PROFILE="secret")
+
+        assert self.profiles() == [response["X-Profile-File"]]
+        stats = pstats.Stats(os.path.join(self.directory, self.profiles()[0]))
+        assert stats.total_calls > 0
+        assert "Server-Timing" not in response
+
+    def test_wrong_token(self):
+        with self.settings(PROFILE_DIR=self.directory):
+            response = self.client.get("/quote/quotes/", HTTP_X_PROFILE="guess")
+        assert "X-Profile-File" not in response
+        assert self.profiles() == []
+
+    def test_sampled(self):
+        with self.settings(PROFILE_DIR=self.directory, PROFILE_SAMPLE_RATE=1):
+            response = self.client.get("/quote/quotes/")
+        # Sampled profiles aren't announced to the client.
+        assert "X-Profile-File" not in response
+        assert len(self.profiles()) == 1
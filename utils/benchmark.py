@@ -0,0 +1,161 @@
+"""
+Helpers shared by the benchmark management commands: a throwaway SQLite
+database, a local HTTP server, in-process WSGI/ASGI requests and latency
+summaries.
+"""
+import os
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from io import BytesIO
+
+from django.core.management import call_command
+from django.core.servers.basehttp import ThreadedWSGIServer
+from django.core.servers.basehttp import WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+
+__all__ = [
+    "temporary_database",
+    "serve_locally",
+    "wsgi_request",
+    "asgi_request",
+    "summarize",
+]
+
+
+@contextmanager
+def temporary_database():
+    """Point the default database at a fresh, migrated SQLite file."""
+    database = connections.databases["default"]
+    original = database["NAME"]
+    with tempfile.TemporaryDirectory() as directory:
+        connections.close_all()
+        database["NAME"] = os.path.join(directory, "benchmark.sqlite3")
+        try:
+            call_command("migrate", verbosity=0)
+            yield database["NAME"]
+        finally:
+            connections.close_all()
+            database["NAME"] = original
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_locally(host="127.0.0.1", port=0):
+    """
+    Serve the project's WSGI application from a background thread, one
+    thread per connection like `runserver`. Yields the base URL.
+    """
+    server = ThreadedWSGIServer((host, port), _QuietRequestHandler)
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://{host}:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def wsgi_request(application, method, path, body=b""):
+    """Call a WSGI application directly; returns `(status, body)`."""
+    path, _, query = path.partition("?")
+    environ = {
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    status = []
+
+    def start_response(status_line, headers, exc_info=None):
+        status.append(int(status_line.split(" ", 1)[0]))
+
+    result = application(environ, start_response)
+    try:
+        content = b"".join(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return status[0], content
+
+
+async def asgi_request(application, method, path, body=b""):
+    """Call an ASGI application directly; returns `(status, body)`."""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [
+            (b"host", b"localhost"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    status = []
+    chunks = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await application(scope, receive, send)
+    return status[0], b"".join(chunks)
+
+
+def _percentile(ordered, percent):
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """Throughput and latency percentiles (ms) of a run, as a JSON-able dict."""
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "throughput_rps": round(len(ordered) / elapsed, 1) if elapsed else None,
+        "p50_ms": _ms(_percentile(ordered, 50)),
+        "p95_ms": _ms(_percentile(ordered, 95)),
+        "p99_ms": _ms(_percentile(ordered, 99)),
+        "max_ms": _ms(ordered[-1] if ordered else None),
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
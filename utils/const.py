@@ -17,3 +17,21 @@ class DISCOUNTS:
 
     class OWNED_PROPERTY:
         PERCENT = 20
+
+
+STATES_WITH_VOLCANOES = frozenset(
+    {
+        "AK",
+        "AZ",
+        "CA",
+        "CO",
+        "HI",
+        "ID",
+        "NV",
+        "NM",
+        "OR",
+        "UT",
+        "WA",
+        "WY",
+    }
+)
@@ -0,0 +1,142 @@
+"""
+Read replica routing.
+
+With `READ_REPLICA_DATABASE` set to a database alias, `ReadReplicaMiddleware`
+lets GET/HEAD requests read the quote app's tables from that replica.
+Everything else, writes and reads outside such requests (management
+commands, POST handlers), goes to the primary (`default`).
+
+Replicas lag behind, so a client reads from the primary for
+`READ_REPLICA_PIN_SECONDS` after any request of theirs wrote something
+(tracked with a cookie), and a request that wrote reads its own writes back
+from the primary too. API clients that don't keep cookies get no such
+window: they have to send the `X-Primary-DB-Pin` header (which responses to
+writes carry) on the reads that must see their writes.
+"""
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+__all__ = ["ReadReplicaRouter", "ReadReplicaMiddleware", "replica_reads"]
+
+PIN_COOKIE = "primary_db_pin"
+PIN_HEADER = "X-Primary-DB-Pin"
+
+# Apps whose models may be read from the replica.
+REPLICA_APPS = {"quote"}
+
+SAFE_METHODS = {"GET", "HEAD"}
+
+
+class _Routing:
+    # Mutable, so a write seen on another thread (which gets a copy of the
+    # context, see `quote.async_views.run_db`) still pins the request.
+    __slots__ = ("use_replica", "wrote")
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+_routing = ContextVar("db_routing", default=None)
+
+
+def get_replica():
+    return getattr(settings, "READ_REPLICA_DATABASE", None)
+
+
+@contextmanager
+def replica_reads(allowed=True):
+    """Let reads in this context go to the replica (if `allowed`) until a write."""
+    token = _routing.set(_Routing(allowed))
+    try:
+        yield _routing.get()
+    finally:
+        _routing.reset(token)
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        replica = get_replica()
+        if (
+            replica
+            and routing is not None
+            and routing.use_replica
+            and not routing.wrote
+            and model._meta.app_label in REPLICA_APPS
+        ):
+            return replica
+        return None
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        # Explicitly, or an instance read from the replica would be saved back
+        # to it.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        databases = {DEFAULT_DB_ALIAS, get_replica()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get their schema from the primary.
+        if db == get_replica():
+            return False
+        return None
+
+
+class ReadReplicaMiddleware:
+    """
+    Route the reads of GET/HEAD requests to the replica, unless the client
+    wrote something in the last `READ_REPLICA_PIN_SECONDS` or sends the
+    `X-Primary-DB-Pin` header.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark the instance as a coroutine function for Django's handler.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def _use_replica(self, request):
+        return (
+            request.method in SAFE_METHODS
+            and PIN_COOKIE not in request.COOKIES
+            and PIN_HEADER not in request.headers
+        )
+
+    def _pin(self, response, routing):
+        if routing.wrote:
+            max_age = getattr(settings, "READ_REPLICA_PIN_SECONDS", 5)
+            response.set_cookie(
+                PIN_COOKIE, "1", max_age=max_age, httponly=True, samesite="Lax"
+            )
+            # For clients without a cookie jar to echo back.
+            response[PIN_HEADER] = str(max_age)
+        return response
+
+    def __call__(self, request):
+        if not get_replica():
+            return self.get_response(request)
+        if asyncio.iscoroutinefunction(self):
+            return self._acall(request)
+        with replica_reads(self._use_replica(request)) as routing:
+            response = self.get_response(request)
+        return self._pin(response, routing)
+
+    async def _acall(self, request):
+        with replica_reads(self._use_replica(request)) as routing:
+            response = await self.get_response(request)
+        return self._pin(response, routing)
@@ -1,4 +1,5 @@
 from rest_framework import filters
+from rest_framework.exceptions import ValidationError
 
 
 class AllowStaffLimitUserFilterBackend(filters.BaseFilterBackend):
@@ -12,3 +13,42 @@ class AllowStaffLimitUserFilterBackend(filters.BaseFilterBackend):
         if request.user.is_staff:
             return queryset
         return queryset.filter(user=request.user)
+
+
+class RangeFilterBackend(filters.BaseFilterBackend):
+    """
+    `?<field>__gt=`, `__gte=`, `__lt=` and `__lte=` filters on the numeric
+    fields a view lists in `range_filter_fields`, e.g.
+    `?cost_biannually__gt=80`.
+    """
+
+    lookups = ("gt", "gte", "lt", "lte")
+
+    def filter_queryset(self, request, queryset, view):
+        conditions = {}
+        for field in getattr(view, "range_filter_fields", ()):
+            for lookup in self.lookups:
+                param = f"{field}__{lookup}"
+                value = request.query_params.get(param)
+                if value is None:
+                    continue
+                try:
+                    conditions[param] = float(value)
+                except ValueError:
+                    raise ValidationError({param: ["A valid number is required."]})
+        return queryset.filter(**conditions) if conditions else queryset
+
+
+class StableOrderingFilter(filters.OrderingFilter):
+    """
+    `?ordering=` with the primary key as a tiebreak, so pages don't shuffle
+    rows with equal values. Keyset (`?pagination=cursor`) pages are always
+    newest first and ignore it.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and request.query_params.get(self.ordering_param):
+            descending = ordering[-1].startswith("-")
+            ordering = [*ordering, "-pk" if descending else "pk"]
+        return ordering
@@ -0,0 +1,411 @@
+"""
+Request metrics in the Prometheus text format, across worker processes.
+
+`MetricsMiddleware` records, per route (the URL name, e.g. `quote-list`):
+request counts by method and status, a latency histogram, and the number
+and time of SQL statements. Caches registered with `register_cache` report
+their hits and misses. `metrics_view` serves it all at `/metrics`, only to
+requests bearing the `METRICS_TOKEN` (`Authorization: Bearer <token>`, as
+Prometheus' `authorization` scrape option sends it). Everything is off
+unless `METRICS_ENABLED`.
+
+Each process writes its values into its own memory mapped file in
+`METRICS_DIR`, so recording never waits on another process: a process local
+lock held for a dict lookup and an 8 byte write. The endpoint sums the files
+of every process, including those that exited (clear the directory when
+deploying). Without `METRICS_DIR` the values live in anonymous memory and
+only the serving process's own are reported.
+"""
+import asyncio
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+__all__ = [
+    "MetricsStore",
+    "get_metrics",
+    "register_cache",
+    "collect",
+    "render_metrics",
+    "MetricsMiddleware",
+    "metrics_view",
+]
+
+# Seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# name -> (type, help)
+METRICS = {
+    "http_requests_total": ("counter", "Requests served, by route, method and status."),
+    "http_request_duration_seconds": ("histogram", "Request latency, by route."),
+    "db_queries_total": ("counter", "SQL statements run, by route."),
+    "db_query_duration_seconds_total": ("counter", "Time spent in SQL, by route."),
+    "cache_hits_total": ("counter", "Cache hits, by cache."),
+    "cache_misses_total": ("counter", "Cache misses, by cache."),
+    "cache_hit_ratio": ("gauge", "Hits over lookups, by cache."),
+}
+
+_HEADER = struct.Struct("Q")  # bytes used, including the header
+_KEY_LENGTH = struct.Struct("I")
+_VALUE = struct.Struct("d")
+_INITIAL_SIZE = 64 * 1024
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _entries(buffer):
+    """`((name, labels), value offset)` of the entries in a store's bytes."""
+    used = _HEADER.unpack_from(buffer, 0)[0]
+    offset = _HEADER.size
+    while offset < used:
+        length = _KEY_LENGTH.unpack_from(buffer, offset)[0]
+        start = offset + _KEY_LENGTH.size
+        offset = start + length
+        name, labels = json.loads(bytes(buffer[start:offset]))
+        # Values are 8 byte aligned, so they're never read half written.
+        offset += -offset % 8
+        yield (name, tuple(map(tuple, labels))), offset
+        offset += _VALUE.size
+
+
+def _read(buffer):
+    return {
+        key: _VALUE.unpack_from(buffer, offset)[0] for key, offset in _entries(buffer)
+    }
+
+
+class MetricsStore:
+    """
+    The metric values of one process, in a memory mapped file (`path`) or,
+    without one, anonymous memory. Values are doubles keyed by metric name
+    and labels.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._offsets = {}
+        self._file = None
+        if path is None:
+            self._map = mmap.mmap(-1, _INITIAL_SIZE)
+        else:
+            self._file = open(path, "w+b")
+            self._file.truncate(_INITIAL_SIZE)
+            self._map = mmap.mmap(self._file.fileno(), _INITIAL_SIZE)
+        self._used = _HEADER.size
+        _HEADER.pack_into(self._map, 0, self._used)
+
+    def _grow(self, needed):
+        size = len(self._map)
+        while size < needed:
+            size *= 2
+        if self._file is None:
+            used = self._used
+            grown = mmap.mmap(-1, size)
+            grown[:used] = self._map[:used]
+        else:
+            self._file.truncate(size)
+            grown = mmap.mmap(self._file.fileno(), size)
+        self._map.close()
+        self._map = grown
+
+    def _offset(self, key):
+        # Called with the lock held.
+        offset = self._offsets.get(key)
+        if offset is None:
+            name, labels = key
+            encoded = json.dumps([name, labels], separators=(",", ":")).encode()
+            start = self._used + _KEY_LENGTH.size
+            offset = start + len(encoded)
+            key_end = offset
+            offset += -offset % 8
+            end = offset + _VALUE.size
+            if end > len(self._map):
+                self._grow(end)
+            _KEY_LENGTH.pack_into(self._map, self._used, len(encoded))
+            self._map[start:key_end] = encoded
+            _VALUE.pack_into(self._map, offset, 0.0)
+            # Publish the entry only once it's complete.
+            self._used = end
+            _HEADER.pack_into(self._map, 0, end)
+            self._offsets[key] = offset
+        return offset
+
+    def inc(self, name, labels, amount=1):
+        key = _key(name, labels)
+        with self._lock:
+            offset = self._offset(key)
+            value = _VALUE.unpack_from(self._map, offset)[0]
+            _VALUE.pack_into(self._map, offset, value + amount)
+
+    def set(self, name, labels, value):
+        key = _key(name, labels)
+        with self._lock:
+            _VALUE.pack_into(self._map, self._offset(key), value)
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        """Add `value` to a histogram: its bucket, sum and count."""
+        index = bisect_left(buckets, value)
+        le = "+Inf" if index == len(buckets) else repr(float(buckets[index]))
+        self.inc(f"{name}_bucket", {**labels, "le": le})
+        self.inc(f"{name}_sum", labels, value)
+        self.inc(f"{name}_count", labels)
+
+    def values(self):
+        """`{(name, labels): value}`, labels as sorted `(label, value)` pairs."""
+        with self._lock:
+            return _read(self._map)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_metrics():
+    """This process's `MetricsStore`, a new one after a fork."""
+    global _store
+    store = _store
+    if store is None or store.pid != os.getpid():
+        with _store_lock:
+            if _store is None or _store.pid != os.getpid():
+                directory = getattr(settings, "METRICS_DIR", None)
+                path = None
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                    # Unique even when a pid is reused by a later process.
+                    path = os.path.join(
+                        directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.metrics"
+                    )
+                _store = MetricsStore(path)
+            store = _store
+    return store
+
+
+def reset_metrics():
+    """Start over with a new store (e.g. in tests, after changing `METRICS_DIR`)."""
+    global _store
+    with _store_lock:
+        _store = None
+
+
+_caches = {}
+
+
+def register_cache(name, stats):
+    """Report the hits and misses of `stats()` (e.g. `LRUCache.stats`) as `name`."""
+    _caches[name] = stats
+
+
+def _record_caches(store):
+    for name, stats in _caches.items():
+        counters = stats()
+        store.set("cache_hits_total", {"cache": name}, counters["hits"])
+        store.set("cache_misses_total", {"cache": name}, counters["misses"])
+
+
+def collect():
+    """The values of every process's store, summed, keyed by `(name, labels)`."""
+    store = get_metrics()
+    if store.path is None:
+        sources = [store.values()]
+    else:
+        sources = []
+        for path in glob.glob(os.path.join(os.path.dirname(store.path), "*.metrics")):
+            if path == store.path:
+                sources.append(store.values())
+                continue
+            try:
+                with open(path, "rb") as file:
+                    buffer = file.read()
+            except OSError:
+                continue
+            sources.append(_read(buffer))
+    totals = {}
+    for values in sources:
+        for key, value in values.items():
+            totals[key] = totals.get(key, 0.0) + value
+    return totals
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _sample(name, labels, value):
+    if labels:
+        pairs = ",".join(f'{label}="{_escape(text)}"' for label, text in labels)
+        name = f"{name}{{{pairs}}}"
+    value = float(value)
+    return f"{name} {int(value) if value.is_integer() else repr(value)}"
+
+
+def _le(labels):
+    value = dict(labels)["le"]
+    return float("inf") if value == "+Inf" else float(value)
+
+
+def render_metrics(totals):
+    """`collect()` output in the Prometheus text exposition format."""
+    by_name = {}
+    for (name, labels), value in totals.items():
+        by_name.setdefault(name, {})[labels] = value
+
+    hits, misses = by_name.get("cache_hits_total", {}), by_name.get(
+        "cache_misses_total", {}
+    )
+    ratios = {}
+    for labels in set(hits) | set(misses):
+        lookups = hits.get(labels, 0) + misses.get(labels, 0)
+        if lookups:
+            ratios[labels] = hits.get(labels, 0) / lookups
+    if ratios:
+        by_name["cache_hit_ratio"] = ratios
+
+    lines = []
+    for name, (kind, help) in METRICS.items():
+        if kind == "histogram":
+            series = by_name.get(f"{name}_count")
+        else:
+            series = by_name.get(name)
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind != "histogram":
+            for labels, value in sorted(series.items()):
+                lines.append(_sample(name, labels, value))
+            continue
+        buckets = {}
+        for labels, count in by_name.get(f"{name}_bucket", {}).items():
+            base = tuple(item for item in labels if item[0] != "le")
+            buckets.setdefault(base, []).append((_le(labels), count))
+        for labels, count in sorted(series.items()):
+            cumulative = 0
+            counts = dict(buckets.get(labels, []))
+            for bound in [*LATENCY_BUCKETS, float("inf")]:
+                cumulative += counts.get(float(bound), 0)
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(
+                    _sample(f"{name}_bucket", (*labels, ("le", le)), cumulative)
+                )
+            total = by_name.get(f"{name}_sum", {}).get(labels, 0.0)
+            lines.append(_sample(f"{name}_sum", labels, total))
+            lines.append(_sample(f"{name}_count", labels, count))
+    return "\n".join(lines) + "\n"
+
+
+class _QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+
+def _route(request):
+    match = getattr(request, "resolver_match", None)
+    # URL names, never raw paths, keep the number of series bounded.
+    return (match and match.url_name) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Record each request, see the module docstring. Goes first, so the
+    latency covers the other middleware. Off with `METRICS_ENABLED = False`.
+
+    Under ASGI, queries run on other threads and aren't counted; requests
+    and latency are.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark the instance as a coroutine function for Django's handler.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def _record(self, request, response, elapsed, queries=None):
+        store = get_metrics()
+        route = _route(request)
+        store.inc(
+            "http_requests_total",
+            {
+                "route": route,
+                "method": request.method,
+                "status": str(response.status_code),
+            },
+        )
+        store.observe("http_request_duration_seconds", {"route": route}, elapsed)
+        if queries is not None:
+            store.inc("db_queries_total", {"route": route}, queries.count)
+            store.inc(
+                "db_query_duration_seconds_total", {"route": route}, queries.seconds
+            )
+        _record_caches(store)
+
+    def __call__(self, request):
+        if not getattr(settings, "METRICS_ENABLED", False):
+            return self.get_response(request)
+        if asyncio.iscoroutinefunction(self):
+            return self._acall(request)
+        start = time.perf_counter()
+        queries = _QueryStats()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    async def _acall(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - start)
+        return response
+
+
+def metrics_view(request):
+    """
+    The metrics of every worker, for requests with the `METRICS_TOKEN`, from
+    `METRICS_ALLOWED_IPS` when set. The client address alone is no access
+    control: behind a reverse proxy on the same host it's always loopback.
+    """
+    token = getattr(settings, "METRICS_TOKEN", None)
+    allowed = getattr(settings, "METRICS_ALLOWED_IPS", None)
+    if (
+        not getattr(settings, "METRICS_ENABLED", False)
+        or not token
+        or not constant_time_compare(
+            request.META.get("HTTP_AUTHORIZATION", ""), f"Bearer {token}"
+        )
+        or (allowed and request.META.get("REMOTE_ADDR") not in allowed)
+    ):
+        raise Http404
+    return HttpResponse(
+        render_metrics(collect()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,170 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param
+from rest_framework.utils.urls import replace_query_param
+
+__all__ = ["KeysetPagination", "OptInKeysetPagination"]
+
+
+class KeysetPagination(BasePagination):
+    """
+    Newest first keyset pagination on `date_created`, with the primary key as
+    a tiebreak. Each page is a single indexed range query (no `COUNT(*)`, no
+    `OFFSET`), so deep pages cost the same as the first one.
+
+    The `next`/`previous` links carry an opaque `cursor` holding the position
+    of the last/first row of the page.
+    """
+
+    date_field = "date_created"
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def encode_cursor(self, row, reverse):
+        position = {
+            "d": getattr(row, self.date_field).isoformat(),
+            "p": row.pk,
+            "r": reverse,
+        }
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, request, model):
+        """The `(date, pk, reverse)` of the request's cursor, for `model` rows."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            date = parse_datetime(position["d"])
+            if date is None:
+                raise ValueError(position["d"])
+            pk = position["p"]
+            # Only what `encode_cursor` writes, e.g. not a dict that a char
+            # primary key would turn into a string.
+            if isinstance(pk, bool) or not isinstance(pk, (int, str)):
+                raise ValueError(pk)
+            pk = model._meta.pk.to_python(pk)
+            return date, pk, bool(position["r"])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_page_queryset(self, queryset, cursor, page_size):
+        """
+        The query for one page (plus one extra row, to find out if there is
+        another page) starting after `cursor`, a `(date, pk, reverse)` tuple.
+        """
+        date_field = self.date_field
+        if cursor is None:
+            return queryset.order_by(f"-{date_field}", "-pk")[: page_size + 1]
+
+        # The redundant outer bound on the date lets the database seek straight
+        # to the cursor in the (date, pk) index instead of walking up to it.
+        date, pk, reverse = cursor
+        if reverse:
+            queryset = queryset.order_by(date_field, "pk").filter(
+                Q(**{f"{date_field}__gte": date}),
+                Q(**{f"{date_field}__gt": date}) | Q(pk__gt=pk),
+            )
+        else:
+            queryset = queryset.order_by(f"-{date_field}", "-pk").filter(
+                Q(**{f"{date_field}__lte": date}),
+                Q(**{f"{date_field}__lt": date}) | Q(pk__lt=pk),
+            )
+        return queryset[: page_size + 1]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request, queryset.model)
+        reverse = cursor is not None and cursor[2]
+
+        rows = list(self.get_page_queryset(queryset, cursor, page_size))
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        url = self.request.build_absolute_uri()
+        cursor = self.encode_cursor(self.page[-1], reverse=False)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        url = self.request.build_absolute_uri()
+        if not self.page:
+            return remove_query_param(url, self.cursor_query_param)
+        cursor = self.encode_cursor(self.page[0], reverse=True)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+
+class OptInKeysetPagination(PageNumberPagination):
+    """
+    Page number pagination unless keyset pagination is asked for, either per
+    request (`?pagination=cursor`, or any `?cursor=`) or for the whole
+    deployment with the `DEFAULT_PAGINATION_MODE = "cursor"` setting.
+    `?pagination=page` switches a request back to page numbers.
+    """
+
+    mode_query_param = "pagination"
+    keyset_class = KeysetPagination
+
+    def use_keyset(self, request):
+        mode = request.query_params.get(self.mode_query_param)
+        if mode is None:
+            if self.keyset_class.cursor_query_param in request.query_params:
+                return True
+            mode = getattr(settings, "DEFAULT_PAGINATION_MODE", "page")
+        return mode == "cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.keyset_class() if self.use_keyset(request) else None
+        if self.keyset is not None:
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,99 @@
+import asyncio
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+__all__ = ["QueryBudgetExceeded", "QueryCounter", "QueryBudgetMiddleware"]
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    """
+    Count the SQL statements run on every database connection while the
+    context is active. Works with `DEBUG` off, unlike `connection.queries`.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._stack = None
+
+    def _wrapper(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self._wrapper))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+
+def get_query_budget(view_func, request):
+    """
+    The budget declared for the view handling `request`. ViewSets declare
+    theirs per action with a `query_budgets = {"list": 2, ...}` attribute.
+    """
+    view_class = getattr(view_func, "cls", None)
+    budgets = getattr(view_class, "query_budgets", None)
+    actions = getattr(view_func, "actions", None)
+    if not budgets or not actions:
+        return None
+    return budgets.get(actions.get(request.method.lower()))
+
+
+class QueryBudgetMiddleware:
+    """
+    Count the SQL statements each request runs.
+
+    - `QUERY_COUNT_HEADER` (defaults to `DEBUG`) adds `X-Query-Count` and,
+      when the view declares one, `X-Query-Budget` to the response.
+    - `QUERY_BUDGET_ENFORCE` raises `QueryBudgetExceeded` when a view goes
+      over its budget. The test runner turns it on for every test, so
+      regressions fail loudly.
+
+    Under ASGI the middleware passes requests straight through: async views
+    run their queries on other threads, where they can't be counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark the instance as a coroutine function for Django's handler.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.get_response(request)
+        show_header = getattr(settings, "QUERY_COUNT_HEADER", settings.DEBUG)
+        enforce = getattr(settings, "QUERY_BUDGET_ENFORCE", False)
+        if not (show_header or enforce):
+            return self.get_response(request)
+
+        request._query_budget = None
+        with QueryCounter() as counter:
+            response = self.get_response(request)
+
+        budget = request._query_budget
+        if show_header:
+            response["X-Query-Count"] = str(counter.count)
+            if budget is not None:
+                response["X-Query-Budget"] = str(budget)
+        if enforce and budget is not None and counter.count > budget:
+            raise QueryBudgetExceeded(
+                f"{request.method} {request.path} ran {counter.count} queries, "
+                f"over its budget of {budget}."
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = get_query_budget(view_func, request)
@@ -0,0 +1,108 @@
+"""
+orjson backed JSON renderer and parser.
+
+orjson is optional: without it both classes behave exactly like the stock
+DRF `JSONRenderer`/`JSONParser`. The output matches the stock renderer byte
+for byte for the data this API returns (compact separators, UTF-8, escaped
+U+2028/U+2029), and anything orjson can't handle natively goes through the
+DRF encoder or falls back to the stock renderer.
+"""
+from collections.abc import Mapping
+from types import MappingProxyType
+
+from django.utils.functional import Promise
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+from utils.timing import timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+__all__ = [
+    "ORJSONRenderer",
+    "ORJSONParser",
+    "CSVStreamRenderer",
+    "NDJSONStreamRenderer",
+]
+
+_drf_encoder = encoders.JSONEncoder()
+
+
+def _default(obj):
+    # Read-only mappings, e.g. the shared breakdowns in `quote.pricing`.
+    if type(obj) is MappingProxyType:
+        return obj.copy()
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    if isinstance(obj, Promise):
+        return str(obj)
+    return _drf_encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed("render"):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        # Pretty printing, ASCII-only and non-compact output are left to the
+        # stock renderer.
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_default)
+        except TypeError:
+            # e.g. integers over 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", "utf-8")
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
+
+
+class _StreamRenderer(BaseRenderer):
+    """
+    For views that stream their own body: only takes part in content
+    negotiation (`Accept` or `?format=`).
+    """
+
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return ORJSONRenderer().render(data)
+
+
+class CSVStreamRenderer(_StreamRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class NDJSONStreamRenderer(_StreamRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
@@ -0,0 +1,93 @@
+"""
+PRAGMAs applied to every new SQLite connection, from `settings.SQLITE_PRAGMAS`.
+
+With the default rollback journal a writer locks readers out of the whole
+database, and concurrent writers fail with "database is locked" as soon as
+SQLite's busy timeout runs out. In WAL mode readers and the (single) writer
+don't block each other, and `busy_timeout` makes writers queue up for the
+write lock instead of failing.
+
+That wait only happens when a transaction asks for the write lock before
+reading anything. A transaction that reads first holds a snapshot, and when
+another writer commits before it gets to its first write it fails with
+"database is locked" at once, whatever the busy timeout. `write_atomic`
+opens such read-then-write transactions with `BEGIN IMMEDIATE`.
+"""
+import re
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS
+from django.db import connections
+from django.db import transaction
+
+__all__ = ["PRAGMAS", "configure_sqlite", "write_atomic"]
+
+# The PRAGMAs that may be set, so a setting can't run arbitrary SQL.
+PRAGMAS = {
+    "journal_mode",
+    "busy_timeout",
+    "synchronous",
+    "mmap_size",
+    "cache_size",
+    "temp_store",
+    "foreign_keys",
+    "wal_autocheckpoint",
+}
+
+_VALUE = re.compile(r"^-?\w+$")
+
+
+def _statements(pragmas):
+    for name, value in pragmas.items():
+        if value is None or value == "":
+            continue  # SQLite's default
+        if name not in PRAGMAS:
+            raise ImproperlyConfigured(
+                f'Unknown SQLite PRAGMA "{name}" in SQLITE_PRAGMAS, '
+                f'choose from {", ".join(sorted(PRAGMAS))}.'
+            )
+        if not _VALUE.match(str(value)):
+            raise ImproperlyConfigured(f'Invalid value for SQLite PRAGMA "{name}".')
+        yield f"PRAGMA {name} = {value}"
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """`connection_created` receiver, connected in `QuoteConfig.ready`."""
+    if connection.vendor != "sqlite":
+        return
+    # On the DB-API connection, so they don't count towards query budgets.
+    for statement in _statements(getattr(settings, "SQLITE_PRAGMAS", {})):
+        connection.connection.execute(statement)
+
+
+@contextmanager
+def _begin_immediate(connection):
+    # `atomic` begins the outermost transaction on SQLite with a deferred
+    # "BEGIN" from `_start_transaction_under_autocommit`.
+    def begin():
+        connection.cursor().execute("BEGIN IMMEDIATE")
+
+    connection._start_transaction_under_autocommit = begin
+    try:
+        yield
+    finally:
+        del connection._start_transaction_under_autocommit
+
+
+@contextmanager
+def write_atomic(using=None):
+    """
+    `transaction.atomic` for a block that reads and then writes. On SQLite
+    the outermost block takes the write lock as it begins, so concurrent
+    writers queue for `busy_timeout` instead of failing; nested blocks are
+    savepoints of the transaction they're in, as usual.
+    """
+    connection = connections[using or DEFAULT_DB_ALIAS]
+    if connection.vendor != "sqlite" or connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+    with _begin_immediate(connection), transaction.atomic(using=using):
+        yield
@@ -0,0 +1,187 @@
+"""
+Per-request timing and profiling.
+
+`ServerTimingMiddleware` splits the time of each request into phases and
+reports them in a `Server-Timing` header (shown in the browser's network
+panel): `db` (SQL statements, on every connection), `pricing`,
+`serialize`, `render`, and `app` for the rest. Code marks its phases with
+`with timed("pricing"): ...`; phases are exclusive, so the queries run
+while serializing count as `db`, not `serialize`.
+
+It also profiles a sample of requests (`PROFILE_SAMPLE_RATE`), or those
+sending the `PROFILE_TOKEN` in an `X-Profile` header, with cProfile, and
+writes the stats to `PROFILE_DIR` (read them with `python -m pstats`).
+
+When neither is enabled, `timed` costs a context variable lookup and the
+middleware one settings check, so it can stay installed in production.
+"""
+import asyncio
+import cProfile
+import logging
+import os
+import random
+import re
+import time
+import uuid
+from contextlib import ExitStack
+from contextlib import nullcontext
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.utils.crypto import constant_time_compare
+
+__all__ = ["PHASES", "RequestTimer", "timed", "ServerTimingMiddleware"]
+
+logger = logging.getLogger(__name__)
+
+PHASES = ("db", "pricing", "serialize", "render")
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+
+_timer = ContextVar("request_timer", default=None)
+_untimed = nullcontext()
+
+
+class _Phase:
+    __slots__ = ("timer", "name")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.timer.push(self.name)
+
+    def __exit__(self, *exc_info):
+        self.timer.pop()
+
+
+class RequestTimer:
+    """
+    Exclusive time spent per phase: entering a phase pauses the enclosing
+    one. `durations` maps phases to seconds.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        # [phase, perf_counter() it last (re)started]
+        self._stack = []
+
+    def push(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            outer = self._stack[-1]
+            self.durations[outer[0]] += now - outer[1]
+        self._stack.append([name, now])
+
+    def pop(self):
+        now = time.perf_counter()
+        name, started = self._stack.pop()
+        self.durations[name] = self.durations.get(name, 0.0) + now - started
+        if self._stack:
+            self._stack[-1][1] = now
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def _execute(self, execute, sql, params, many, context):
+        with self.phase("db"):
+            return execute(sql, params, many, context)
+
+    def header(self):
+        """The `Server-Timing` value, in milliseconds."""
+        total = time.perf_counter() - self.start
+        durations = dict(self.durations)
+        durations["app"] = max(total - sum(durations.values()), 0.0)
+        durations["total"] = total
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.3f}" for name, seconds in durations.items()
+        )
+
+
+def timed(phase):
+    """A context manager timing its block as `phase` of the current request."""
+    timer = _timer.get()
+    if timer is None:
+        return _untimed
+    return _Phase(timer, phase)
+
+
+def _profile_path(request, elapsed):
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", request.path).strip("-") or "root"
+    name = (
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{slug[:60]}-"
+        f"{elapsed * 1000:.0f}ms-{uuid.uuid4().hex[:8]}.pstats"
+    )
+    return os.path.join(settings.PROFILE_DIR, name)
+
+
+class ServerTimingMiddleware:
+    """
+    See the module docstring. Settings: `SERVER_TIMING` (defaults to
+    `DEBUG`), `PROFILE_SAMPLE_RATE` (0 to 1), `PROFILE_TOKEN` and
+    `PROFILE_DIR`.
+
+    Under ASGI the middleware passes requests straight through: async views
+    run their queries on other threads, concurrently, where phases can't be
+    told apart.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark the instance as a coroutine function for Django's handler.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def _requested_profile(self, request):
+        token = getattr(settings, "PROFILE_TOKEN", None)
+        return bool(token) and constant_time_compare(
+            request.META.get(PROFILE_HEADER, ""), token
+        )
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.get_response(request)
+        show_header = getattr(settings, "SERVER_TIMING", settings.DEBUG)
+        requested = self._requested_profile(request)
+        rate = getattr(settings, "PROFILE_SAMPLE_RATE", 0)
+        profile = requested or (rate > 0 and random.random() < rate)
+        if not (show_header or profile):
+            return self.get_response(request)
+
+        with ExitStack() as stack:
+            timer = RequestTimer()
+            if show_header:
+                token = _timer.set(timer)
+                stack.callback(_timer.reset, token)
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer._execute))
+            profiler = cProfile.Profile() if profile else None
+            if profiler is not None:
+                try:
+                    profiler.enable()
+                except ValueError:  # another profiler is active on this thread
+                    profiler = None
+                else:
+                    stack.callback(profiler.disable)
+            response = self.get_response(request)
+
+        if show_header:
+            response["Server-Timing"] = timer.header()
+        if profiler is not None:
+            path = _profile_path(request, time.perf_counter() - timer.start)
+            try:
+                os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+                profiler.dump_stats(path)
+            except OSError:
+                logger.exception("Couldn't write the profile of %s", request.path)
+            else:
+                logger.info("Profiled %s %s to %s", request.method, request.path, path)
+                if requested:
+                    response["X-Profile-File"] = os.path.basename(path)
+        return response